@@ -137,19 +137,9 @@ def inject_menu_files(web_content, context):
         web_content.head += f'<script src="{web_assets_root}/heatmap.js"></script>'
         web_content.head += f'<script src="{web_assets_root}/notifications.js"></script>'
         
-        # Inject heatmap data for robust rendering
-        if "heatmap" in conf.get("onigiriWidgetLayout", {}).get("grid", {}):
-            try:
-                h_data, h_conf = heatmap.get_heatmap_and_config()
-                web_content.head += f"""
-                <script>
-                    window.onigiriHeatmapData = {json.dumps(h_data)};
-                    window.onigiriHeatmapConfig = {json.dumps(h_conf)};
-                </script>
-                """
-            except Exception:
-                pass
-        
+        # Heatmap data is computed in the background and pushed into the
+        # skeleton once ready (see on_deck_browser_did_render).
+
     elif is_reviewer:
         silent_notifs = "true" if conf.get("onigiri_reviewer_silent_notifications", False) else "false"
         web_content.head += f'<script>window.onigiriSilentNotifications = {silent_notifs};</script>'
@@ -229,6 +219,14 @@ def inject_menu_files(web_content, context):
         web_content.head += f'<script src="{web_assets_root}/profile_page.js"></script>'
         web_content.head += f'<script src="{web_assets_root}/profile_modal.js"></script>'
         web_content.head += f'<script src="{web_assets_root}/notifications.js"></script>'
+        if conf.get("heatmapShowOnOverview", False):
+            heatmap_css_path = os.path.join(addon_path, "web", "heatmap.css")
+            try:
+                with open(heatmap_css_path, "r", encoding="utf-8") as f:
+                    web_content.head += f"<style>{f.read()}</style>"
+            except FileNotFoundError:
+                pass
+            web_content.head += f'<script src="{web_assets_root}/heatmap.js"></script>'
     if is_reviewer_bottom_bar:
         web_content.head += patcher.generate_reviewer_bottom_bar_background_css(addon_path)
         web_content.head += patcher.generate_reviewer_buttons_css(conf)
@@ -417,16 +415,20 @@ DeckBrowser._renderPage = onigiri_renderer.render_onigiri_deck_browser
 DeckBrowser._render_deck_node = patcher._onigiri_render_deck_node
 
 def on_deck_browser_did_render(deck_browser: DeckBrowser):
-    conf = config.get_config()
+    conf = config.get_config_view()
     grid_layout = conf.get("onigiriWidgetLayout", {}).get("grid", {})
     if "heatmap" in grid_layout:
-        # Data is now injected via globals in inject_menu_files for reliability.
-        # This call handles refreshes or dynamic layout changes.
-        deck_browser.web.eval("if (window.OnigiriHeatmap && typeof window.OnigiriHeatmap.autoRender === 'function') { window.OnigiriHeatmap.autoRender(); }")
+        # The page shows the skeleton until the background query pushes the data.
+        heatmap.request_heatmap_render(deck_browser.web, heatmap.get_widget_deck_filter(), deck_selector=True)
     
     # Update sync status indicator
     update_sync_status_indicator()
 
+def on_overview_did_refresh(overview):
+    """Fills the overview heatmap with the current deck and its subdecks."""
+    if config.get_config_view().get("heatmapShowOnOverview", False):
+        heatmap.request_heatmap_render(overview.web, mw.col.decks.current()['id'])
+
 def update_sync_status_indicator():
     """Updates the sync status indicator in the Onigiri menu."""
     try:
@@ -493,6 +495,7 @@ gui_hooks.main_window_did_init.append(setup_global_hooks)
 gui_hooks.profile_did_open.append(on_profile_did_open)
 gui_hooks.webview_will_set_content.append(inject_menu_files)
 gui_hooks.deck_browser_did_render.append(on_deck_browser_did_render)
+gui_hooks.overview_did_refresh.append(on_overview_did_refresh)
 gui_hooks.webview_did_receive_js_message.append(patcher.on_webview_js_message)
 # MODIFICATION: Use the current, correct hook instead of the outdated one.
 gui_hooks.webview_did_receive_js_message.append(_on_webview_cmd)
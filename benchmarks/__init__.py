@@ -0,0 +1,13 @@
+"""
+Benchmarks for Onigiri's hot paths, runnable without Anki.
+
+    python -m benchmarks                       # small and medium collections
+    python -m benchmarks --sizes large         # 20M reviews, 20,000 decks
+    python -m benchmarks --out run.json --baseline previous.json
+
+Synthetic collections are generated once into --data-dir and reused. The
+results are JSON: p50/p95/max milliseconds and peak traced memory per case
+and collection size, plus the ratio to a baseline run when one is given.
+
+heatmap_renderers.html is the browser-side counterpart for web/heatmap.js.
+"""
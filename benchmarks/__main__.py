@@ -0,0 +1,147 @@
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import types
+
+from . import anki_stubs, synthetic
+from .cases import run_cases
+
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The add-on is imported under this name, as Anki would import its folder
+ADDON_MODULE = "onigiri"
+ADDON_MODULES = ("config", "heatmap_cache", "due_forecast", "heatmap", "deck_stats", "deck_meta", "patcher", "deck_tree_updater", "onigiri_renderer")
+
+
+def _load_addon(work_dir: str):
+    addons_folder = os.path.join(work_dir, "addons21")
+    profile_folder = os.path.join(work_dir, "profile")
+    os.makedirs(addons_folder, exist_ok=True)
+    os.makedirs(profile_folder, exist_ok=True)
+    mw = anki_stubs.install(os.path.basename(ADDON_ROOT), addons_folder, profile_folder)
+
+    # A bare package for the add-on folder, so its __init__ (the Anki wiring)
+    # does not run and relative imports still resolve
+    package = types.ModuleType(ADDON_MODULE)
+    package.__path__ = [ADDON_ROOT]
+    sys.modules[ADDON_MODULE] = package
+    addon = {name: importlib.import_module(f"{ADDON_MODULE}.{name}") for name in ADDON_MODULES}
+
+    # Keep settings files out of the add-on folder
+    user_files = os.path.join(work_dir, "user_files")
+    os.makedirs(user_files, exist_ok=True)
+    addon["config"]._user_files_dir = user_files
+    return mw, addon
+
+
+@contextlib.contextmanager
+def _leave_addon_folder_as_found():
+    """Removes what the gamification modules save under the add-on's user_files."""
+    user_files = os.path.join(ADDON_ROOT, "user_files")
+    existed = os.path.isdir(user_files)
+    before = set(os.listdir(user_files)) if existed else set()
+    try:
+        yield
+    finally:
+        if os.path.isdir(user_files):
+            for name in set(os.listdir(user_files)) - before:
+                path = os.path.join(user_files, name)
+                if os.path.isfile(path):
+                    os.remove(path)
+            if not existed and not os.listdir(user_files):
+                os.rmdir(user_files)
+
+
+def _collection_stats(col) -> dict:
+    return {
+        "revlog": col.db.scalar("SELECT count() FROM revlog"),
+        "cards": col.db.scalar("SELECT count() FROM cards"),
+        "decks": col.db.scalar("SELECT count() FROM decks"),
+        "file_mib": round(os.path.getsize(col.path) / 2**20, 1),
+    }
+
+
+def _compare(results: dict, baseline: dict) -> None:
+    """Adds p50/p95 ratios against a previous run (above 1.0 is slower)."""
+    for size, size_results in results.items():
+        for name, result in size_results["cases"].items():
+            previous = baseline.get("results", {}).get(size, {}).get("cases", {}).get(name)
+            if not previous or "error" in result or "error" in previous:
+                continue
+            for key in ("p50_ms", "p95_ms"):
+                if previous.get(key):
+                    result[f"{key}_vs_baseline"] = round(result[key] / previous[key], 2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Onigiri hot-path benchmarks on synthetic collections.")
+    parser.add_argument("--sizes", default="small,medium", help=f"comma-separated presets: {', '.join(synthetic.PRESETS)}")
+    parser.add_argument("--cases", default="", help="comma-separated case name prefixes (default: all)")
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case (at most)")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per case before stopping early (min. 3 runs)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "onigiri-benchmarks"), help="where generated collections are kept")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in synthetic.PRESETS]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    only = [name.strip() for name in args.cases.split(",") if name.strip()] or None
+
+    report = {
+        "meta": {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "budget_s": args.budget,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="onigiri-bench-") as work_dir, _leave_addon_folder_as_found():
+        mw, addon = _load_addon(work_dir)
+        for size in sizes:
+            print(f"Onigiri benchmarks: preparing '{size}' collection...", file=sys.stderr)
+            started = time.perf_counter()
+            col = synthetic.SyntheticCollection(synthetic.build(args.data_dir, size, args.seed))
+            prepare_s = time.perf_counter() - started
+            mw.col = col
+            print(f"Onigiri benchmarks: running '{size}'...", file=sys.stderr)
+            report["results"][size] = {
+                "collection": dict(_collection_stats(col), prepare_s=round(prepare_s, 1)),
+                "cases": run_cases(addon, mw, col, args.repeat, args.budget, only),
+            }
+            # What Anki does between profiles: module caches start empty again
+            from aqt import gui_hooks
+            gui_hooks.profile_will_close()
+            mw.col = None
+            col.close()
+        addon["config"].flush_config_writes()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            _compare(report["results"], json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
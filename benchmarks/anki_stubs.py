@@ -0,0 +1,207 @@
+"""
+Just enough of aqt/anki for Onigiri's modules to import and run outside Anki.
+
+Every aqt/anki module is a permissive stand-in: any attribute is a stub class
+that can be called, subclassed, chained and compared, so module-level Qt code
+(dialog subclasses, enum flags, signal declarations) imports without a GUI.
+The pieces the benchmarks actually drive are real: gui_hooks keeps the
+registered callbacks, and mw.col is a SyntheticCollection (see synthetic.py).
+"""
+
+import importlib.abc
+import importlib.machinery
+import os
+import re
+import sys
+import types
+
+_STUBBED_PACKAGES = ("aqt", "anki", "PyQt6", "PyQt5")
+
+
+class _StubMeta(type):
+    def __getattr__(cls, name):
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        # Kept, so that e.g. QEvent.Type.Leave is one class, not a new one per lookup
+        value = _stub_class(name)
+        setattr(cls, name, value)
+        return value
+
+    def __or__(cls, other):
+        return cls
+
+    __ror__ = __and__ = __rand__ = __or__
+
+    def __int__(cls):
+        return 0
+
+    def __iter__(cls):
+        return iter(())
+
+
+class Stub(metaclass=_StubMeta):
+    """Base of every stand-in class; instances absorb any use."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return Stub()
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __bool__(self):
+        return False
+
+    def __iter__(self):
+        return iter(())
+
+    def __or__(self, other):
+        return self
+
+    __ror__ = __and__ = __rand__ = __or__
+
+    def __int__(self):
+        return 0
+
+
+def _stub_class(name: str):
+    return _StubMeta(name, (Stub,), {})
+
+
+class _Hook(list):
+    """A gui_hooks hook: a list of callbacks that can also be fired."""
+
+    def __call__(self, *args):
+        for callback in list(self):
+            callback(*args)
+
+
+class _GuiHooks(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        hook = _Hook()
+        setattr(self, name, hook)
+        return hook
+
+
+def _qt_names():
+    """Qt names the add-on pulls in with `from aqt.qt import *`."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    names = {"pyqtSignal", "pyqtSlot", "pyqtProperty", "sip", "qconnect", "qtmajor", "qtminor"}
+    pattern = re.compile(r"\b(Q[A-Z]\w*)")
+    for folder, _dirs, files in os.walk(root):
+        for filename in files:
+            if filename.endswith(".py"):
+                with open(os.path.join(folder, filename), encoding="utf-8", errors="ignore") as f:
+                    names.update(pattern.findall(f.read()))
+    return sorted(names)
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _stub_class(name)
+        setattr(self, name, value)
+        return value
+
+
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname.split(".")[0] in _STUBBED_PACKAGES:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        if spec.name == "aqt.gui_hooks":
+            return _GuiHooks(spec.name)
+        return _StubModule(spec.name)
+
+    def exec_module(self, module):
+        module.__path__ = []
+        if module.__name__ in ("aqt.qt", "PyQt6.QtCore", "PyQt6.QtGui", "PyQt6.QtWidgets"):
+            module.__all__ = _qt_names()
+            module.qtmajor, module.qtminor = 6, 6
+            module.qconnect = lambda signal, slot: None
+
+
+class _AddonManager:
+    def __init__(self, package: str, addons_folder: str):
+        self._package = package
+        self._addons_folder = addons_folder
+
+    def addonFromModule(self, module_name):
+        return self._package
+
+    def addonsFolder(self, package=None):
+        if package is None:
+            return self._addons_folder
+        return os.path.join(self._addons_folder, package)
+
+    def getConfig(self, package):
+        return None
+
+    def writeConfig(self, package, conf):
+        pass
+
+    def setWebExports(self, package, pattern):
+        pass
+
+
+class _ProfileManager:
+    def __init__(self, name: str, folder: str):
+        self.name = name
+        self._folder = folder
+
+    def profileFolder(self):
+        return self._folder
+
+
+class MainWindow(Stub):
+    """mw: a collection, a profile and an add-on manager; everything else is a stub."""
+
+    def __init__(self, package: str, addons_folder: str, profile_folder: str):
+        self.col = None
+        self.pm = _ProfileManager("benchmark", profile_folder)
+        self.addonManager = _AddonManager(package, addons_folder)
+        self.state = "deckBrowser"
+        self.fullscreen = False
+
+    def __bool__(self):
+        return True
+
+
+class AnkiWebView(Stub):
+    pass
+
+
+class RenderDeckNodeContext:
+    def __init__(self, current_deck_id):
+        self.current_deck_id = current_deck_id
+
+
+def install(package: str, addons_folder: str, profile_folder: str) -> MainWindow:
+    """Installs the stand-in aqt/anki modules and returns the stub mw."""
+    if not any(isinstance(finder, _StubFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _StubFinder())
+    import aqt
+    import aqt.deckbrowser
+    import aqt.main
+    import aqt.webview
+    import anki.decks
+    from aqt import gui_hooks
+
+    # The classes Onigiri calls through to or builds directly need real behaviour
+    aqt.webview.AnkiWebView = AnkiWebView
+    aqt.deckbrowser.RenderDeckNodeContext = RenderDeckNodeContext
+    anki.decks.DeckId = int
+
+    mw = MainWindow(package, addons_folder, profile_folder)
+    aqt.mw = mw
+    aqt.gui_hooks = gui_hooks
+    return mw
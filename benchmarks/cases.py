@@ -0,0 +1,197 @@
+"""
+The benchmarked hot paths and the timing helper.
+
+Each case is timed for up to `repeat` runs (fewer if the time budget runs
+out, never fewer than three), then run once more under tracemalloc for its
+peak Python allocation. Cases that need a cold start get a setup callable,
+which runs before every sample and is not timed.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+def _percentile(sorted_samples, fraction: float) -> float:
+    """Nearest-rank percentile of pre-sorted samples."""
+    index = max(0, min(len(sorted_samples) - 1, int(round(fraction * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+
+def measure(fn: Callable[[], object], repeat: int, budget_s: float, setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """p50/p95/max wall time in ms over the timed runs, and peak traced memory in KiB."""
+    if setup:
+        setup()
+    fn()  # warm-up: imports, first-use caches of code that is not under test
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() - started < budget_s):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+class BenchDeckBrowser:
+    """A DeckBrowser with Onigiri's patches applied; web records the page size."""
+
+    def __init__(self, mw, patcher, renderer):
+        self.mw = mw
+        self.web = _RecordingWebView()
+        self._render_data = None
+        self._render_deck_node = patcher._onigiri_render_deck_node.__get__(self)
+        self._renderPage = renderer.render_onigiri_deck_browser.__get__(self)
+
+
+class _RecordingWebView:
+    def __init__(self):
+        self.html_size = 0
+
+    def stdHtml(self, body="", css=None, js=None, head="", context=None, **kwargs):
+        self.html_size = len(body) + len(head)
+
+    def eval(self, js):
+        pass
+
+
+def _largest_top_level_deck(col) -> int:
+    tree = col.sched.deck_due_tree()
+
+    def size(node):
+        return 1 + sum(size(child) for child in node.children)
+
+    return max(tree.children, key=size).deck_id
+
+
+def run_cases(addon, mw, col, repeat: int, budget_s: float, only=None) -> Dict[str, Dict[str, float]]:
+    """Runs every case (or those named in `only`) against the collection in mw.col."""
+    config = addon["config"]
+    heatmap = addon["heatmap"]
+    heatmap_cache = addon["heatmap_cache"]
+    due_forecast = addon["due_forecast"]
+    deck_stats = addon["deck_stats"]
+    deck_tree_updater = addon["deck_tree_updater"]
+    patcher = addon["patcher"]
+    renderer = addon["onigiri_renderer"]
+
+    deck_browser = BenchDeckBrowser(mw, patcher, renderer)
+    deck_id = _largest_top_level_deck(col)
+
+    def cold_heatmap():
+        heatmap_cache.reset()
+        due_forecast.reset()
+        path = os.path.join(mw.pm.profileFolder(), heatmap_cache._CACHE_FILENAME)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def forget_tree():
+        deck_browser._render_data = None
+
+    def fresh_tree():
+        deck_browser._render_data = renderer.RenderData(tree=col.sched.deck_due_tree())
+
+    def fresh_tree_cold_rows():
+        fresh_tree()
+        patcher.reset_deck_row_cache()
+
+    def cards_changed():
+        # An operation touched cards, but none since the last refresh
+        deck_stats._changes._on_operation_did_execute(_Changes(card=True), None)
+
+    sort_modes = ["alphabetical_az", "most_due", "favorites_first", "custom"]
+
+    def view_ready():
+        deck_tree_updater._view_tree(deck_browser)
+
+    def next_sort_mode():
+        # The sort menu: same tree, another mode
+        view_ready()
+        sort_modes.append(sort_modes.pop(0))
+        col.conf["onigiri_sort_mode"] = sort_modes[0]
+
+    def favorites_filter_on():
+        view_ready()
+        favorites = [str(node.deck_id) for node in deck_browser._render_data.tree.children[::7]][:10]
+        col.conf["onigiri_favorite_decks"] = favorites
+        col.conf["onigiri_show_favorites"] = True
+        addon["deck_meta"].reset()
+        deck_browser._render_data = None
+
+    def view_defaults():
+        for key in ("onigiri_sort_mode", "onigiri_favorite_decks", "onigiri_show_favorites"):
+            col.conf.pop(key, None)
+        addon["deck_meta"].reset()
+
+    def expire_dashboard_stats():
+        renderer._DASHBOARD_LAST_UPDATE = 0
+
+    class _Changes:
+        def __init__(self, **flags):
+            self.__dict__.update(flags)
+
+    cases = {
+        "config.get_config": (config.get_config, None),
+        "config.get_config_view": (config.get_config_view, None),
+        "heatmap.get_heatmap_data/cold": (heatmap.get_heatmap_data, cold_heatmap),
+        "heatmap.get_heatmap_data/warm": (heatmap.get_heatmap_data, None),
+        "heatmap.get_heatmap_data/deck": (lambda: heatmap.get_heatmap_data(deck_id), None),
+        "deck_stats.get_deck_stats/cold": (deck_stats.get_deck_stats, deck_stats.reset),
+        "deck_stats.get_deck_stats/warm": (deck_stats.get_deck_stats, None),
+        "deck_stats.get_deck_stats/cards_changed": (deck_stats.get_deck_stats, cards_changed),
+        # What a render cost before the tree was fetched in the background
+        "deck_tree_updater.fresh_deck_tree": (lambda: deck_tree_updater.fresh_deck_tree(deck_browser), None),
+        "deck_tree_updater._render_deck_tree_html_only": (
+            lambda: deck_tree_updater._render_deck_tree_html_only(deck_browser), forget_tree),
+        "deck_tree_updater._render_deck_tree_html_only/tree_ready": (
+            lambda: deck_tree_updater._render_deck_tree_html_only(deck_browser), fresh_tree),
+        "deck_tree_updater._render_deck_tree_html_only/cold_rows": (
+            lambda: deck_tree_updater._render_deck_tree_html_only(deck_browser), fresh_tree_cold_rows),
+        "deck_tree_updater.on_deck_collapse": (
+            lambda: deck_tree_updater.on_deck_collapse(deck_browser, str(deck_id)), None),
+        "deck_tree_updater._view_tree/cached": (lambda: deck_tree_updater._view_tree(deck_browser), view_ready),
+        "deck_tree_updater._view_tree/sort_switch": (lambda: deck_tree_updater._view_tree(deck_browser), next_sort_mode),
+        "deck_tree_updater._view_tree/favorites_filter": (lambda: deck_tree_updater._view_tree(deck_browser), favorites_filter_on),
+        "render_onigiri_deck_browser": (deck_browser._renderPage, expire_dashboard_stats),
+    }
+
+    results = {}
+    for name, (fn, setup) in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        print(f"Onigiri benchmarks:   {name}", file=sys.stderr)
+        patcher.reset_deck_row_cache()
+        try:
+            result = measure(fn, repeat, budget_s, setup)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        row_cache = patcher.deck_row_cache_stats()
+        if row_cache["hits"] + row_cache["misses"]:
+            result["row_cache_hit_rate"] = round(row_cache["hits"] / (row_cache["hits"] + row_cache["misses"]), 3)
+        if name == "render_onigiri_deck_browser":
+            result["html_kib"] = round(deck_browser.web.html_size / 1024, 1)
+        results[name] = result
+        if name.startswith("deck_tree_updater._view_tree"):
+            view_defaults()
+    return results
@@ -0,0 +1,364 @@
+"""
+Synthetic Anki collections in a plain SQLite file.
+
+The file has the columns of Anki's cards, revlog and decks tables that Onigiri
+queries, filled with a deterministic mix of review history (with missed days),
+cards in every queue, nested decks and a few filtered decks. The review history
+is generated inside SQLite, so even the 20M-row preset takes well under a
+minute, and the file is reused by later runs with the same size and seed.
+
+SyntheticCollection wraps the file in the subset of mw.col that Onigiri uses:
+db, conf, sched (today, day_cutoff, deck_due_tree) and decks.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Bump when the generated data changes shape, so old files are rebuilt
+_GENERATOR_VERSION = 1
+
+PRESETS = {
+    "small": {"revlog": 10_000, "cards": 2_000, "decks": 50, "days": 365},
+    "medium": {"revlog": 1_000_000, "cards": 50_000, "decks": 1_000, "days": 5 * 365},
+    "large": {"revlog": 20_000_000, "cards": 500_000, "decks": 20_000, "days": 10 * 365},
+    # The deck list paths of "large" without its review history
+    "decks20k": {"revlog": 100_000, "cards": 100_000, "decks": 20_000, "days": 365},
+}
+
+_MAX_DEPTH = 4
+# Cards in play on any one day of the generated history
+_REVIEW_BAND = 5_000
+_ROLLOVER_HOUR = 4
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE decks (id INTEGER PRIMARY KEY, name TEXT NOT NULL, dyn INTEGER NOT NULL, collapsed INTEGER NOT NULL);
+CREATE TABLE cards (
+    id INTEGER PRIMARY KEY, nid INTEGER NOT NULL, did INTEGER NOT NULL, odid INTEGER NOT NULL,
+    type INTEGER NOT NULL, queue INTEGER NOT NULL, due INTEGER NOT NULL, ivl INTEGER NOT NULL,
+    reps INTEGER NOT NULL, lapses INTEGER NOT NULL, mod INTEGER NOT NULL
+);
+CREATE TABLE revlog (
+    id INTEGER PRIMARY KEY, cid INTEGER NOT NULL, ease INTEGER NOT NULL, ivl INTEGER NOT NULL,
+    time INTEGER NOT NULL, type INTEGER NOT NULL
+);
+"""
+
+
+def _day_cutoff() -> int:
+    """Start of the next scheduler day, in seconds."""
+    now = datetime.now()
+    cutoff = now.replace(hour=_ROLLOVER_HOUR, minute=0, second=0, microsecond=0)
+    if cutoff <= now:
+        cutoff += timedelta(days=1)
+    return int(cutoff.timestamp())
+
+
+def _deck_names(count: int, rng: random.Random) -> List[str]:
+    """Default plus count - 1 nested decks, parents before children."""
+    names = ["Default"]
+    depths = [1]
+    for index in range(1, count):
+        parent = rng.randrange(len(names)) if index > 8 and rng.random() < 0.75 else None
+        if parent is not None and depths[parent] < _MAX_DEPTH and names[parent] != "Default":
+            names.append(f"{names[parent]}::Deck {index}")
+            depths.append(depths[parent] + 1)
+        else:
+            names.append(f"Deck {index}")
+            depths.append(1)
+    return names
+
+
+def _generate(path: str, params: Dict[str, int], seed: int) -> None:
+    rng = random.Random(seed)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(_SCHEMA)
+
+    names = _deck_names(params["decks"], rng)
+    filtered_every = 50
+    conn.executemany(
+        "INSERT INTO decks VALUES (?, ?, ?, ?)",
+        [
+            (index + 1, name, int(index > 0 and index % filtered_every == 0 and "::" not in name), int(rng.random() < 0.1))
+            for index, name in enumerate(names)
+        ],
+    )
+    home_decks = [row[0] for row in conn.execute("SELECT id FROM decks WHERE dyn = 0")]
+    filtered_decks = [row[0] for row in conn.execute("SELECT id FROM decks WHERE dyn = 1")]
+
+    # Cards: the queue mix of a mature collection, due days spread around today
+    today = params["days"]
+    now = int(time.time())
+    card_rows = []
+    for card_id in range(1, params["cards"] + 1):
+        queue = rng.choices((0, 1, 2, 3, -1, -2, -3), weights=(25, 3, 60, 2, 6, 2, 2))[0]
+        card_type = {0: 0, 1: 1, 3: 2}.get(queue, 2)
+        due = card_id if queue == 0 else today + int(rng.expovariate(1 / 30)) - 3
+        # Cards are added a deck at a time, with a few strays
+        did = home_decks[(card_id - 1) * len(home_decks) // params["cards"]] if rng.random() < 0.98 else rng.choice(home_decks)
+        odid = 0
+        if filtered_decks and rng.random() < 0.02:
+            did, odid = rng.choice(filtered_decks), did
+        card_rows.append((card_id, card_id, did, odid, card_type, queue, due, max(0, due - today), rng.randrange(40), rng.randrange(5), now - rng.randrange(86400 * 30)))
+        if len(card_rows) == 50_000:
+            conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", card_rows)
+            card_rows = []
+    conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", card_rows)
+
+    # Review history: evenly spaced ids with jitter over `days` days before
+    # today's rollover, about one day in ten skipped, up to now. Like a real
+    # history, each day reviews a band of cards that moves through the
+    # collection rather than cards from every deck.
+    start_ms = (_day_cutoff() - 86400 * (today + 1)) * 1000
+    step_ms = max(1, (now * 1000 - start_ms) // params["revlog"])
+    # (the per-row "random" columns are hashes of the row number, so the same
+    # seed always gives the same history)
+    conn.execute(
+        """
+        WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < :rows - 1)
+        INSERT INTO revlog
+        SELECT :start + i * :step + (i + :seed) * 48271 % 2147483647 % :step,
+               1 + (i * :cards / :rows + (i + :seed) * 69621 % 2147483647 % :band) % :cards,
+               1 + (i + :seed) * 16807 % 2147483647 % 4,
+               (i + :seed) * 39373 % 2147483647 % 365,
+               2000 + (i + :seed) * 40692 % 2147483647 % 20000,
+               CASE (i + :seed) * 62089911 % 2147483647 % 20
+                   WHEN 0 THEN 0 WHEN 1 THEN 2 WHEN 2 THEN 3 WHEN 3 THEN 4 ELSE 1 END
+        FROM seq
+        WHERE ((:start + i * :step) / 86400000 + :seed) * 2654435761 % 4294967296 % 10 != 0
+        """,
+        {"rows": params["revlog"], "start": start_ms, "step": step_ms, "cards": params["cards"], "seed": seed,
+         "band": min(params["cards"], _REVIEW_BAND)},
+    )
+    conn.execute("CREATE INDEX ix_cards_did ON cards (did)")
+    conn.execute("CREATE INDEX ix_revlog_cid ON revlog (cid)")
+    conn.executemany(
+        "INSERT INTO meta VALUES (?, ?)",
+        [("params", json.dumps(params, sort_keys=True)), ("seed", str(seed)), ("version", str(_GENERATOR_VERSION)), ("created", str(now))],
+    )
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+
+
+def _is_current(path: str, params: Dict[str, int], seed: int) -> bool:
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    # The history ends at generation time; regenerate once it is a day old
+    return (
+        meta.get("params") == json.dumps(params, sort_keys=True)
+        and meta.get("seed") == str(seed)
+        and meta.get("version") == str(_GENERATOR_VERSION)
+        and time.time() - int(meta.get("created", 0)) < 86400
+    )
+
+
+def build(data_dir: str, preset: str, seed: int = 1, **overrides) -> str:
+    """Path of the collection file for a preset, generating it if needed."""
+    params = dict(PRESETS[preset], **overrides)
+    os.makedirs(data_dir, exist_ok=True)
+    label = "-".join(f"{key}{params[key]}" for key in sorted(params))
+    path = os.path.join(data_dir, f"{preset}-{label}-seed{seed}.sqlite")
+    if not (os.path.exists(path) and _is_current(path, params, seed)):
+        _generate(path, params, seed)
+    return path
+
+
+# --- The mw.col stand-in ---
+
+class DBProxy:
+    """mw.col.db: Anki's DBProxy query helpers over sqlite3."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def all(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+    def list(self, sql, *args):
+        return [row[0] for row in self._conn.execute(sql, args)]
+
+    def first(self, sql, *args):
+        return self._conn.execute(sql, args).fetchone()
+
+    def scalar(self, sql, *args):
+        row = self._conn.execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def execute(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+
+class DeckNameId:
+    __slots__ = ("id", "name")
+
+    def __init__(self, deck_id, name):
+        self.id = deck_id
+        self.name = name
+
+
+class DeckTreeNode:
+    """The fields of Anki's DeckTreeNode that the deck list reads."""
+
+    __slots__ = ("deck_id", "name", "level", "collapsed", "filtered", "new_count", "learn_count", "review_count", "children")
+
+    def __init__(self, deck_id, name, level, collapsed, filtered):
+        self.deck_id = deck_id
+        self.name = name
+        self.level = level
+        self.collapsed = collapsed
+        self.filtered = filtered
+        self.new_count = self.learn_count = self.review_count = 0
+        self.children = []
+
+    def __deepcopy__(self, memo):
+        # Protobuf messages copy field by field, without deepcopy's memo bookkeeping
+        node = DeckTreeNode(self.deck_id, self.name, self.level, self.collapsed, self.filtered)
+        node.new_count = self.new_count
+        node.learn_count = self.learn_count
+        node.review_count = self.review_count
+        node.children = [child.__deepcopy__(memo) for child in self.children]
+        return node
+
+
+class Scheduler:
+    def __init__(self, col: "SyntheticCollection", today: int, day_cutoff: int):
+        self._col = col
+        self.today = today
+        self.day_cutoff = day_cutoff
+
+    def deck_due_tree(self) -> DeckTreeNode:
+        """A fresh tree with due counts (no daily limits), like the backend's."""
+        counts = {}
+        for did, queue, count in self._col.db.all(
+            "SELECT did, queue, count() FROM cards WHERE queue IN (0, 1, 2, 3) "
+            "AND (queue NOT IN (2, 3) OR due <= ?) GROUP BY did, queue",
+            self.today,
+        ):
+            counts.setdefault(did, {})[queue] = count
+
+        root = DeckTreeNode(0, "", 0, False, False)
+        nodes = {"": root}
+        for deck in self._col.decks.all():
+            name = deck["name"]
+            parent_name, _, leaf = name.rpartition("::")
+            node = DeckTreeNode(deck["id"], leaf, name.count("::") + 1, bool(deck["collapsed"]), bool(deck["dyn"]))
+            deck_counts = counts.get(deck["id"], {})
+            node.new_count = deck_counts.get(0, 0)
+            node.learn_count = deck_counts.get(1, 0) + deck_counts.get(3, 0)
+            node.review_count = deck_counts.get(2, 0)
+            nodes[name] = node
+            nodes.get(parent_name, root).children.append(node)
+
+        def add_children(node):
+            for child in node.children:
+                add_children(child)
+                node.new_count += child.new_count
+                node.learn_count += child.learn_count
+                node.review_count += child.review_count
+            node.children.sort(key=lambda child: child.name.lower())
+
+        add_children(root)
+        return root
+
+    def counts(self, card=None):
+        tree = self.deck_due_tree()
+        return (
+            sum(node.new_count for node in tree.children),
+            sum(node.learn_count for node in tree.children),
+            sum(node.review_count for node in tree.children),
+        )
+
+
+class DeckManager:
+    def __init__(self, col: "SyntheticCollection"):
+        self._col = col
+        self._decks = {
+            deck_id: {"id": deck_id, "name": name, "dyn": dyn, "collapsed": bool(collapsed), "browserCollapsed": False}
+            for deck_id, name, dyn, collapsed in col.db.all("SELECT id, name, dyn, collapsed FROM decks ORDER BY id")
+        }
+        self._current_id = 1
+
+    def all(self) -> List[dict]:
+        return list(self._decks.values())
+
+    def all_names_and_ids(self, skip_empty_default=False, include_filtered=True) -> List[DeckNameId]:
+        return [
+            DeckNameId(deck["id"], deck["name"])
+            for deck in sorted(self._decks.values(), key=lambda deck: deck["name"].lower())
+            if include_filtered or not deck["dyn"]
+        ]
+
+    def get(self, did, default=True) -> Optional[dict]:
+        deck = self._decks.get(int(did))
+        if deck is None and default:
+            return self._decks[1]
+        return deck
+
+    def name(self, did) -> str:
+        return self.get(did)["name"]
+
+    def id(self, name, create=False) -> Optional[int]:
+        deck = self.by_name(name)
+        return deck["id"] if deck else None
+
+    def by_name(self, name) -> Optional[dict]:
+        return next((deck for deck in self._decks.values() if deck["name"] == name), None)
+
+    def child_ids(self, parent_name) -> List[int]:
+        prefix = parent_name + "::"
+        return [deck["id"] for deck in self._decks.values() if deck["name"].startswith(prefix)]
+
+    def deck_and_child_ids(self, deck_id) -> List[int]:
+        return [int(deck_id)] + self.child_ids(self.name(deck_id))
+
+    def get_current_id(self) -> int:
+        return self._current_id
+
+    def current(self) -> dict:
+        return self._decks[self._current_id]
+
+    def select(self, did) -> None:
+        self._current_id = int(did)
+
+    def collapse(self, did) -> None:
+        deck = self._decks[int(did)]
+        deck["collapsed"] = not deck["collapsed"]
+
+    def save(self, deck=None) -> None:
+        pass
+
+
+class SyntheticCollection:
+    """The parts of mw.col that Onigiri uses, over a generated collection file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self.db = DBProxy(self._conn)
+        params = json.loads(self.db.scalar("SELECT value FROM meta WHERE key = 'params'"))
+        self.conf = {"rollover": _ROLLOVER_HOUR}
+        self.sched = Scheduler(self, params["days"], _day_cutoff())
+        self.decks = DeckManager(self)
+
+    def setMod(self) -> None:
+        pass
+
+    def set_modified(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._conn.close()
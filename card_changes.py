@@ -0,0 +1,100 @@
+"""
+Change tracking shared by the incremental card caches (deck_stats,
+due_forecast and heatmap_cache).
+
+Each cache is built once and then brought up to date on next use from what
+changed since. The main-thread hooks record those changes in the cache's
+CardChanges, and the cache takes them all at once when it refreshes, which may
+be in a background op. The markers are only touched under a lock, so nothing
+recorded while a refresh runs is lost: it is picked up by the next one.
+"""
+
+import threading
+from typing import Callable, NamedTuple, Optional, Set
+
+from aqt import mw, gui_hooks
+
+# Beyond this share of changed entries a rebuild is cheaper than patching
+REBUILD_RATIO = 0.2
+
+
+class Changes(NamedTuple):
+    stale: bool         # rebuild from scratch (sync, undo, reset, profile switch)
+    cards: bool         # an operation changed cards: look at those modified since the last refresh
+    decks: bool         # an operation changed decks
+    answered: Set[int]  # keys of the cards answered since (see CardChanges)
+
+
+class CardChanges:
+    """
+    The changes a cache has not caught up with yet. answered_key maps an
+    answered card to the key the cache re-reads it by; without it answers
+    are not recorded.
+    """
+
+    def __init__(self, answered_key: Optional[Callable] = None):
+        self._answered_key = answered_key
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Forgets everything recorded; the cache is rebuilt on next use."""
+        with self._lock:
+            self._stale = True
+            self._cards = False
+            self._decks = False
+            self._answered = set()
+
+    def take(self) -> Changes:
+        """Returns the changes recorded so far and starts recording afresh."""
+        with self._lock:
+            changes = Changes(self._stale, self._cards, self._decks, self._answered)
+            self._stale = self._cards = self._decks = False
+            self._answered = set()
+        return changes
+
+    def catch_up(self, apply: Callable[[Changes], None]) -> None:
+        """Calls apply with the changes taken. If it fails, the cache is rebuilt next time."""
+        changes = self.take()
+        try:
+            apply(changes)
+        except Exception:
+            self.mark_stale()
+            raise
+
+    def mark_stale(self, *args) -> None:
+        with self._lock:
+            self._stale = True
+
+    def mark_cards_changed(self, *args) -> None:
+        with self._lock:
+            self._cards = True
+
+    def _on_card_answered(self, reviewer, card, ease) -> None:
+        with self._lock:
+            self._answered.add(self._answered_key(card))
+
+    def _on_operation_did_execute(self, changes, handler) -> None:
+        # Answering is a card-changing op started by the reviewer; the answered
+        # card is recorded by _on_card_answered. The reviewer's other ops that
+        # it starts itself (flags, marks) leave decks, queues and due days alone.
+        if handler is not None and handler is getattr(mw, "reviewer", None):
+            return
+        with self._lock:
+            if getattr(changes, "card", False):
+                self._cards = True
+            if getattr(changes, "deck", False):
+                self._decks = True
+
+    def register_hooks(self, reset: Callable) -> None:
+        """Records changes from Anki's hooks; reset is the cache's own, run when the profile closes."""
+        if self._answered_key is not None:
+            gui_hooks.reviewer_did_answer_card.append(self._on_card_answered)
+        gui_hooks.operation_did_execute.append(self._on_operation_did_execute)
+        gui_hooks.sync_did_finish.append(self.mark_stale)
+        if hasattr(gui_hooks, "state_did_undo"):
+            gui_hooks.state_did_undo.append(self.mark_stale)
+        # Legacy imports and other old code paths end with mw.reset()
+        if hasattr(gui_hooks, "state_did_reset"):
+            gui_hooks.state_did_reset.append(self.mark_stale)
+        gui_hooks.profile_will_close.append(reset)
@@ -1,6 +1,11 @@
+import atexit
 import copy
 import json
 import os
+import stat
+import tempfile
+import time
+from collections.abc import Mapping
 from aqt import mw
 
 # Default settings for the add-on
@@ -14,7 +19,12 @@ DEFAULTS = {
 
 # ... (I will use multi_replace to target specific areas)
 
+# Version of the settings file layout. Bump it together with a new entry in
+# the migration registry further down (see _MIGRATIONS).
+CONFIG_SCHEMA_VERSION = 6
+
 DEFAULTS = {
+    "schema_version": CONFIG_SCHEMA_VERSION,
     "userName": "USER",
     "statsTitle": "Today's Stats",
     "studyNowText": "Study Now",
@@ -113,6 +123,8 @@ DEFAULTS = {
     "heatmapShowWeekHeader": True,
     "heatmapDefaultView": "year",
     "heatmapWeekStart": "monday",
+    "heatmapShowOnOverview": False,
+    "heatmapRenderer": "dom",  # "dom" or "canvas" (year view drawn into a single canvas)
     "markerColors": {
         "red": "#FF4B4B",
         "blue": "#4488FF",
@@ -200,6 +212,7 @@ DEFAULTS = {
     "language": "English (Default)",
     "deck_indentation_mode": "default", # default, smaller, bigger, custom
     "deck_indentation_custom_px": 20, # px per level
+    "deckListVirtualizeAbove": 3000, # decks; larger deck lists only render the rows in view, 0 = never
     "onigiri_reviewer_btn_radius": 12, # px
     "onigiri_reviewer_btn_radius": 12, # px
     "onigiri_reviewer_btn_padding": 5, # px (affects size)
@@ -359,13 +372,19 @@ def get_config_id():
         config_id = mw.addonManager.addonFromModule(__name__)
     return config_id
 
+_user_files_dir = None
+
 def _get_settings_path() -> str:
     """Get the path to the profile-specific settings file."""
+    global _user_files_dir
     try:
-        # Calculate addon_path dynamically
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        user_files = os.path.join(current_dir, 'user_files')
-        os.makedirs(user_files, exist_ok=True)
+        # Calculate addon_path dynamically (only once, this runs on every get_config)
+        if _user_files_dir is None:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            user_files = os.path.join(current_dir, 'user_files')
+            os.makedirs(user_files, exist_ok=True)
+            _user_files_dir = user_files
+        user_files = _user_files_dir
         
         # Determine profile name
         if mw.col and mw.pm and mw.pm.name:
@@ -378,27 +397,284 @@ def _get_settings_path() -> str:
         print(f"Error determining settings path: {e}")
         return ""
 
+# --- Read-only Config View ---
+class _Sealed(dict):
+    """
+    A dict in the overrides layer that replaces the default wholesale instead of
+    being layered on top of it (see the archive exclusivity rule in _build_overrides).
+    """
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return ConfigView((value,))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ConfigView(Mapping):
+    """
+    Immutable, lazily-resolved view over layered config dicts (user overrides
+    first, then DEFAULTS). Nested dicts are resolved per key into further views,
+    so a lookup costs the same no matter how large DEFAULTS grows. Lists are
+    handed out as tuples.
+
+    Use to_dict() (or get_config()) to get a mutable copy for writing.
+    """
+    __slots__ = ("_layers",)
+
+    def __init__(self, layers):
+        self._layers = tuple(layers)
+
+    def __getitem__(self, key):
+        layers = self._layers
+        for index, layer in enumerate(layers):
+            if key not in layer:
+                continue
+            value = layer[key]
+            if not isinstance(value, dict):
+                return _freeze(value)
+            if isinstance(value, _Sealed):
+                return ConfigView((value,))
+            nested = [value]
+            for lower in layers[index + 1:]:
+                if key not in lower:
+                    continue
+                lower_value = lower[key]
+                if not isinstance(lower_value, dict):
+                    break
+                nested.append(lower_value)
+                if isinstance(lower_value, _Sealed):
+                    break
+            return ConfigView(nested)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return any(key in layer for layer in self._layers)
+
+    def __iter__(self):
+        if len(self._layers) == 1:
+            return iter(self._layers[0])
+        return iter(dict.fromkeys(key for layer in self._layers for key in layer))
+
+    def __len__(self):
+        if len(self._layers) == 1:
+            return len(self._layers[0])
+        return len(dict.fromkeys(key for layer in self._layers for key in layer))
+
+    def __repr__(self):
+        return f"ConfigView({self.to_dict()!r})"
+
+    def to_dict(self):
+        """Returns a mutable deep copy with all layers merged."""
+        merged = {}
+        for layer in reversed(self._layers):
+            _merge_layer(merged, layer)
+        return merged
+
+
+def _plain_copy(value):
+    """Deep copy that turns _Sealed dicts back into plain dicts."""
+    if isinstance(value, dict):
+        return {key: _plain_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain_copy(item) for item in value]
+    return value
+
+
+def _merge_layer(target, source):
+    """Like _merge_config, but copies values and honours _Sealed sections."""
+    for key, value in source.items():
+        if (
+            not isinstance(value, _Sealed)
+            and isinstance(value, dict)
+            and isinstance(target.get(key), dict)
+        ):
+            _merge_layer(target[key], value)
+        else:
+            target[key] = _plain_copy(value)
+
+
+# --- Config Change Events ---
+# Consumers that cache anything derived from settings subscribe to the key
+# paths they depend on instead of re-reading everything or using TTLs.
+# Paths are dotted ("markerColors.red"); Onigiri keys in mw.col.conf are
+# published under COLLECTION_KEY_PREFIX ("col.onigiri_favorite_decks").
+# ALL_KEYS is published when the whole config may have changed (profile switch).
+ALL_KEYS = "*"
+COLLECTION_KEY_PREFIX = "col."
+
+_subscribers = []  # [(key paths, callback)]
+_config_events_debug = os.environ.get("ONIGIRI_DEBUG_CONFIG_EVENTS") == "1"
+
+
+def subscribe(callback, *key_paths):
+    """
+    Calls `callback(changed_paths)` whenever a path at, above or below one of
+    `key_paths` changes. Without key paths the callback receives every change.
+    """
+    _subscribers.append((tuple(key_paths) or (ALL_KEYS,), callback))
+    return callback
+
+
+def unsubscribe(callback) -> None:
+    _subscribers[:] = [entry for entry in _subscribers if entry[1] is not callback]
+
+
+def set_config_events_debug(enabled: bool) -> None:
+    """Logs every subscriber that fires and how long it took."""
+    global _config_events_debug
+    _config_events_debug = bool(enabled)
+
+
+def _path_matches(key_path: str, changed_path: str) -> bool:
+    if key_path == ALL_KEYS or changed_path == ALL_KEYS or key_path == changed_path:
+        return True
+    # A change below a subscribed section, or to a section containing the subscribed key
+    return changed_path.startswith(key_path + ".") or key_path.startswith(changed_path + ".")
+
+
+def publish_config_change(changed_paths) -> None:
+    """Notifies the subscribers whose key paths overlap `changed_paths`."""
+    changed_paths = set(changed_paths)
+    if not changed_paths:
+        return
+    for key_paths, callback in list(_subscribers):
+        matched = {
+            changed for changed in changed_paths
+            if any(_path_matches(key_path, changed) for key_path in key_paths)
+        }
+        if not matched:
+            continue
+        started = time.perf_counter()
+        try:
+            callback(matched)
+        except Exception as e:
+            print(f"Onigiri: Config change subscriber {getattr(callback, '__qualname__', callback)} failed: {e}")
+        if _config_events_debug:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(
+                f"Onigiri: config event {sorted(matched)} -> "
+                f"{getattr(callback, '__module__', '?')}.{getattr(callback, '__qualname__', callback)} "
+                f"({elapsed_ms:.2f} ms)"
+            )
+
+
+def set_collection_conf(key: str, value) -> None:
+    """Stores an Onigiri key in mw.col.conf and publishes the change. Callers still call setMod()."""
+    mw.col.conf[key] = value
+    publish_config_change({COLLECTION_KEY_PREFIX + key})
+
+
+def _diff_paths(old, new, prefix=""):
+    """Dotted paths of the leaves that differ between two config mappings."""
+    changed = set()
+    for key in set(old) | set(new):
+        path = f"{prefix}{key}"
+        old_value = old.get(key)
+        new_value = new.get(key)
+        if isinstance(old_value, Mapping) and isinstance(new_value, Mapping):
+            changed |= _diff_paths(old_value, new_value, path + ".")
+        elif old_value != new_value:
+            changed.add(path)
+    return changed
+
+
+# --- Config Cache ---
+# get_config() is called on hot paths (deck rows, answered cards, webview
+# events), so the migrated user overrides are kept in memory as a ConfigView
+# and only rebuilt when the settings file changes on disk or the profile switches.
+_config_cache = {
+    "key": None,   # (settings path, mtime_ns, size) of the file the view came from
+    "view": None,  # ConfigView over (migrated user overrides, DEFAULTS)
+}
+
+
+def _get_file_signature(settings_path: str):
+    """Returns (path, mtime_ns, size) for the settings file; a missing file has no mtime or size."""
+    try:
+        st = os.stat(settings_path)
+    except OSError:
+        return (settings_path, None, None)
+    return (settings_path, st.st_mtime_ns, st.st_size)
+
+
+def invalidate_config_cache(*args):
+    """Drops the cached config so the next read reloads it from disk (pending writes are flushed first)."""
+    flush_config_writes()
+    had_view = _config_cache["view"] is not None
+    _config_cache["key"] = None
+    _config_cache["view"] = None
+    if had_view:
+        publish_config_change({ALL_KEYS})
+
+
+def _store_in_cache(settings_path: str, view) -> None:
+    if not settings_path:
+        invalidate_config_cache()
+        return
+    _config_cache["key"] = _get_file_signature(settings_path)
+    _config_cache["view"] = view
+
+
+def get_config_view():
+    """
+    Returns a read-only ConfigView of the current profile's configuration.
+    Cheap enough for hot paths; use get_config() when you intend to write.
+    """
+    settings_path = _get_settings_path()
+    cached = _config_cache["view"]
+    if cached is not None and settings_path:
+        # A pending write-behind makes the in-memory view newer than the file.
+        if _pending_write["path"] == settings_path:
+            return cached
+        if _config_cache["key"] == _get_file_signature(settings_path):
+            return cached
+
+    if settings_path and _pending_write["path"] == settings_path:
+        # A write that failed to flush is still newer than the file
+        user_config = _plain_copy(_pending_write["config"])
+    else:
+        user_config = _read_user_config(settings_path)
+        # (an empty config is a fresh profile: nothing to migrate, nothing to persist)
+        if user_config and migrate_user_config(user_config) and settings_path:
+            _write_settings_file(settings_path, user_config)
+        _persisted_configs[settings_path] = _plain_copy(user_config)
+    view = ConfigView((_build_overrides(user_config), DEFAULTS))
+    # The file changed underneath a cached view (e.g. edited or synced)
+    previous_key = _config_cache["key"]
+    previous_view = cached if previous_key and previous_key[0] == settings_path else None
+    _store_in_cache(settings_path, view)
+    if previous_view is not None:
+        publish_config_change(_diff_paths(previous_view, view))
+    return view
+
+
 def get_config():
     """
-    Loads the add-on's configuration from the profile-specific JSON file,
-    falling back to Anki's shared config for migration or defaults.
+    Returns a mutable copy of the add-on's configuration for the current profile.
+    Callers may modify it and pass it to write_config().
     """
-    # Start with a clean copy of the defaults
-    clean_config = copy.deepcopy(DEFAULTS)
+    return get_config_view().to_dict()
 
 
-    
-    # helper to merge dictionaries
-    def merge_config(target, source):
-        for key, value in source.items():
-            if key in target and isinstance(target[key], dict) and isinstance(value, dict):
-                merge_config(target[key], value)
-            else:
-                target[key] = value
+def _merge_config(target, source):
+    """Recursively merges source into target, with source winning on conflicts."""
+    for key, value in source.items():
+        if key in target and isinstance(target[key], dict) and isinstance(value, dict):
+            _merge_config(target[key], value)
+        else:
+            target[key] = value
+
 
+def _read_user_config(settings_path: str):
+    """
+    Loads the user's settings from the profile-specific JSON file,
+    falling back to Anki's shared config for migration.
+    """
     user_config = {}
-    settings_path = _get_settings_path()
-    
+
     # Try to load from profile specific file
     loaded_from_file = False
     if settings_path and os.path.exists(settings_path):
@@ -415,110 +691,308 @@ def get_config():
             legacy_config = mw.addonManager.getConfig(get_config_id())
             if legacy_config:
                 print(f"Migrating legacy settings to {settings_path}")
-                user_config = legacy_config
+                user_config = copy.deepcopy(legacy_config)
                 # Save immediately to establish the new file
-                try:
-                    with open(settings_path, 'w', encoding='utf-8') as f:
-                        json.dump(user_config, f, indent=2, ensure_ascii=False)
-                except Exception as e:
-                    print(f"Error saving migrated settings: {e}")
+                _write_settings_file(settings_path, user_config)
         except Exception as e:
             print(f"Error reading legacy config: {e}")
 
-    # Merge user settings into defaults
-    if user_config:
-        merge_config(clean_config, user_config)
-    
-    # Compatibility migrations (logic preserved from original)
-    custom_goals_conf = clean_config.get("achievements", {}).get("custom_goals", {})
-    if "last_modified_at" not in custom_goals_conf:
-        custom_goals_conf["last_modified_at"] = None
-        if "achievements" in clean_config:
-            clean_config["achievements"].setdefault("custom_goals", custom_goals_conf)
+    return user_config
+
+
+# --- Schema Migrations ---
+# Each step upgrades a raw settings file (the user's overrides, not the merged
+# config) from version N-1 to N. Steps run exactly once per settings file, in
+# order, and the result is persisted with the new "schema_version", so
+# steady-state loads do no migration work at all. Steps that read mw.col.conf
+# need the collection: the settings are often loaded before it is open, and
+# the chain then stops short of such a step (and the version stays below it)
+# until a load with the collection open.
+_MIGRATIONS = []
+
+
+def _migration(version, needs_collection=False):
+    """Registers a migration step that upgrades the settings file to `version`."""
+    def register(func):
+        _MIGRATIONS.append((version, func, needs_collection))
+        _MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
 
+@_migration(1)
+def _migrate_legacy_sections(user_config):
+    """Moves the old "gamification" section to "achievements"."""
     if "gamification" in user_config and "achievements" not in user_config:
-        clean_config["achievements"] = copy.deepcopy(user_config["gamification"])
+        user_config["achievements"] = copy.deepcopy(user_config["gamification"])
 
-    # Compatibility: Check for old profile page visibility settings and migrate them
-    # This ensures users updating the addon don't lose their settings
-    if "showHeatmapOnProfile" not in user_config:
-         if mw.col and "onigiri_profile_show_stats" in mw.col.conf:
-            clean_config["showHeatmapOnProfile"] = mw.col.conf.get("onigiri_profile_show_stats", True)
-        
-    # Compatibility: Migrate restaurant_level and daily_special from achievements to top-level
-    if "achievements" in clean_config:
-        achievements_conf = clean_config["achievements"]
-        
-        # Migrate restaurant_level
-        if "restaurant_level" in achievements_conf:
-            clean_config["restaurant_level"] = achievements_conf["restaurant_level"]
-            del achievements_conf["restaurant_level"]
-            
-        # Migrate daily_special
-        if "daily_special" in achievements_conf:
-            clean_config["daily_special"] = achievements_conf["daily_special"]
-            del achievements_conf["daily_special"]
-
-    # FORCE CLEANUP: Remove taiyaki_coins from config if present
-    # It is now stored exclusively in gamification.json
-    if "restaurant_level" in clean_config:
-        if "taiyaki_coins" in clean_config["restaurant_level"]:
-            del clean_config["restaurant_level"]["taiyaki_coins"]
-
-    # --- NEW FIX: Enforce Archive Exclusivity ---
-    # Ensure items in 'archive' are NOT in 'grid'. The merge process might have
-    # kept default grid positions for items the user wanted to archive.
-    layout_conf = clean_config.get("onigiriWidgetLayout", {})
-    if "grid" in layout_conf and "archive" in layout_conf:
-        grid_conf = layout_conf["grid"]
-        archive_conf = layout_conf["archive"]
-        
-        # Get set of archived IDs
-        if isinstance(archive_conf, dict):
-            archived_ids = set(archive_conf.keys())
-        elif isinstance(archive_conf, list):
-            archived_ids = set(archive_conf)
-        else:
-            archived_ids = set()
-            
-        # Remove them from grid
-        for widget_id in archived_ids:
-            if widget_id in grid_conf:
-                del grid_conf[widget_id]
-    # --------------------------------------------
-
-    # --- NEW: Sidebar Gamification Button Migration ---
-    # Ensure "gamification" is in the visible list if not present anywhere
-    sidebar_conf = clean_config.setdefault("sidebarButtonLayout", {"visible": [], "archived": []})
-    visible_btns = sidebar_conf.get("visible", [])
+
+@_migration(2)
+def _migrate_achievements_subsections(user_config):
+    """Moves restaurant_level and daily_special from achievements to the top level."""
+    achievements_conf = user_config.get("achievements")
+    if not isinstance(achievements_conf, dict):
+        return
+    if "restaurant_level" in achievements_conf:
+        user_config["restaurant_level"] = achievements_conf.pop("restaurant_level")
+    if "daily_special" in achievements_conf:
+        user_config["daily_special"] = achievements_conf.pop("daily_special")
+
+
+@_migration(3)
+def _migrate_strip_taiyaki_coins(user_config):
+    """Taiyaki coins are stored exclusively in gamification.json now."""
+    restaurant_conf = user_config.get("restaurant_level")
+    if isinstance(restaurant_conf, dict):
+        restaurant_conf.pop("taiyaki_coins", None)
+
+
+@_migration(4)
+def _migrate_archive_exclusivity(user_config):
+    """Removes archived widgets from the saved grid layout."""
+    layout_conf = user_config.get("onigiriWidgetLayout")
+    if not isinstance(layout_conf, dict):
+        return
+    grid_conf = layout_conf.get("grid")
+    if isinstance(grid_conf, dict):
+        for widget_id in _archived_widget_ids(layout_conf.get("archive")):
+            grid_conf.pop(widget_id, None)
+
+
+@_migration(5)
+def _migrate_sidebar_gamification_button(user_config):
+    """Adds the gamification button to a saved sidebar layout that predates it."""
+    sidebar_conf = user_config.get("sidebarButtonLayout")
+    if not isinstance(sidebar_conf, dict):
+        return
     archived_btns = sidebar_conf.get("archived", [])
-    
+    if "visible" not in sidebar_conf:
+        # An empty list would hide every default button; start from the defaults
+        sidebar_conf["visible"] = [
+            btn for btn in DEFAULTS["sidebarButtonLayout"]["visible"] if btn not in archived_btns
+        ]
+    visible_btns = sidebar_conf["visible"]
     if "gamification" not in visible_btns and "gamification" not in archived_btns:
         # Insert before "more" if more exists, else append
         if "more" in visible_btns:
-            idx = visible_btns.index("more")
-            visible_btns.insert(idx, "gamification")
+            visible_btns.insert(visible_btns.index("more"), "gamification")
         else:
             visible_btns.append("gamification")
-    # --------------------------------------------------
 
-    return clean_config
+
+@_migration(6, needs_collection=True)
+def _migrate_profile_stats_toggle(user_config):
+    """Moves the old profile page toggle from mw.col.conf into the settings."""
+    # Version 1 did this too, but stamped the file even when the collection
+    # was not open yet; running it again is harmless.
+    if "showHeatmapOnProfile" not in user_config and "onigiri_profile_show_stats" in mw.col.conf:
+        user_config["showHeatmapOnProfile"] = mw.col.conf.get("onigiri_profile_show_stats", True)
+
+
+def migrate_user_config(user_config) -> bool:
+    """
+    Runs every pending migration step on a raw settings dict in place and stamps
+    it with the version reached: CONFIG_SCHEMA_VERSION, or the version before
+    the first step that needs a collection while none is open. Returns True if
+    the dict was upgraded.
+    """
+    try:
+        current_version = int(user_config.get("schema_version", 0))
+    except (TypeError, ValueError):
+        current_version = 0
+    if current_version >= CONFIG_SCHEMA_VERSION:
+        return False
+
+    reached = current_version
+    for version, step, needs_collection in _MIGRATIONS:
+        if version <= current_version:
+            continue
+        if needs_collection and not mw.col:
+            break
+        step(user_config)
+        reached = version
+    if reached == current_version:
+        return False
+    user_config["schema_version"] = reached
+    return True
+
+
+def _archived_widget_ids(archive_conf):
+    if isinstance(archive_conf, Mapping):
+        return set(archive_conf.keys())
+    if isinstance(archive_conf, (list, tuple)):
+        return set(archive_conf)
+    return set()
+
+
+def _build_overrides(user_config):
+    """
+    Turns a migrated settings dict into the overrides layer that sits on top of DEFAULTS.
+    """
+    overrides = user_config if isinstance(user_config, dict) else {}
+
+    # Enforce Archive Exclusivity: layering over the defaults would bring back
+    # default grid positions for widgets the user archived, so such a grid is
+    # sealed with the archived widgets left out. This is not a migration, it
+    # depends on DEFAULTS, but it only runs when the settings file changes.
+    layout_view = ConfigView((overrides, DEFAULTS)).get("onigiriWidgetLayout", {})
+    if "grid" in layout_view and "archive" in layout_view:
+        grid_view = layout_view["grid"]
+        archived_ids = _archived_widget_ids(layout_view["archive"])
+        if isinstance(grid_view, Mapping) and archived_ids.intersection(grid_view):
+            grid_conf = grid_view.to_dict()
+            for widget_id in archived_ids:
+                grid_conf.pop(widget_id, None)
+            layout_conf = overrides.get("onigiriWidgetLayout")
+            if not isinstance(layout_conf, dict):
+                layout_conf = overrides["onigiriWidgetLayout"] = {}
+            layout_conf["grid"] = _Sealed(grid_conf)
+
+    return overrides
+
+
+def _write_settings_file(settings_path: str, user_config) -> bool:
+    """
+    Atomically replaces the settings file: the JSON goes to a temp file in the
+    same folder first, so a crash mid-write never leaves a truncated file behind.
+    """
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            prefix=".settings_", suffix=".tmp", dir=os.path.dirname(settings_path)
+        )
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(user_config, f, indent=2, ensure_ascii=False)
+        # mkstemp creates the file as 0600; keep the permissions the settings file had
+        try:
+            mode = stat.S_IMODE(os.stat(settings_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, settings_path)
+        return True
+    except Exception as e:
+        print(f"Error writing settings to {settings_path}: {e}")
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        return False
+
+
+# --- Write-behind ---
+# Settings dialogs and the restaurant level call write_config() in bursts, so
+# writes update the cache immediately and reach the disk once per burst.
+_WRITE_DELAY_MS = 400
+
+_pending_write = {
+    "path": None,    # settings file the pending config belongs to
+    "config": None,  # migrated settings dict waiting to be written
+    "timer": None,   # QTimer driving the delayed flush
+}
+
+# Last content known to be on disk per settings file, to skip no-op writes
+_persisted_configs = {}
+
+
+def _changed_keys(old_config, new_config):
+    """Top-level keys whose values differ between two settings dicts."""
+    if not isinstance(old_config, dict):
+        return set(new_config)
+    keys = set(old_config) | set(new_config)
+    return {key for key in keys if old_config.get(key) != new_config.get(key)}
+
+
+def _schedule_flush() -> None:
+    timer = _pending_write["timer"]
+    if timer is None:
+        try:
+            from aqt.qt import QTimer
+            timer = QTimer()
+            timer.setSingleShot(True)
+            timer.timeout.connect(flush_config_writes)
+        except Exception:
+            # No Qt event loop to defer to, write right away
+            flush_config_writes()
+            return
+        _pending_write["timer"] = timer
+    # Restarting the timer coalesces a burst of writes into one
+    timer.start(_WRITE_DELAY_MS)
+
+
+def flush_config_writes(*args) -> None:
+    """Writes any pending config to disk now. Safe to call when nothing is pending."""
+    timer = _pending_write["timer"]
+    if timer is not None:
+        timer.stop()
+
+    settings_path = _pending_write["path"]
+    user_config = _pending_write["config"]
+    if not settings_path or user_config is None:
+        return
+
+    if not _write_settings_file(settings_path, user_config):
+        # Stays pending: the next write, profile switch or exit tries again
+        return
+    _pending_write["path"] = None
+    _pending_write["config"] = None
+    _persisted_configs[settings_path] = user_config
+    if _config_cache["view"] is not None and _get_settings_path() == settings_path:
+        _config_cache["key"] = _get_file_signature(settings_path)
 
 
 def write_config(config):
     """
-    Saves the provided configuration dictionary to the profile-specific JSON file.
+    Saves the provided configuration dictionary for the current profile.
+    The in-memory cache is updated right away; the file is written atomically
+    a moment later, coalescing bursts of writes, and skipped if nothing changed.
     """
     settings_path = _get_settings_path()
     if settings_path:
-        try:
-            with open(settings_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error writing settings to {settings_path}: {e}")
+        # Don't let a pending write for another profile be overwritten
+        if _pending_write["path"] not in (None, settings_path):
+            flush_config_writes()
+            if _pending_write["path"] not in (None, settings_path):
+                # There is one pending slot; the other profile's file still can't be written
+                print(f"Onigiri: Dropping unsaved settings for {_pending_write['path']}")
+
+        user_config = _plain_copy(config)
+        migrate_user_config(user_config)
+        baseline = (
+            _pending_write["config"]
+            if _pending_write["path"] == settings_path
+            else _persisted_configs.get(settings_path)
+        )
+        if not _changed_keys(baseline, user_config):
+            return
+
+        previous_key = _config_cache["key"]
+        previous_view = _config_cache["view"] if previous_key and previous_key[0] == settings_path else None
+        view = ConfigView((_build_overrides(_plain_copy(user_config)), DEFAULTS))
+        _pending_write["path"] = settings_path
+        _pending_write["config"] = user_config
+        _store_in_cache(settings_path, view)
+        _schedule_flush()
+
+        if previous_view is None:
+            publish_config_change({ALL_KEYS})
+        else:
+            publish_config_change(_diff_paths(previous_view, view))
             
     # Optional: We could also write to Anki's config as a backup, 
     # but we want to simulate isolation, so maybe better not to, 
     # or obscure it to avoid confusion in the Add-on Config dialog.
     # For user clarity, let's NOT write to the shared config.
     # mw.addonManager.writeConfig(get_config_id(), config)
+
+
+# Profile switches point get_config() at a different settings file (invalidating
+# flushes pending writes first). Exiting Anki closes the profile; atexit is a backstop.
+atexit.register(flush_config_writes)
+try:
+    from aqt import gui_hooks
+    gui_hooks.profile_will_close.append(invalidate_config_cache)
+    gui_hooks.profile_did_open.append(invalidate_config_cache)
+except Exception:
+    pass
@@ -0,0 +1,167 @@
+"""
+Onigiri's per-deck data from mw.col.conf (favorites, marks, custom icons and
+the custom deck order), indexed for lookups by deck id.
+
+mw.col.conf decodes a key on every read, and the deck list used to read these
+keys per render and scan the favorites list per row. The index is loaded once
+per collection and dropped whenever one of its keys is published as changed
+(config.set_collection_conf), after a sync or on a profile switch. Writes go
+through the functions below, which update the index in place and then store
+the key in mw.col.conf. Deck ids are strings throughout, as in mw.col.conf.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from aqt import mw
+from . import config
+
+FAVORITES_KEY = "onigiri_favorite_decks"
+MARKS_KEY = "onigiri_deck_marks"
+CUSTOM_ORDER_KEY = "onigiri_custom_deck_order"
+ICONS_KEY = "onigiri_custom_deck_icons"
+
+MAX_FAVORITES = 10
+MARK_KEYS = ("red", "blue", "green", "yellow")
+
+
+class DeckMetaIndex:
+    """Lookups over the per-deck keys of one collection's conf."""
+
+    __slots__ = ("favorite_list", "favorites", "marks", "custom_order", "icons")
+
+    def __init__(self, conf):
+        # Favorites in the order they were added, as the widget lists them
+        self.favorite_list: List[str] = [str(did) for did in conf.get(FAVORITES_KEY, []) or []]
+        self.favorites = set(self.favorite_list)
+        self.marks: Dict[str, str] = {
+            str(did): mark for did, mark in (conf.get(MARKS_KEY, {}) or {}).items() if mark
+        }
+        # deck id -> position in the custom order
+        self.custom_order: Dict[str, int] = {
+            str(did): index for index, did in enumerate(conf.get(CUSTOM_ORDER_KEY, []) or [])
+        }
+        self.icons: Dict[str, dict] = {
+            str(did): data for did, data in (conf.get(ICONS_KEY, {}) or {}).items() if isinstance(data, dict)
+        }
+
+    def is_favorite(self, deck_id) -> bool:
+        return str(deck_id) in self.favorites
+
+    def mark(self, deck_id) -> Optional[str]:
+        return self.marks.get(str(deck_id))
+
+    def custom_position(self, deck_id, default: int = 10**9) -> int:
+        return self.custom_order.get(str(deck_id), default)
+
+    def icon(self, deck_id) -> dict:
+        return self.icons.get(str(deck_id), {})
+
+
+_index = {
+    "col": None,      # collection the index was loaded from
+    "meta": None,     # DeckMetaIndex, None to reload
+    "writing": None,  # key being stored by this module (its change event is not a reason to reload)
+    "generation": 0,  # bumped on every load and write, for caches derived from the index
+}
+
+
+def get_deck_meta() -> DeckMetaIndex:
+    """The index for the current collection (loaded on first use)."""
+    if _index["meta"] is None or _index["col"] is not mw.col:
+        _index.update(col=mw.col, meta=DeckMetaIndex(mw.col.conf))
+        _index["generation"] += 1
+    return _index["meta"]
+
+
+def get_meta_generation() -> int:
+    """Changes whenever anything in the index may have changed."""
+    get_deck_meta()
+    return _index["generation"]
+
+
+def _store(key: str, value) -> None:
+    _index["generation"] += 1
+    _index["writing"] = key
+    try:
+        config.set_collection_conf(key, value)
+    finally:
+        _index["writing"] = None
+    mw.col.setMod()
+
+
+def toggle_favorite(deck_id) -> Optional[bool]:
+    """Adds or removes a favorite. Returns whether it is one now, or None if the list is full."""
+    meta = get_deck_meta()
+    did = str(deck_id)
+    if did in meta.favorites:
+        meta.favorite_list.remove(did)
+        meta.favorites.discard(did)
+    elif len(meta.favorite_list) >= MAX_FAVORITES:
+        return None
+    else:
+        meta.favorite_list.append(did)
+        meta.favorites.add(did)
+    _store(FAVORITES_KEY, list(meta.favorite_list))
+    return did in meta.favorites
+
+
+def set_favorites(deck_ids: Iterable) -> None:
+    """Replaces the favorites, keeping the given order."""
+    meta = get_deck_meta()
+    meta.favorite_list = list(dict.fromkeys(str(did) for did in deck_ids))
+    meta.favorites = set(meta.favorite_list)
+    _store(FAVORITES_KEY, list(meta.favorite_list))
+
+
+def set_mark(deck_id, mark: Optional[str]) -> None:
+    """Marks a deck with one of MARK_KEYS; anything else clears its mark."""
+    meta = get_deck_meta()
+    did = str(deck_id)
+    if mark in MARK_KEYS:
+        meta.marks[did] = mark
+    elif meta.marks.pop(did, None) is None:
+        return
+    _store(MARKS_KEY, dict(meta.marks))
+
+
+def set_custom_order(deck_ids: Iterable) -> None:
+    meta = get_deck_meta()
+    order = [str(did) for did in deck_ids]
+    meta.custom_order = {did: index for index, did in enumerate(order)}
+    _store(CUSTOM_ORDER_KEY, order)
+
+
+def set_deck_icon(deck_id, icon: str, color: str) -> None:
+    meta = get_deck_meta()
+    meta.icons[str(deck_id)] = {"icon": icon, "color": color}
+    _store(ICONS_KEY, {did: dict(data) for did, data in meta.icons.items()})
+
+
+def clear_deck_icon(deck_id) -> None:
+    meta = get_deck_meta()
+    if meta.icons.pop(str(deck_id), None) is not None:
+        _store(ICONS_KEY, {did: dict(data) for did, data in meta.icons.items()})
+
+
+def reset(*args) -> None:
+    """Reloads the index on next use (sync, profile switch)."""
+    _index.update(col=None, meta=None)
+
+
+def _on_conf_changed(changed_paths) -> None:
+    if _index["writing"] and changed_paths == {config.COLLECTION_KEY_PREFIX + _index["writing"]}:
+        return
+    _index["meta"] = None
+
+
+config.subscribe(
+    _on_conf_changed,
+    *(config.COLLECTION_KEY_PREFIX + key for key in (FAVORITES_KEY, MARKS_KEY, CUSTOM_ORDER_KEY, ICONS_KEY)),
+)
+
+try:
+    from aqt import gui_hooks
+    gui_hooks.sync_did_finish.append(reset)
+    gui_hooks.profile_will_close.append(reset)
+except Exception:
+    pass
@@ -0,0 +1,156 @@
+"""
+Card counts per deck for the enhanced deck stats: total, new, learn, review,
+suspended and buried cards.
+
+The counts are built with a single query once per scheduler day (and after a
+sync, an undo, a reset or a collection switch) and then kept up to date. An
+answered card's deck is counted again by itself. When another operation
+changes cards, only the decks holding cards modified since the last refresh
+are counted again. A card that left a deck or was deleted leaves
+no modified row behind in that deck, but it leaves the cached total above the
+collection's card count, so the counts are rebuilt then. Every deck's counts
+include its subdecks; they are rolled up in memory from each deck's own cards
+and adjusted along the ancestors when a deck is counted again. The changes
+are recorded by card_changes.
+"""
+
+import time
+from typing import Dict, Iterable
+
+from aqt import mw
+from .card_changes import REBUILD_RATIO, CardChanges, Changes
+
+_STAT_KEYS = ("total", "buried", "suspended", "new", "learn", "review")
+# queue -> position in _STAT_KEYS (total is counted for every queue)
+_QUEUE_STATS = {-3: 1, -2: 1, -1: 2, 0: 3, 1: 4, 3: 4, 2: 5}
+
+_state = {
+    "col": None,              # collection the counts belong to
+    "today": None,            # scheduler day they were built on
+    "own": {},                # {deck id: [counts in _STAT_KEYS order]} of the deck's own cards
+    "card_count": 0,          # sum of the own totals
+    "parents": None,          # {deck id: parent deck id}
+    "rolled": {},             # {deck id: {stat: count}} including subdecks
+    "mod_watermark": 0,       # cards modified at or after this (seconds) may not be counted yet
+}
+
+# An answered card's deck is counted again
+_changes = CardChanges(answered_key=lambda card: card.did)
+
+
+def _count(rows) -> Dict[int, list]:
+    own = {}
+    for deck_id, queue, count in rows:
+        counts = own.get(deck_id)
+        if counts is None:
+            counts = own[deck_id] = [0] * len(_STAT_KEYS)
+        counts[0] += count
+        stat = _QUEUE_STATS.get(queue)
+        if stat is not None:
+            counts[stat] += count
+    return own
+
+
+def _load_parents() -> None:
+    ids = {d.name: int(d.id) for d in mw.col.decks.all_names_and_ids()}
+    parents = {}
+    for name, deck_id in ids.items():
+        if "::" in name:
+            parent_id = ids.get(name.rsplit("::", 1)[0])
+            if parent_id is not None:
+                parents[deck_id] = parent_id
+    _state["parents"] = parents
+
+
+def _add(deck_id: int, delta) -> None:
+    """Adds a deck's change in own counts to it and its ancestors."""
+    rolled = _state["rolled"]
+    parents = _state["parents"]
+    while deck_id is not None:
+        stats = rolled.get(deck_id)
+        if stats is None:
+            stats = rolled[deck_id] = dict.fromkeys(_STAT_KEYS, 0)
+        for key, change in zip(_STAT_KEYS, delta):
+            stats[key] += change
+        if not stats["total"]:
+            del rolled[deck_id]
+        deck_id = parents.get(deck_id)
+
+
+def _roll_up() -> None:
+    _state["rolled"] = {}
+    for deck_id, counts in _state["own"].items():
+        _add(deck_id, counts)
+
+
+def _rebuild(today: int) -> None:
+    mod_watermark = int(time.time()) - 1
+    own = _count(mw.col.db.all("SELECT did, queue, count() FROM cards GROUP BY did, queue"))
+    _state.update(
+        col=mw.col,
+        today=today,
+        own=own,
+        card_count=sum(counts[0] for counts in own.values()),
+        mod_watermark=mod_watermark,
+    )
+    _load_parents()
+    _roll_up()
+
+
+def _recount(deck_ids: Iterable[int]) -> None:
+    ids = ",".join(str(int(deck_id)) for deck_id in deck_ids)
+    own = _state["own"]
+    fresh = _count(mw.col.db.all(f"SELECT did, queue, count() FROM cards WHERE did IN ({ids}) GROUP BY did, queue"))
+    zero = [0] * len(_STAT_KEYS)
+    for deck_id in deck_ids:
+        old = own.pop(deck_id, zero)
+        new = fresh.get(deck_id, zero)
+        if new is not zero:
+            own[deck_id] = new
+        if old != new:
+            _state["card_count"] += new[0] - old[0]
+            _add(deck_id, [n - o for n, o in zip(new, old)])
+
+
+def _refresh(changes: Changes) -> None:
+    today = mw.col.sched.today
+    if changes.stale or _state["col"] is not mw.col or _state["today"] != today:
+        _rebuild(today)
+        return
+
+    if changes.decks:
+        _load_parents()
+        _roll_up()
+    if changes.cards:
+        mod_watermark = int(time.time()) - 1
+        deck_ids = set(mw.col.db.list("SELECT DISTINCT did FROM cards WHERE mod >= ?", _state["mod_watermark"]))
+        if len(deck_ids) > REBUILD_RATIO * max(len(_state["own"]), 1):
+            _rebuild(today)
+            return
+        if deck_ids:
+            _recount(deck_ids)
+        _state["mod_watermark"] = mod_watermark
+        # Decks that lost cards were not counted again and still hold them
+        if mw.col.db.scalar("SELECT count() FROM cards") != _state["card_count"]:
+            _rebuild(today)
+    elif changes.answered:
+        # Answering moves a card between queues, never between decks
+        _recount(changes.answered)
+
+
+def get_deck_stats() -> Dict[int, Dict[str, int]]:
+    """
+    Returns {deck id: {stat: cards}} for every deck with cards in it or in
+    its subdecks, with the stats in _STAT_KEYS. The dicts are the cache's
+    own and must not be changed.
+    """
+    _changes.catch_up(_refresh)
+    return _state["rolled"]
+
+
+def reset(*args) -> None:
+    _state.update(col=None, today=None, own={}, card_count=0, parents=None, rolled={})
+    _changes.clear()
+
+
+_changes.register_hooks(reset)
@@ -1,24 +1,64 @@
 # In deck_tree_updater.py
+import copy
 import json
 from aqt import mw
 from aqt.deckbrowser import DeckBrowser, RenderDeckNodeContext
 from anki.decks import DeckId
-from . import onigiri_renderer
+from . import config, deck_meta, onigiri_renderer
+
+
+# --- Tree View Cache ---
+# The deck list shows the tree sorted by the sort menu's mode and filtered
+# by the favorites/marked filters. The lowered leaf name and parent of every
+# deck are computed once per stored deck tree, and the decks a filter keeps
+# once per filter and deck metadata generation. A render tree gets its view
+# applied once; when the view changes, it is applied to a new copy of the
+# stored tree (sorting and filtering change a tree in place).
+_tree_view = {
+    "generation": None,  # stored tree generation the keys below belong to
+    "leaf_names": {},    # deck id -> lowered leaf name
+    "parents": {},       # deck id -> parent deck id (top-level decks have none)
+    "kept": {},          # (favorites only, marked only, meta generation) -> deck ids the filter keeps
+    "tree": None,        # render tree the view was last applied to
+    "key": None,         # the view it got
+}
+
+
+def _collect_view_keys(nodes, parent_id, leaf_names, parents) -> None:
+    for node in nodes:
+        leaf_names[node.deck_id] = node.name.split("::")[-1].lower()
+        if parent_id is not None:
+            parents[node.deck_id] = parent_id
+        if node.children:
+            _collect_view_keys(node.children, node.deck_id, leaf_names, parents)
+
+
+def _view_keys(tree_data) -> None:
+    """Computes the sort keys for the stored tree's generation, once."""
+    if _tree_view["generation"] == _deck_tree["tree_generation"]:
+        return
+    # From the stored tree: a render tree may already have been filtered
+    source = _deck_tree["tree"] if _deck_tree["tree"] is not None else tree_data
+    leaf_names = {}
+    parents = {}
+    _collect_view_keys(source.children, None, leaf_names, parents)
+    _tree_view.update(generation=_deck_tree["tree_generation"], leaf_names=leaf_names, parents=parents, kept={})
 
 
-def _sort_tree_nodes(nodes, sort_mode):
+def _sort_tree_nodes(nodes, sort_mode, meta) -> None:
     """Sort deck tree nodes in-place for fast sidebar-only refreshes."""
     if not sort_mode or sort_mode == "default":
         return
 
-    favorites = {str(did) for did in mw.col.conf.get("onigiri_favorite_decks", [])}
-    custom_order = {
-        str(did): index
-        for index, did in enumerate(mw.col.conf.get("onigiri_custom_deck_order", []))
-    }
+    leaf_names = _tree_view["leaf_names"]
+    favorites = meta.favorites
+    custom_order = meta.custom_order
 
     def leaf_name(node):
-        return node.name.split("::")[-1].lower()
+        name = leaf_names.get(node.deck_id)
+        if name is None:
+            name = leaf_names[node.deck_id] = node.name.split("::")[-1].lower()
+        return name
 
     if sort_mode == "alphabetical_az":
         nodes.sort(key=leaf_name)
@@ -36,140 +76,524 @@ def _sort_tree_nodes(nodes, sort_mode):
         nodes.sort(key=lambda node: (custom_order.get(str(node.deck_id), 10**9), leaf_name(node)))
 
 
-def _apply_sort_recursive(nodes, sort_mode):
-    _sort_tree_nodes(nodes, sort_mode)
+def _apply_sort_recursive(nodes, sort_mode, meta):
+    _sort_tree_nodes(nodes, sort_mode, meta)
     for node in nodes:
         if node.children:
-            _apply_sort_recursive(node.children, sort_mode)
+            _apply_sort_recursive(node.children, sort_mode, meta)
+
+
+def _kept_by_filter(show_favorites_only: bool, show_marked_only: bool, meta, meta_generation: int):
+    """Deck ids the deck list filters keep: matching decks and their ancestors."""
+    key = (show_favorites_only, show_marked_only, meta_generation)
+    kept = _tree_view["kept"].get(key)
+    if kept is not None:
+        return kept
 
+    if show_favorites_only and show_marked_only:
+        matching = meta.favorites.intersection(meta.marks)
+    elif show_favorites_only:
+        matching = meta.favorites
+    else:
+        matching = meta.marks
+    leaf_names = _tree_view["leaf_names"]
+    parents = _tree_view["parents"]
+    kept = set()
+    for did_str in matching:
+        try:
+            did = int(did_str)
+        except ValueError:
+            continue
+        if did not in leaf_names:
+            continue  # not in the tree (deleted)
+        while did is not None and did not in kept:
+            kept.add(did)
+            did = parents.get(did)
+    # Only the current metadata generation can be asked for again
+    _tree_view["kept"] = {key: kept}
+    return kept
+
+
+def _prune_nodes(nodes, kept) -> None:
+    kept_nodes = []
+    for node in nodes:
+        if node.deck_id in kept:
+            # Children first: with protobuf trees, extend() below copies the nodes
+            if node.children:
+                _prune_nodes(node.children, kept)
+            kept_nodes.append(node)
+    if len(kept_nodes) != len(nodes):
+        del nodes[:]
+        nodes.extend(kept_nodes)
 
-def _apply_active_filters(tree_data) -> None:
-    """Apply Onigiri deck list filters while preserving matching descendants."""
+
+def _view_key():
     show_favorites_only = bool(
         mw.col.conf.get("onigiri_show_favourites", False)
         or mw.col.conf.get("onigiri_show_favorites", False)
     )
     show_marked_only = bool(mw.col.conf.get("onigiri_show_marked", False))
+    sort_mode = mw.col.conf.get("onigiri_sort_mode", "default")
+    return (_deck_tree["tree_generation"], sort_mode, show_favorites_only, show_marked_only, deck_meta.get_meta_generation())
+
+
+def _apply_tree_preferences(tree_data, key) -> None:
+    """Sorts and filters tree_data in place for the view in key (see _view_key)."""
+    _view_keys(tree_data)
+    _generation, sort_mode, show_favorites_only, show_marked_only, meta_generation = key
+    meta = deck_meta.get_deck_meta()
+    if sort_mode != "default":
+        _apply_sort_recursive(tree_data.children, sort_mode, meta)
+    if show_favorites_only or show_marked_only:
+        try:
+            _prune_nodes(tree_data.children, _kept_by_filter(show_favorites_only, show_marked_only, meta, meta_generation))
+        except Exception as e:
+            print(f"Onigiri: Could not apply deck list filter: {e}")
+    _tree_view.update(tree=tree_data, key=key)
+
+
+def _view_tree(deck_browser: DeckBrowser):
+    """The deck browser's tree, with Onigiri's sort and filter preferences applied."""
+    key = _view_key()
+    render_data = getattr(deck_browser, "_render_data", None)
+    tree_data = render_data.tree if render_data and getattr(render_data, "tree", None) else None
+    if tree_data is not None and tree_data is _tree_view["tree"]:
+        if _tree_view["key"] == key:
+            return tree_data
+        # Sorted or filtered for another view: start again from the stored tree
+        tree_data = copy.deepcopy(_deck_tree["tree"]) if _deck_tree["tree"] is not None else None
+        if tree_data is not None:
+            deck_browser._render_data = onigiri_renderer.RenderData(tree=tree_data)
+    if tree_data is None:
+        tree_data = deck_tree_for_render(deck_browser)
+        deck_browser._render_data = onigiri_renderer.RenderData(tree=tree_data)
+        key = _view_key()  # a first fetch moves the tree generation
+    _apply_tree_preferences(tree_data, key)
+    return tree_data
+
+# What the deck list in the webview currently shows: one (deck id, row html)
+# pair per <tr>, in order. Updates are sent as row-level patches against it;
+# the version lets the page detect that it is showing something else.
+# The page collapses decks by hiding rows, so the subdecks of decks in
+# "loaded" are on the page (hidden) even though the deck is collapsed.
+# "virtual" is set when the page got the rows as data for a virtual list
+# (see render_deck_list_for_page).
+_sent_tree = {"version": 0, "rows": None, "loaded": set(), "virtual": False}
+
+# Beyond this many inserted or changed rows, replacing the tbody is cheaper
+_MAX_PATCHED_ROWS = 200
+
+
+def _render_rows(deck_browser: DeckBrowser, nodes, ctx, rows, loaded=()) -> None:
+    """Appends the rows of nodes and their expanded descendants (and those of decks in loaded)."""
+    from . import patcher
+    for node in nodes:
+        did = str(node.deck_id)
+        rows.append((did, patcher._onigiri_render_deck_row(deck_browser, node, ctx)))
+        if node.children and (not node.collapsed or did in loaded):
+            _render_rows(deck_browser, node.children, ctx, rows, loaded)
+
+
+def _find_node(nodes, did: int):
+    for node in nodes:
+        if node.deck_id == did:
+            return node
+        if node.children:
+            found = _find_node(node.children, did)
+            if found is not None:
+                return found
+    return None
+
+
+def _render_deck_tree_rows(deck_browser: DeckBrowser):
+    """The deck list rows, with Onigiri's sort and filter preferences applied."""
+    tree_data = _view_tree(deck_browser)
+    ctx = RenderDeckNodeContext(current_deck_id=deck_browser.mw.col.decks.get_current_id())
+    rows = []
+    _render_rows(deck_browser, tree_data.children, ctx, rows, _sent_tree["loaded"])
+    return rows
+
+
+def _remember_sent_rows(rows) -> int:
+    _sent_tree["version"] += 1
+    _sent_tree["rows"] = rows
+    return _sent_tree["version"]
+
+
+def get_sent_tree_version() -> int:
+    """Version of the deck list last rendered, for the page's initial state."""
+    return _sent_tree["version"]
+
 
-    if not show_favorites_only and not show_marked_only:
+def forget_sent_rows(*args) -> None:
+    """The next update replaces the whole deck list."""
+    _sent_tree["rows"] = None
+
+
+def _render_deck_tree_html_only(deck_browser: DeckBrowser) -> str:
+    """
+    Renders just the HTML for the deck tree's <tbody> content.
+    The rows are remembered as what the webview shows, so the caller must
+    put the result on the page.
+    """
+    _sent_tree["loaded"].clear()
+    _sent_tree["virtual"] = False
+    rows = _render_deck_tree_rows(deck_browser)
+    _remember_sent_rows(rows)
+    return "".join(row_html for _, row_html in rows)
+
+
+def _count_decks(nodes) -> int:
+    return sum(1 + _count_decks(node.children) for node in nodes)
+
+
+def render_deck_list_for_page(deck_browser: DeckBrowser):
+    """
+    The deck list for a full page render, as (tbody html, rows). Above the
+    deckListVirtualizeAbove setting (0 turns it off) the tbody is left empty
+    and the rows are returned for the page's virtual list instead; otherwise
+    rows is None.
+    """
+    tree_html = _render_deck_tree_html_only(deck_browser)
+    threshold = config.get_config_view().get("deckListVirtualizeAbove", 0) or 0
+    tree = deck_browser._render_data.tree
+    if threshold > 0 and _count_decks(tree.children) > threshold:
+        _sent_tree["virtual"] = True
+        return "", _sent_tree["rows"]
+    return tree_html, None
+
+
+def _diff_rows(old_rows, new_rows):
+    """
+    A keyed patch turning old_rows into new_rows, or None if replacing
+    everything is simpler:
+      remove  deck ids whose rows go away
+      update  {deck id: html} of rows whose html changed
+      insert  [[deck id of the row before, or None, [[deck id, html], ...]], ...]
+      order   all deck ids in their new order, only if kept rows moved
+    """
+    if old_rows is None:
+        return None
+    old_html = dict(old_rows)
+    new_ids = {did for did, _ in new_rows}
+    if len(old_html) != len(old_rows) or len(new_ids) != len(new_rows):
+        return None  # a deck listed twice cannot be keyed
+
+    remove = [did for did, _ in old_rows if did not in new_ids]
+    update = {}
+    insert = []
+    previous_did = None
+    group = None
+    for did, row_html in new_rows:
+        if did in old_html:
+            if old_html[did] != row_html:
+                update[did] = row_html
+            group = None
+        else:
+            if group is None:
+                group = [previous_did, []]
+                insert.append(group)
+            group[1].append([did, row_html])
+        previous_did = did
+
+    if len(update) + sum(len(rows) for _, rows in insert) > max(_MAX_PATCHED_ROWS, len(new_rows) // 2):
+        return None
+    patch = {"remove": remove, "update": update, "insert": insert, "order": None}
+    kept_old = [did for did, _ in old_rows if did in new_ids]
+    kept_new = [did for did, _ in new_rows if did in old_html]
+    if kept_old != kept_new:
+        patch["order"] = [did for did, _ in new_rows]
+    return patch
+
+
+def _push_deck_rows(deck_browser: DeckBrowser, rows) -> None:
+    """Brings the webview's deck list up to date with rows, as a patch when possible."""
+    if _search_index["told"] != _search_index["generation"]:
+        _search_index["told"] = _search_index["generation"]
+        deck_browser.web.eval("OnigiriEngine.setDeckSearchGeneration({});".format(_search_index["generation"]))
+    base_version = _sent_tree["version"]
+    patch = _diff_rows(_sent_tree["rows"], rows)
+    version = _remember_sent_rows(rows)
+    if patch is not None:
+        if patch["remove"] or patch["update"] or patch["insert"] or patch["order"]:
+            patch.update(base=base_version, version=version)
+            deck_browser.web.eval("OnigiriEngine.patchDeckTree({});".format(json.dumps(patch)))
+        else:
+            deck_browser.web.eval("OnigiriEngine.setDeckTreeVersion({}, {});".format(base_version, version))
         return
 
-    favorite_ids = {str(did) for did in mw.col.conf.get("onigiri_favorite_decks", [])}
-    mark_ids = {
-        str(did)
-        for did, value in mw.col.conf.get("onigiri_deck_marks", {}).items()
-        if value
-    }
+    if _sent_tree["virtual"]:
+        deck_browser.web.eval("OnigiriEngine.setDeckRows({}, {});".format(json.dumps(rows), version))
+        return
 
-    def node_matches(node) -> bool:
-        did = str(node.deck_id)
-        if show_favorites_only and did not in favorite_ids:
-            return False
-        if show_marked_only and did not in mark_ids:
+    # Escape the HTML for safe injection into a JavaScript string
+    js_escaped_html = json.dumps("".join(row_html for _, row_html in rows))
+    js = """
+    (function() {{
+        const container = document.getElementById('deck-list-container');
+        const scrollTop = container?.scrollTop || 0;
+        OnigiriEngine.updateDeckTree({new_tree_html}, {version});
+        if (container) {{
+            container.scrollTop = scrollTop;
+        }}
+    }})();
+    """.format(new_tree_html=js_escaped_html, version=version)
+    deck_browser.web.eval(js)
+
+
+# --- Deck Tree Provider ---
+# deck_due_tree is slow on big collections, so the deck list is rendered from
+# the last tree fetched and a fresh one is fetched in the background; when it
+# arrives the rows that changed are pushed to the page. Every request bumps
+# the generation, and a result is only used if no request came after it was
+# started (otherwise it is dropped and the tree fetched again). The stored
+# tree is the one deck_due_tree returned: renders get a copy, since sorting
+# and filtering change the tree in place.
+_deck_tree = {
+    "col": None,         # collection the tree belongs to
+    "tree": None,        # last deck_due_tree fetched
+    "generation": 0,     # bumped by every request for a fresh tree
+    "running": False,    # a background fetch is in flight
+    "browser": None,     # deck browser waiting for the fresh tree
+    "tree_generation": 0,  # bumped with every tree stored
+}
+
+
+def _store_deck_tree(tree):
+    """Keeps tree as the last one fetched and returns a copy to render from."""
+    _deck_tree["col"] = mw.col
+    _deck_tree["tree"] = tree
+    _deck_tree["tree_generation"] += 1
+    _search_index["generation"] += 1
+    return copy.deepcopy(tree)
+
+
+def fresh_deck_tree(deck_browser: DeckBrowser):
+    """A new deck_due_tree, with any collapse states still waiting to be saved applied."""
+    flush_collapse_writes()
+    # A fetch still in flight is older than this tree
+    _deck_tree["generation"] += 1
+    return _store_deck_tree(deck_browser.mw.col.sched.deck_due_tree())
+
+
+def deck_tree_for_render(deck_browser: DeckBrowser):
+    """
+    A deck tree to render right away: a copy of the last one fetched, with a
+    fresh one on its way (see revalidate_deck_tree). Fetched here and now if
+    there is none yet for this collection.
+    """
+    if _deck_tree["tree"] is None or _deck_tree["col"] is not deck_browser.mw.col:
+        return fresh_deck_tree(deck_browser)
+    revalidate_deck_tree(deck_browser)
+    return copy.deepcopy(_deck_tree["tree"])
+
+
+def revalidate_deck_tree(deck_browser: DeckBrowser) -> None:
+    """Fetches a fresh deck tree in the background and pushes the rows that changed."""
+    _deck_tree["generation"] += 1
+    _deck_tree["browser"] = deck_browser
+    if not _deck_tree["running"]:
+        _start_deck_tree_op()
+
+
+def _start_deck_tree_op() -> None:
+    from aqt.operations import QueryOp
+
+    # The fetch reads collapse states from the collection
+    flush_collapse_writes()
+    generation = _deck_tree["generation"]
+    _deck_tree["running"] = True
+
+    def finish():
+        _deck_tree["running"] = False
+        if generation != _deck_tree["generation"]:
+            if _deck_tree["browser"] is not None:
+                _start_deck_tree_op()
             return False
         return True
 
-    def filter_nodes(nodes):
-        kept = []
-        for node in list(nodes):
-            matching_children = filter_nodes(node.children) if node.children else []
-            if node_matches(node) or matching_children:
-                if node.children:
-                    del node.children[:]
-                    node.children.extend(matching_children)
-                kept.append(node)
-        return kept
+    def on_success(tree):
+        if finish():
+            _apply_fresh_deck_tree(tree)
+
+    def on_failure(error):
+        if finish():
+            _deck_tree["browser"] = None
+            print(f"Onigiri: Error fetching the deck tree: {error}")
+
+    QueryOp(
+        parent=mw,
+        op=lambda col: col.sched.deck_due_tree(),
+        success=on_success,
+    ).failure(on_failure).run_in_background()
+
 
+def _apply_fresh_deck_tree(tree) -> None:
+    deck_browser = _deck_tree["browser"]
+    _deck_tree["browser"] = None
+    if not mw.col:
+        return
+    tree_data = _store_deck_tree(tree)
+    # The page may be gone; the tree is kept for the next render either way
+    if deck_browser is None or mw.state != "deckBrowser":
+        return
     try:
-        kept = filter_nodes(tree_data.children)
-        del tree_data.children[:]
-        tree_data.children.extend(kept)
+        deck_browser._render_data = onigiri_renderer.RenderData(tree=tree_data)
+        _push_deck_rows(deck_browser, _render_deck_tree_rows(deck_browser))
     except Exception as e:
-        print(f"Onigiri: Could not apply deck list filter: {e}")
+        print(f"Onigiri: Error updating the deck list from a fresh tree: {e}")
 
 
-def _apply_tree_preferences(tree_data) -> None:
-    sort_mode = mw.col.conf.get("onigiri_sort_mode", "default")
-    if sort_mode != "default":
-        _apply_sort_recursive(tree_data.children, sort_mode)
-    _apply_active_filters(tree_data)
+def forget_deck_tree(*args) -> None:
+    """Drops the stored tree and any fetch in flight (profile switch)."""
+    _deck_tree["generation"] += 1
+    _deck_tree.update(col=None, tree=None, browser=None)
 
-def _render_deck_tree_html_only(deck_browser: DeckBrowser) -> str:
+
+# --- Deck Search Index ---
+# Deck search runs in the page (OnigiriEngine.searchDecks) over an index of
+# every deck in the tree, which the page asks for when it searches. The
+# generation moves with every new deck_due_tree; the page is told when it
+# does (with the next deck list update) and asks again on its next search.
+_search_index = {
+    "generation": 0,  # bumped with every deck_due_tree fetched
+    "told": 0,        # generation the page knows about
+}
+
+
+# Bits of an index entry's flags
+_SEARCH_HAS_CHILDREN, _SEARCH_FILTERED, _SEARCH_FAVORITE = 1, 2, 4
+
+
+def _deck_search_entries(nodes, parent_name, favorites, deck_marks, entries) -> None:
+    for node in nodes:
+        leaf = node.name.split("::")[-1]
+        name = f"{parent_name}::{leaf}" if parent_name else leaf
+        did = str(node.deck_id)
+        flags = (
+            (_SEARCH_HAS_CHILDREN if node.children else 0)
+            | (_SEARCH_FILTERED if getattr(node, "filtered", False) else 0)
+            | (_SEARCH_FAVORITE if did in favorites else 0)
+        )
+        entries.append([did, name, node.level, flags, node.new_count, node.learn_count, node.review_count, deck_marks.get(did, "")])
+        if node.children:
+            _deck_search_entries(node.children, name, favorites, deck_marks, entries)
+
+
+def _deck_search_index(deck_browser: DeckBrowser) -> dict:
     """
-    Renders just the HTML for the deck tree's <tbody> content.
-    This is a performance-focused function used for fast updates.
+    Every deck of the (sorted, filtered) tree as
+    [deck id, full name, depth, flags, new, learn, review, mark], in tree order.
     """
-    # Use cached tree data if available, otherwise fetch fresh data
-    if hasattr(deck_browser, '_render_data') and deck_browser._render_data:
-        tree_data = deck_browser._render_data.tree
-    else:
-        tree_data = deck_browser.mw.col.sched.deck_due_tree()
-        deck_browser._render_data = onigiri_renderer.RenderData(tree=tree_data)
+    tree_data = _view_tree(deck_browser)
+    meta = deck_meta.get_deck_meta()
+    entries = []
+    _deck_search_entries(tree_data.children, "", meta.favorites, meta.marks, entries)
+    return {
+        "generation": _search_index["generation"],
+        "currentDeck": str(deck_browser.mw.col.decks.get_current_id()),
+        "showCounts": not config.get_config_view().get("hideAllDeckCounts", False),
+        "decks": entries,
+    }
 
-    _apply_tree_preferences(tree_data)
-    
-    ctx = RenderDeckNodeContext(current_deck_id=deck_browser.mw.col.decks.get_current_id())
-    # Note: _render_deck_node is patched by Onigiri in patcher.py
-    return "".join(deck_browser._render_deck_node(child, ctx) for child in tree_data.children)
 
+def send_deck_search_index(deck_browser: DeckBrowser) -> None:
+    """Sends the page the index its deck search runs on."""
+    index = _deck_search_index(deck_browser)
+    _search_index["told"] = index["generation"]
+    deck_browser.web.eval("OnigiriEngine.setDeckSearchIndex({});".format(json.dumps(index)))
 
-def _render_deck_search_html(deck_browser: DeckBrowser, query: str) -> str:
-    """Render sidebar deck rows matching a deck search query."""
-    normalized = query.strip().lower()
-    if not normalized:
-        deck_browser._render_data = None
-        return _render_deck_tree_html_only(deck_browser)
 
-    tree_data = deck_browser.mw.col.sched.deck_due_tree()
-    _apply_tree_preferences(tree_data)
-    ctx = RenderDeckNodeContext(current_deck_id=deck_browser.mw.col.decks.get_current_id())
-    rows = []
+def get_deck_search_generation() -> int:
+    """Generation of the deck tree last rendered, for the page's initial state."""
+    _search_index["told"] = _search_index["generation"]
+    return _search_index["generation"]
 
-    def collect_matches(nodes):
-        for node in nodes:
-            name = node.name or ""
-            leaf = name.split("::")[-1]
-            if normalized in name.lower() or normalized in leaf.lower():
-                rows.append(deck_browser._render_deck_node(node, ctx))
-            elif node.children:
-                collect_matches(node.children)
 
-    collect_matches(tree_data.children)
-    return "".join(rows)
+# --- Collapse Write-behind ---
+# The page shows a collapse or expand at once (OnigiriEngine.toggleDeckCollapse),
+# so saving it can wait: states are queued and saved in one batch once the
+# clicks stop, or before anything reads the deck tree from the collection.
+_COLLAPSE_WRITE_DELAY_MS = 1000
+
+_pending_collapse = {
+    "states": {},  # deck id -> collapsed, waiting to be saved
+    "timer": None,  # QTimer driving the delayed flush
+}
+
+
+def _queue_collapse_write(did: int, collapsed: bool) -> None:
+    _pending_collapse["states"][did] = collapsed
+    timer = _pending_collapse["timer"]
+    if timer is None:
+        try:
+            from aqt.qt import QTimer
+            timer = QTimer()
+            timer.setSingleShot(True)
+            timer.timeout.connect(flush_collapse_writes)
+        except Exception:
+            # No Qt event loop to defer to, save right away
+            flush_collapse_writes()
+            return
+        _pending_collapse["timer"] = timer
+    # Restarting the timer coalesces a burst of clicks into one save
+    timer.start(_COLLAPSE_WRITE_DELAY_MS)
+
+
+def flush_collapse_writes(*args) -> None:
+    """Saves any queued collapse states now. Safe to call when nothing is queued."""
+    timer = _pending_collapse["timer"]
+    if timer is not None:
+        timer.stop()
+    states = _pending_collapse["states"]
+    _pending_collapse["states"] = {}
+    if not states or not mw.col:
+        return
+
+    for did, collapsed in states.items():
+        try:
+            deck = mw.col.decks.get(DeckId(did), default=False)
+            # Toggled back and forth, or collapsed elsewhere meanwhile
+            if not deck or bool(deck.get("collapsed", False)) == collapsed:
+                continue
+            deck["collapsed"] = collapsed
+            mw.col.decks.save(deck)
+        except Exception as e:
+            print(f"Onigiri: Error saving collapse state of deck {did}: {e}")
+
 
 def on_deck_collapse(deck_browser: DeckBrowser, deck_id: str) -> None:
     """
-    Handles the collapse/expand action for a deck without a full page reload.
+    Records a collapse/expand the page has already shown, without a full
+    page reload: the state is queued for saving, and the rows of subdecks
+    the page does not have yet are sent (the collapsed deck's own row is
+    updated too).
     """
     try:
         did = int(deck_id)
-        # Toggle the collapse state in Anki's backend
-        mw.col.decks.collapse(did)
-        mw.col.decks.save()  # Ensure the change is persisted
-
-        # Refresh the tree data *after* collapse state has changed
-        tree_data = deck_browser.mw.col.sched.deck_due_tree()
-        deck_browser._render_data = onigiri_renderer.RenderData(tree=tree_data)
-        
-        # Re-render only the deck tree
-        new_tree_html = _render_deck_tree_html_only(deck_browser)
-
-        # Escape the HTML for safe injection into a JavaScript string
-        js_escaped_html = json.dumps(new_tree_html)
-        
-        # Send the new HTML to the frontend to be injected by JavaScript
-        js = """
-        (function() {{
-            const container = document.getElementById('deck-list-container');
-            const scrollTop = container?.scrollTop || 0;
-            OnigiriEngine.updateDeckTree({new_tree_html});
-            if (container) {{
-                container.scrollTop = scrollTop;
-            }}
-        }})();
-        """.format(new_tree_html=js_escaped_html)
-        
-        deck_browser.web.eval(js)
+        # Toggle the deck in the tree the page was rendered from; the
+        # collection catches up through the write-behind queue
+        render_data = getattr(deck_browser, "_render_data", None)
+        if not render_data or not getattr(render_data, "tree", None):
+            deck_browser._render_data = render_data = onigiri_renderer.RenderData(tree=deck_tree_for_render(deck_browser))
+        node = _find_node(render_data.tree.children, did)
+        if node is None:
+            return
+        node.collapsed = not node.collapsed
+        _queue_collapse_write(did, node.collapsed)
+        # The next render starts from the stored tree, and a fetch in
+        # flight may have read the collection before this toggle
+        if _deck_tree["tree"] is not None:
+            stored_node = _find_node(_deck_tree["tree"].children, did)
+            if stored_node is not None:
+                stored_node.collapsed = node.collapsed
+        if _deck_tree["running"]:
+            _deck_tree["generation"] += 1
+        if node.collapsed:
+            # Its subdecks were visible, so the page keeps them (hidden)
+            _sent_tree["loaded"].add(str(did))
+
+        _push_deck_rows(deck_browser, _render_deck_tree_rows(deck_browser))
 
     except Exception as e:
         print(f"Onigiri: Error in on_deck_collapse for deck_id '{deck_id}': {e}")
@@ -177,10 +601,91 @@ def on_deck_collapse(deck_browser: DeckBrowser, deck_id: str) -> None:
         traceback.print_exc()
 
 
+# --- Deck Moves ---
+# A move is mirrored in the stored deck tree, so the deck list can show it
+# at once as a row patch; the background fetch that follows corrects the
+# due counts of the old and new parents. Moves the tree cannot mirror the
+# way decks.reparent does them (a name clash renames the deck) are only
+# shown once the fetch is back.
+
+def _find_with_parent(parent, did: int):
+    """(parent node, index) of the deck below parent, or None."""
+    for index, node in enumerate(parent.children):
+        if node.deck_id == did:
+            return parent, index
+        if node.children:
+            found = _find_with_parent(node, did)
+            if found is not None:
+                return found
+    return None
+
+
+def _shift_levels(node, delta: int) -> None:
+    node.level += delta
+    for child in node.children:
+        _shift_levels(child, delta)
+
+
+def _move_deck_in_tree(tree, did: int, target_did: int) -> bool:
+    """Moves a deck and its subdecks under target_did (0 is the top level). False if it cannot be mirrored."""
+    found = _find_with_parent(tree, did)
+    if found is None:
+        return False
+    parent, index = found
+    node = parent.children[index]
+    if target_did:
+        target = _find_with_parent(tree, target_did)
+        if target is None:
+            return False
+        target_node = target[0].children[target[1]]
+    else:
+        target_node = tree
+    # Already there, or into itself or a subdeck (which reparent skips)
+    if parent.deck_id == target_node.deck_id or did == target_did or _find_with_parent(node, target_did) is not None:
+        return True
+
+    leaf = node.name.split("::")[-1].lower()
+    siblings = list(target_node.children)
+    if any(child.name.split("::")[-1].lower() == leaf for child in siblings):
+        return False
+
+    del parent.children[index]
+    _shift_levels(node, target_node.level + 1 - node.level)
+    position = sum(1 for child in siblings if child.name.split("::")[-1].lower() < leaf)
+    siblings.insert(position, node)
+    # Rebuilt whole, for the same reason as in _prune_nodes
+    del target_node.children[:]
+    target_node.children.extend(siblings)
+    return True
+
+
+def _show_moved_decks(source_dids, target_did: int) -> None:
+    deck_browser = mw.deckBrowser
+    if not deck_browser or mw.state != "deckBrowser":
+        return
+    tree = _deck_tree["tree"]
+    if tree is not None and _deck_tree["col"] is mw.col:
+        try:
+            moved = all(_move_deck_in_tree(tree, int(did), int(target_did)) for did in source_dids)
+        except Exception:
+            forget_deck_tree()
+            raise
+        if moved:
+            # The stored tree changed shape: new sort keys and search index
+            _deck_tree["tree_generation"] += 1
+            _search_index["generation"] += 1
+        else:
+            # Some decks may have moved already; render from a fresh fetch
+            forget_deck_tree()
+    # Rows from a copy of the stored tree now, the fetched tree's rows after
+    refresh_deck_tree_state(deck_browser)
+
+
 def on_decks_move(data_str: str) -> None:
     """
     Handles moving multiple decks. This is called from the transfer window.
-    It closes the transfer window and refreshes the main Deck Browser.
+    It closes the transfer window, moves the decks in one undoable operation
+    and patches the moved rows into the Deck Browser's deck list.
     """
     # Close the transfer window first, if it exists
     if hasattr(mw, "onigiri_transfer_window") and mw.onigiri_transfer_window:
@@ -191,12 +696,9 @@ def on_decks_move(data_str: str) -> None:
         mw.onigiri_transfer_window = None
 
     try:
-        print(f"Onigiri: on_decks_move called with data_str: {data_str}")
         data = json.loads(data_str)
-        print(f"Onigiri: parsed data: {data}")
         source_dids_str = data.get("source_dids", [])
         target_did_str = data.get("target_did")
-        print(f"Onigiri: source_dids_str: {source_dids_str}, target_did_str: {target_did_str}")
 
         if not source_dids_str or target_did_str is None:
             print(f"Onigiri: Missing data - source_dids_str: {source_dids_str}, target_did_str: {target_did_str}")
@@ -204,54 +706,65 @@ def on_decks_move(data_str: str) -> None:
 
         source_dids = [DeckId(int(did)) for did in source_dids_str]
         target_did = DeckId(int(target_did_str))
-        # Corrected print statement
-        print(f"Onigiri: converted to DeckIds - source_dids: {source_dids}, target_did: {target_did}")
-
-        # Anki's reparent function handles invalid moves (e.g., moving a parent into its child)
-        mw.col.decks.reparent(source_dids, target_did)
-        print(f"Onigiri: Successfully called reparent")
-
-        # Force a complete deck browser refresh to update all internal state
-        # This prevents stale deck IDs from persisting in the context menu
-        if mw.deckBrowser:
-            # Call show() which triggers a full re-render via _renderPage
-            mw.deckBrowser.show()
-            print(f"Onigiri: Successfully refreshed deck browser with full render")
-        else:
-            print(f"Onigiri: deckBrowser is None, cannot refresh")
-
     except (ValueError, TypeError, json.JSONDecodeError) as e:
         print(f"Onigiri: Could not process deck move request: {e}")
+        return
+
+    from aqt.operations.deck import reparent_decks
+
+    def on_success(changes):
+        try:
+            _show_moved_decks(source_dids, target_did)
+        except Exception as e:
+            print(f"Onigiri: Error showing moved decks: {e}")
+            import traceback
+            traceback.print_exc()
+
+    # One backend call for all decks: one undo entry. Anki's reparent handles
+    # invalid moves (e.g., moving a parent into its child). With the deck
+    # browser as initiator, Anki does not re-render the whole page for it.
+    reparent_decks(
+        parent=mw,
+        deck_ids=source_dids,
+        new_parent=target_did,
+    ).success(on_success).run_in_background(initiator=mw.deckBrowser)
+
+
+def refresh_deck_list_view(deck_browser: DeckBrowser) -> None:
+    """Updates the deck list after a sort or filter change, without fetching a new tree."""
+    try:
+        _push_deck_rows(deck_browser, _render_deck_tree_rows(deck_browser))
+    except Exception as e:
+        print(f"Onigiri: Error in refresh_deck_list_view: {e}")
+
 
 def refresh_deck_tree_state(deck_browser: DeckBrowser) -> None:
     """
-    Handles a full refresh of the deck tree HTML while preserving scroll state.
+    Refreshes the deck list, sending only the rows that changed (scroll state
+    and untouched rows are left alone): first from the last deck tree, then
+    again once a fresh one has been fetched in the background.
     """
     try:
         # Refresh the tree data
-        tree_data = deck_browser.mw.col.sched.deck_due_tree()
+        tree_data = deck_tree_for_render(deck_browser)
         deck_browser._render_data = onigiri_renderer.RenderData(tree=tree_data)
         
-        # Re-render only the deck tree
-        new_tree_html = _render_deck_tree_html_only(deck_browser)
-
-        # Escape the HTML for safe injection into a JavaScript string
-        js_escaped_html = json.dumps(new_tree_html)
-        
-        js = """
-        (function() {{
-            const container = document.getElementById('deck-list-container');
-            const scrollTop = container?.scrollTop || 0;
-            OnigiriEngine.updateDeckTree({new_tree_html});
-            if (container) {{
-                container.scrollTop = scrollTop;
-            }}
-        }})();
-        """.format(new_tree_html=js_escaped_html)
-        
-        deck_browser.web.eval(js)
+        # Send only the rows that changed
+        _push_deck_rows(deck_browser, _render_deck_tree_rows(deck_browser))
 
     except Exception as e:
         print(f"Onigiri: Error in refresh_deck_tree_state: {e}")
         import traceback
         traceback.print_exc()
+
+
+# Queued collapse states are saved before the collection is synced or closed,
+# and when leaving the deck browser (other screens read the tree themselves).
+try:
+    from aqt import gui_hooks
+    gui_hooks.sync_will_start.append(flush_collapse_writes)
+    gui_hooks.state_will_change.append(flush_collapse_writes)
+    gui_hooks.profile_will_close.append(flush_collapse_writes)
+    gui_hooks.profile_will_close.append(forget_deck_tree)
+except Exception:
+    pass
@@ -0,0 +1,137 @@
+"""
+Due forecast for the heatmap: review-queue cards per due day, for the whole
+collection and per home deck.
+
+The forecast is built with a single query once per scheduler day (and after a
+sync, an undo or a collection switch) and then adjusted in place. Answered
+cards are re-read by id, so a review costs no scan of the cards table. Other
+operations that touch cards re-read the cards modified since the last
+refresh. Every card's (deck, due) is remembered, so
+a re-read card is moved from its old bucket to its new one. If many cards
+changed at once, or cards disappeared, the forecast is rebuilt instead.
+Refreshes run in the heatmap's background op; the changes are recorded by
+card_changes.
+"""
+
+import time
+from typing import Dict, Iterable, Optional
+
+from aqt import mw
+from .card_changes import REBUILD_RATIO, CardChanges, Changes
+
+_CARD_COLUMNS = "id, queue, due, CASE WHEN odid != 0 THEN odid ELSE did END"
+
+_state = {
+    "col": None,              # collection the forecast belongs to
+    "today": None,            # scheduler day it was built on
+    "cards": None,            # {card id: (home deck id, due day)} of review-queue cards
+    "totals": {},             # {due day: cards}
+    "by_deck": {},            # {home deck id: {due day: cards}}
+    "mod_watermark": 0,       # cards modified at or after this (seconds) may not be applied yet
+}
+
+# Answered cards are re-read by id
+_changes = CardChanges(answered_key=lambda card: card.id)
+
+
+def _bump(counts: Dict[int, int], due: int, delta: int) -> None:
+    count = counts.get(due, 0) + delta
+    if count:
+        counts[due] = count
+    else:
+        counts.pop(due, None)
+
+
+def _move(card_id: int, new_entry) -> None:
+    cards = _state["cards"]
+    old_entry = cards.get(card_id)
+    if old_entry == new_entry:
+        return
+    if old_entry is not None:
+        deck_id, due = old_entry
+        _bump(_state["totals"], due, -1)
+        _bump(_state["by_deck"].setdefault(deck_id, {}), due, -1)
+        del cards[card_id]
+    if new_entry is not None:
+        deck_id, due = new_entry
+        _bump(_state["totals"], due, 1)
+        _bump(_state["by_deck"].setdefault(deck_id, {}), due, 1)
+        cards[card_id] = new_entry
+
+
+def _rebuild(today: int) -> None:
+    mod_watermark = int(time.time()) - 1
+    cards = {}
+    totals = {}
+    by_deck = {}
+    for card_id, deck_id, due in mw.col.db.all(
+        "SELECT id, CASE WHEN odid != 0 THEN odid ELSE did END, due FROM cards WHERE queue = 2"
+    ):
+        cards[card_id] = (deck_id, due)
+        totals[due] = totals.get(due, 0) + 1
+        deck_counts = by_deck.setdefault(deck_id, {})
+        deck_counts[due] = deck_counts.get(due, 0) + 1
+    _state.update(
+        col=mw.col,
+        today=today,
+        cards=cards,
+        totals=totals,
+        by_deck=by_deck,
+        mod_watermark=mod_watermark,
+    )
+
+
+def _apply_rows(rows) -> None:
+    for card_id, queue, due, deck_id in rows:
+        _move(card_id, (deck_id, due) if queue == 2 else None)
+
+
+def _refresh(today: int, changes: Changes) -> None:
+    if changes.stale or _state["col"] is not mw.col or _state["today"] != today:
+        _rebuild(today)
+        return
+
+    if changes.cards:
+        mod_watermark = int(time.time()) - 1
+        rows = mw.col.db.all(f"SELECT {_CARD_COLUMNS} FROM cards WHERE mod >= ?", _state["mod_watermark"])
+        if len(rows) > REBUILD_RATIO * max(len(_state["cards"]), 1):
+            _rebuild(today)
+            return
+        _apply_rows(rows)
+        _state["mod_watermark"] = mod_watermark
+        # Deleted cards leave no modified row behind
+        if mw.col.db.scalar("SELECT count() FROM cards WHERE queue = 2") != len(_state["cards"]):
+            _rebuild(today)
+    elif changes.answered:
+        ids = ",".join(str(int(card_id)) for card_id in changes.answered)
+        rows = mw.col.db.all(f"SELECT {_CARD_COLUMNS} FROM cards WHERE id IN ({ids})")
+        found = {row[0] for row in rows}
+        _apply_rows(rows)
+        for card_id in changes.answered - found:
+            _move(card_id, None)
+
+
+def get_due_counts(today: int, deck_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """
+    Returns {due day: review cards} for days after today, for the whole
+    collection or for the given home decks.
+    """
+    _changes.catch_up(lambda changes: _refresh(today, changes))
+    if deck_ids is None:
+        sources = [_state["totals"]]
+    else:
+        sources = [_state["by_deck"].get(deck_id, {}) for deck_id in deck_ids]
+    counts = {}
+    for source in sources:
+        for due, count in source.items():
+            if due > today:
+                counts[due] = counts.get(due, 0) + count
+    return counts
+
+
+def reset(*args) -> None:
+    _state.update(col=None, today=None, cards=None, totals={}, by_deck={})
+    _changes.clear()
+
+
+_changes.register_hooks(reset)
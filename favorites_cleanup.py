@@ -6,6 +6,7 @@ Users can import and run these functions from Anki's debug console if needed.
 """
 
 from aqt import mw
+from . import deck_meta
 
 
 def cleanup_favorites():
@@ -23,7 +24,7 @@ def cleanup_favorites():
         print("Error: No collection loaded")
         return (0, [])
     
-    favorites = mw.col.conf.get("onigiri_favorite_decks", [])
+    favorites = list(deck_meta.get_deck_meta().favorite_list)
     if not favorites:
         print("No favorites to clean up")
         return (0, [])
@@ -55,8 +56,7 @@ def cleanup_favorites():
             print(f"  ✗ ID {deck_id}: INVALID (no name or null)")
     
     if removed_decks:
-        mw.col.conf["onigiri_favorite_decks"] = valid_favorites
-        mw.col.setMod()
+        deck_meta.set_favorites(valid_favorites)
         print(f"\n✓ Removed {len(removed_decks)} deleted/invalid deck(s) from favorites")
         print(f"Remaining favorites: {len(valid_favorites)}")
     else:
@@ -80,7 +80,7 @@ def list_favorites():
         print("Error: No collection loaded")
         return []
     
-    favorites = mw.col.conf.get("onigiri_favorite_decks", [])
+    favorites = deck_meta.get_deck_meta().favorite_list
     
     if not favorites:
         print("No favorite decks")
@@ -121,14 +121,12 @@ def remove_favorite(deck_id):
         return False
     
     deck_id = str(deck_id)  # Ensure it's a string
-    favorites = mw.col.conf.get("onigiri_favorite_decks", [])
+    meta = deck_meta.get_deck_meta()
     
-    if deck_id in favorites:
-        favorites.remove(deck_id)
-        mw.col.conf["onigiri_favorite_decks"] = favorites
-        mw.col.setMod()
+    if deck_id in meta.favorites:
+        deck_meta.toggle_favorite(deck_id)
         print(f"✓ Removed deck {deck_id} from favorites")
-        print(f"Remaining favorites: {favorites}")
+        print(f"Remaining favorites: {meta.favorite_list}")
         return True
     else:
         print(f"✗ Deck {deck_id} was not in favorites")
@@ -150,12 +148,10 @@ def clear_all_favorites():
         print("Error: No collection loaded")
         return 0
     
-    favorites = mw.col.conf.get("onigiri_favorite_decks", [])
-    count = len(favorites)
+    count = len(deck_meta.get_deck_meta().favorite_list)
     
     if count > 0:
-        mw.col.conf["onigiri_favorite_decks"] = []
-        mw.col.setMod()
+        deck_meta.set_favorites([])
         print(f"✓ Cleared {count} favorite deck(s)")
     else:
         print("No favorites to clear")
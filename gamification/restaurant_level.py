@@ -310,7 +310,7 @@ class RestaurantLevelManager:
         self._update_gamification_data({"name": str(name)})
 
     def get_progress(self) -> LevelProgress:
-        conf = config.get_config()
+        conf = config.get_config_view()
         # Check top level first
         restaurant_conf = conf.get("restaurant_level", {})
         
@@ -356,7 +356,7 @@ class RestaurantLevelManager:
                 updates["level"] = int(restaurant_conf.get("level", 0))
                 
                 # Also migrate items if needed
-                conf_owned = restaurant_conf.get("owned_items", [])
+                conf_owned = list(restaurant_conf.get("owned_items", []))
                 json_owned = game_state.get("owned_items", ["default"])
                 merged_owned = list(set(conf_owned + json_owned))
                 if len(merged_owned) > len(json_owned):
@@ -414,7 +414,7 @@ class RestaurantLevelManager:
             "xpToNextLevel": xp_to_next,
             "xpRemaining": remaining,
             "progressFraction": percent,
-            "notificationsEnabled": progress.notifications_enabled and not bool(config.get_config().get("focusedGaming", False)),
+            "notificationsEnabled": progress.notifications_enabled and not bool(config.get_config_view().get("focusedGaming", False)),
             "showProfileBar": progress.show_profile_bar_progress,
             "showProfilePage": progress.show_profile_page_progress,
             "phrase": self._get_motivational_phrase(progress.level),
@@ -426,7 +426,7 @@ class RestaurantLevelManager:
 
     def get_daily_special_status(self) -> Dict[str, Any]:
         """Get daily special data, resetting it if it's a new day."""
-        conf = config.get_config()
+        conf = config.get_config_view()
         # Get settings from config
         daily_special_conf = conf.get("daily_special", {})
         
@@ -625,11 +625,11 @@ class RestaurantLevelManager:
             
             # Fallback to config if state is empty (migration)
             if not state:
-                 conf = config.get_config()
+                 conf = config.get_config_view()
                  restaurant_conf = conf.get("restaurant_level", {})
                  if not restaurant_conf:
                     restaurant_conf = conf.get("achievements", {}).get("restaurant_level", {})
-                 owned = restaurant_conf.get("owned_items", ["default"])
+                 owned = list(restaurant_conf.get("owned_items", ["default"]))
                  current = restaurant_conf.get("current_theme_id", "default")
                  
         except Exception as e:
@@ -806,7 +806,7 @@ class RestaurantLevelManager:
         
         # Suppress popup notifications when Focused Gaming is active
         # OR when the user has explicitly disabled Restaurant Level notifications
-        conf = config.get_config()
+        conf = config.get_config_view()
         focused_gaming = conf.get("focusedGaming", False)
         restaurant_notifications_on = conf.get("restaurant_level", {}).get("notifications_enabled", True)
         if focused_gaming or not restaurant_notifications_on:
@@ -1374,7 +1374,7 @@ class RestaurantLevelManager:
         return notifications
     
     def _get_difficulty_multiplier(self) -> int:
-        conf, restaurant_conf = self._config_bundle()
+        restaurant_conf = config.get_config_view().get("restaurant_level", {})
         diff = restaurant_conf.get("difficulty", "Apprendice")
         if diff == "Cook": return 2
         if diff == "Chef": return 4
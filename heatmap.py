@@ -1,20 +1,88 @@
+import base64
+import json
 import time
 import os
-from datetime import datetime
+import struct
+import threading
+from datetime import date, datetime
 from aqt import mw
 from . import config
+from . import due_forecast
+from . import heatmap_cache
 from .config import DEFAULTS
 
-def get_heatmap_data():
+def _review_day_stats(reviews_by_day, today_ordinal):
+    """
+    Computes (current streak, longest streak, total reviews) in a single pass
+    over the per-day counts, using integer day ordinals instead of date strings.
+    The current streak counts back from today, or from yesterday if there are
+    no reviews yet today.
+    """
+    total_reviews = 0
+    longest_streak = 0
+    run_length = 0
+    previous_ordinal = None
+    # ISO day keys sort chronologically
+    for day_key in sorted(reviews_by_day):
+        count = reviews_by_day[day_key]
+        if not count:
+            continue
+        total_reviews += count
+        ordinal = date.fromisoformat(day_key).toordinal()
+        run_length = run_length + 1 if previous_ordinal == ordinal - 1 else 1
+        previous_ordinal = ordinal
+        if run_length > longest_streak:
+            longest_streak = run_length
+
+    # The last run is the current streak if it reaches today or yesterday
+    streak = 0
+    if previous_ordinal is not None and today_ordinal - 1 <= previous_ordinal <= today_ordinal:
+        streak = run_length
+
+    return streak, longest_streak, total_reviews
+
+def _deck_subtree_ids(deck_id):
+    """The deck and all of its subdecks, or None if the deck no longer exists."""
+    try:
+        if mw.col.decks.get(deck_id, default=False) is None:
+            return None
+        return list(mw.col.decks.deck_and_child_ids(deck_id))
+    except Exception:
+        return None
+
+def _sum_deck_days(deck_days, deck_ids):
+    """Adds up the per-day review counts of the given decks."""
+    totals = {}
+    for deck_id in deck_ids:
+        for day_key, count in deck_days.get(deck_id, {}).items():
+            totals[day_key] = totals.get(day_key, 0) + count
+    return totals
+
+# heatmap_cache and due_forecast update their state in place and are not
+# thread-safe. The heatmap is computed both in the background op below and on
+# the main thread (the profile modal), so one computation runs at a time.
+_data_lock = threading.Lock()
+
+def get_heatmap_data(deck_id=None):
     """
     Fetches review data (past) and due card data (today/future),
     and calculates the current streak.
     All date/day calculations are done in Python using Anki's
     local timezone settings to ensure accuracy.
+    With a deck_id, only reviews and due cards of that deck and its
+    subdecks are counted.
     """
+    with _data_lock:
+        return _compute_heatmap_data(deck_id)
+
+def _compute_heatmap_data(deck_id):
     if not mw.col:
         return {"calendar": {}, "streak": 0, "due_calendar": {}}
 
+    deck_ids = _deck_subtree_ids(deck_id) if deck_id else None
+    if deck_ids is None:
+        deck_id = None
+
     # Rollover hour from config, default to 4am
     rollover_hour = mw.col.conf.get("rollover", 4)
     offset_seconds = rollover_hour * 3600
@@ -30,117 +98,78 @@ def get_heatmap_data():
     today_date_key = datetime.fromtimestamp(today_start_seconds).strftime('%Y-%m-%d')
 
     # --- 1. Fetch Past Reviews (excluding today) ---
-    # Use STRFTIME with 'localtime' and the offset to correctly group reviews
-    # by the local day, just like the reference add-on.
-    # type IN (0,1,2,3) filters out manual operations (type 4 = manual rescheduling/resets)
-    query_past = """
-        SELECT 
-            STRFTIME('%Y-%m-%d', id / 1000 - ?, 'unixepoch', 'localtime', 'start of day') as day_key,
-            COUNT()
-        FROM revlog
-        WHERE type IN (0,1,2,3) AND id < ? -- Only actual reviews *before* the start of today
-        GROUP BY day_key
-    """
-    reviews_by_day = dict(mw.col.db.all(query_past, offset_seconds, today_start_ms))
+    # Reviews are grouped by local day (STRFTIME with 'localtime' and the
+    # rollover offset). The per-day counts are maintained incrementally in
+    # heatmap_cache, so only reviews since the last refresh are aggregated.
+    # For a deck, the subtree is summed from the per-deck counts.
+    if deck_id is None:
+        past_reviews_by_day, first_review_ts = heatmap_cache.get_past_review_days(rollover_hour, today_start_ms)
+        reviews_by_day = dict(past_reviews_by_day)
+    else:
+        deck_days = heatmap_cache.get_past_deck_review_days(rollover_hour, today_start_ms)
+        reviews_by_day = _sum_deck_days(deck_days, deck_ids)
+        # The first reviewed day stands in for the first review time
+        first_review_ts = None
+        if reviews_by_day:
+            first_review_ts = datetime.fromisoformat(min(reviews_by_day)).timestamp() * 1000
+        dids_str = ",".join(str(int(did)) for did in deck_ids)
 
     # --- 2. Fetch Today's Review Count ---
     # Get a precise count for reviews *since* the start of today
     # type IN (0,1,2,3) filters out manual operations (type 4 = manual rescheduling/resets)
-    today_count = mw.col.db.scalar(
-        "SELECT COUNT() FROM revlog WHERE type IN (0,1,2,3) AND id >= ?",
-        today_start_ms
-    ) or 0
+    if deck_id is None:
+        today_count = mw.col.db.scalar(
+            "SELECT COUNT() FROM revlog WHERE type IN (0,1,2,3) AND id >= ?",
+            today_start_ms
+        ) or 0
+    else:
+        today_count = mw.col.db.scalar(
+            "SELECT COUNT() FROM revlog JOIN cards ON cards.id = revlog.cid "
+            "WHERE revlog.type IN (0,1,2,3) AND revlog.id >= ? "
+            f"AND (CASE WHEN cards.odid != 0 THEN cards.odid ELSE cards.did END) IN ({dids_str})",
+            today_start_ms
+        ) or 0
     reviews_by_day[today_date_key] = today_count
 
     # --- 3. Fetch Future Due Cards ---
-    due_by_day = {}
+    # Review-queue cards per due day are kept by due_forecast and adjusted
+    # as cards are answered, so this does not scan the cards table.
+    # Anki's relative due days (e.g., 5) become local date strings
+    # (e.g., "2025-10-28") by adding the offset to today's date.
     today_anki_day = mw.col.sched.today
-    
-    query_due = """
-        SELECT due, COUNT(*)
-        FROM cards
-        WHERE queue = 2 AND due > ?
-        GROUP BY due
-    """
-    due_counts = mw.col.db.all(query_due, today_anki_day)
-    
-    # Convert Anki's relative due days (e.g., 5) into
-    # absolute local date strings (e.g., "2025-10-28")
-    for anki_due_day, count in due_counts:
-        days_from_today = anki_due_day - today_anki_day
-        
-        # Add the day offset to today's start timestamp
-        future_timestamp_s = today_start_seconds + (days_from_today * 86400)
-        
-        # Convert to local date string
-        future_date_key = datetime.fromtimestamp(future_timestamp_s).strftime('%Y-%m-%d')
-        due_by_day[future_date_key] = count
-
-    # --- 4. Calculate Streak ---
-    # We must use the same date logic for all review days
-    # type IN (0,1,2,3) filters out manual operations (type 4 = manual rescheduling/resets)
-    all_review_days_query = """
-        SELECT DISTINCT STRFTIME('%Y-%m-%d', id / 1000 - ?, 'unixepoch', 'localtime', 'start of day')
-        FROM revlog
-        WHERE type IN (0,1,2,3)
-    """
-    review_days_set = set(mw.col.db.list(all_review_days_query, offset_seconds))
-    
-    streak = 0
-    yesterday_key = datetime.fromtimestamp(today_start_seconds - 86400).strftime('%Y-%m-%d')
-
-    if today_date_key in review_days_set or yesterday_key in review_days_set:
-        current_day_check_ts = today_start_seconds
-        # If no reviews today, start checking from yesterday
-        if today_date_key not in review_days_set:
-            current_day_check_ts -= 86400
-            
-        while True:
-            check_key = datetime.fromtimestamp(current_day_check_ts).strftime('%Y-%m-%d')
-            if check_key in review_days_set:
-                streak += 1
-                current_day_check_ts -= 86400  # Move to the previous day
-            else:
-                break  # Streak broken
-
-    # --- 5. Calculate Longest Streak Ever ---
-    longest_streak = 0
-    if review_days_set:
-        longest_streak = 1
-        current_run = 1
-        sorted_days = sorted(
-            datetime.strptime(day_key, "%Y-%m-%d").date()
-            for day_key in review_days_set
-        )
-        for previous_day, current_day in zip(sorted_days, sorted_days[1:]):
-            if (current_day - previous_day).days == 1:
-                current_run += 1
-            else:
-                current_run = 1
-            longest_streak = max(longest_streak, current_run)
-    longest_streak = max(longest_streak, streak)
+    today_ordinal = datetime.fromtimestamp(today_start_seconds).toordinal()
+    due_counts = due_forecast.get_due_counts(today_anki_day, deck_ids)
+    due_by_day = {
+        date.fromordinal(today_ordinal + anki_due_day - today_anki_day).isoformat(): count
+        for anki_due_day, count in sorted(due_counts.items())
+    }
+
+    # --- 4-5. Calculate Streak and Longest Streak ---
+    streak, longest_streak, total_reviews_all_time = _review_day_stats(reviews_by_day, today_ordinal)
 
     # --- 6. Calculate Daily Average ---
     # Total reviews / Days since first review
     # We use the count of all reviews in history (no date limit)
-    total_reviews_all_time = mw.col.db.scalar("SELECT COUNT() FROM revlog WHERE type IN (0,1,2,3)") or 0
+    if first_review_ts is None and today_count:
+        first_review_ts = today_start_ms
+        if deck_id is None:
+            first_review_ts = mw.col.db.scalar(
+                "SELECT min(id) FROM revlog WHERE type IN (0,1,2,3) AND id >= ?", today_start_ms
+            )
     
     daily_average = 0
     if total_reviews_all_time > 0:
         # distinct days
-        first_review_ts = mw.col.db.scalar("SELECT min(id) FROM revlog WHERE type IN (0,1,2,3)")
         if first_review_ts:
             # Calculate days elapsed
-            first_review_date = datetime.fromtimestamp(first_review_ts / 1000).date()
-            today_date = datetime.fromtimestamp(today_start_seconds).date()
-            days_elapsed = (today_date - first_review_date).days + 1
+            first_review_ordinal = datetime.fromtimestamp(first_review_ts / 1000).toordinal()
+            days_elapsed = today_ordinal - first_review_ordinal + 1
             if days_elapsed < 1: 
                 days_elapsed = 1
                 
             daily_average = total_reviews_all_time / days_elapsed
 
     first_year = datetime.now().year
-    first_review_ts = mw.col.db.scalar("SELECT min(id) FROM revlog WHERE type IN (0,1,2,3)")
     if first_review_ts:
         first_year = datetime.fromtimestamp(first_review_ts / 1000).year
 
@@ -153,16 +182,47 @@ def get_heatmap_data():
         "rollover_hour": rollover_hour, # Still useful for JS, though not for date math
         "daily_average": daily_average,
         "firstYear": first_year,
+        "deck_id": deck_id,
     }
 
-def get_heatmap_and_config():
-    """Helper to bundle heatmap data and configuration together for JavaScript."""
-    conf = config.get_config()
-    heatmap_data = get_heatmap_data()
+# Day numbers in the webview payload count days since 1970-01-01, which JS
+# gets from Date.UTC(year, month, day) / 86400000 without any string parsing.
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _pack_day_counts(counts_by_day, year):
+    """
+    Packs the {"YYYY-MM-DD": count} entries of one calendar year into a
+    columnar payload for heatmap.js: the day number of the first day plus a
+    dense run of little-endian uint32 counts (one per day, base64 encoded).
+    """
+    prefix = f"{year}-"
+    by_day_number = {
+        date.fromisoformat(day_key).toordinal() - _EPOCH_ORDINAL: count
+        for day_key, count in counts_by_day.items() if count and day_key.startswith(prefix)
+    }
+    if not by_day_number:
+        return {"base": 0, "counts": ""}
+    base = min(by_day_number)
+    counts = [0] * (max(by_day_number) - base + 1)
+    for day_number, count in by_day_number.items():
+        counts[day_number - base] = count
+    packed = struct.pack(f"<{len(counts)}I", *counts)
+    return {"base": base, "counts": base64.b64encode(packed).decode("ascii")}
+
+# Shape SVG markup for the selected heatmapShape, dropped when the setting changes
+_shape_svg_cache = {}
+
+def _on_heatmap_shape_changed(changed_paths):
+    _shape_svg_cache.clear()
+
+config.subscribe(_on_heatmap_shape_changed, "heatmapShape")
+
+def _load_shape_svg(shape_filename: str) -> str:
+    """Reads the selected SVG shape file, falling back to the square."""
+    if shape_filename in _shape_svg_cache:
+        return _shape_svg_cache[shape_filename]
 
-    # Read selected SVG shape file
     addon_path = os.path.dirname(__file__)
-    shape_filename = conf.get("heatmapShape", DEFAULTS["heatmapShape"])
     shape_path = os.path.join(addon_path, "system_files", "heatmap_system_icons", shape_filename)
 
     svg_content = ""
@@ -177,8 +237,71 @@ def get_heatmap_and_config():
         except (FileNotFoundError, IOError):
             svg_content = '<svg viewBox="0 0 10 10"><rect width="10" height="10" /></svg>'
 
+    _shape_svg_cache[shape_filename] = svg_content
+    return svg_content
+
+# The heatmap data last sent to a webview, per deck filter (None for the whole
+# collection). heatmap.js only gets the visible year up front and requests
+# other years from it as the user navigates.
+_sent_heatmap_data = {}
+
+def get_heatmap_year(year, deck_id=None):
+    """
+    Packed review and due counts of one calendar year, for heatmap.js, from the
+    data last sent for deck_id. None if there is none: the caller should
+    request a render, which resets the page's year requests.
+    """
+    heatmap_data = _sent_heatmap_data.get(deck_id)
+    if heatmap_data is None:
+        return None
+    return {
+        "year": year,
+        "deck_id": heatmap_data.get("deck_id"),
+        "calendar": _pack_day_counts(heatmap_data.get("calendar", {}), year),
+        "due_calendar": _pack_day_counts(heatmap_data.get("due_calendar", {}), year),
+    }
+
+def _pack_heatmap_data(heatmap_data):
+    """
+    The webview form of get_heatmap_data(): the streak summary plus the counts
+    of the current year only, so the payload size does not grow with the age
+    of the collection.
+    """
+    deck_id = heatmap_data.get("deck_id")
+    _sent_heatmap_data[deck_id] = heatmap_data
+    packed = {key: value for key, value in heatmap_data.items() if key not in ("calendar", "due_calendar")}
+    if deck_id is not None:
+        packed["deck_name"] = mw.col.decks.name(deck_id)
+    today_date_key = heatmap_data.get("today_date_key")
+    if today_date_key:
+        packed["window"] = get_heatmap_year(int(today_date_key[:4]), deck_id)
+    return packed
+
+def get_widget_deck_filter():
+    """The deck the deck browser heatmap is filtered to, or None for all decks."""
+    deck_id = mw.col.conf.get("onigiri_heatmap_deck_filter") if mw.col else None
+    return int(deck_id) if deck_id else None
+
+def set_widget_deck_filter(deck_id):
+    config.set_collection_conf("onigiri_heatmap_deck_filter", int(deck_id) if deck_id else None)
+
+def get_deck_options():
+    """[id, name] of every normal deck, for the heatmap's deck filter."""
+    return [
+        [deck.id, deck.name]
+        for deck in sorted(mw.col.decks.all_names_and_ids(include_filtered=False), key=lambda d: d.name.lower())
+    ]
+
+def get_heatmap_config(deck_selector=False):
+    """
+    Display settings and labels for heatmap.js. deck_selector adds the deck
+    filter to the header (the deck browser widget).
+    """
+    conf = config.get_config_view()
+    svg_content = _load_shape_svg(conf.get("heatmapShape", DEFAULTS["heatmapShape"]))
+
     from .translations import tr
-    heatmap_config = {
+    return {
         "heatmapSvgContent": svg_content,
         "heatmapShowStreak": conf.get("heatmapShowStreak", DEFAULTS["heatmapShowStreak"]),
         "heatmapShowMonths": conf.get("heatmapShowMonths", DEFAULTS["heatmapShowMonths"]),
@@ -186,12 +309,96 @@ def get_heatmap_and_config():
         "heatmapShowWeekHeader": conf.get("heatmapShowWeekHeader", DEFAULTS["heatmapShowWeekHeader"]),
         "heatmapDefaultView": conf.get("heatmapDefaultView", DEFAULTS["heatmapDefaultView"]),
         "heatmapWeekStart": conf.get("heatmapWeekStart", DEFAULTS.get("heatmapWeekStart", "monday")),
+        "heatmapDeckSelector": deck_selector,
+        "heatmapRenderer": conf.get("heatmapRenderer", DEFAULTS["heatmapRenderer"]),
         "i18n": {
             "activity": tr("heatmap_activity_label"),
             "year": tr("view_year"),
             "month": tr("view_month"),
             "week": tr("view_week"),
             "day_streak": tr("heatmap_day_streak"),
+            "all_decks": tr("heatmap_all_decks"),
         }
     }
-    return heatmap_data, heatmap_config
+
+def get_heatmap_and_config():
+    """Helper to bundle heatmap data and configuration together for JavaScript."""
+    return _pack_heatmap_data(get_heatmap_data()), get_heatmap_config()
+
+# --- Background rendering ---
+# The deck browser is delivered with the skeleton from onigiri_renderer and the
+# review queries run in a background collection op. Every request bumps the
+# generation; a result whose generation is no longer current (another render
+# started, the screen changed or the profile closed) is dropped instead of
+# pushed. Only one op runs at a time (see _data_lock); a request made
+# meanwhile is started when the running op finishes.
+_render_request = {"generation": 0, "web": None, "deck_id": None, "deck_selector": False, "running": False}
+
+def request_heatmap_render(web, deck_id=None, deck_selector=False):
+    """
+    Computes the heatmap (of deck_id and its subdecks, if given) off the main
+    thread and pushes it into web when done.
+    """
+    _render_request["generation"] += 1
+    _render_request.update(web=web, deck_id=deck_id, deck_selector=deck_selector)
+    if not _render_request["running"]:
+        _start_render_op()
+
+def cancel_heatmap_render(*args):
+    """Drops any pending heatmap result (hooked on screen changes)."""
+    _render_request["generation"] += 1
+    _render_request["web"] = None
+
+def _forget_sent_heatmap_data(*args):
+    _sent_heatmap_data.clear()
+
+def _start_render_op():
+    from aqt.operations import QueryOp
+
+    generation = _render_request["generation"]
+    deck_id = _render_request["deck_id"]
+    _render_request["running"] = True
+
+    def finish():
+        _render_request["running"] = False
+        if generation != _render_request["generation"]:
+            if _render_request["web"] is not None:
+                _start_render_op()
+            return False
+        return True
+
+    def on_success(heatmap_data):
+        if finish():
+            _push_heatmap(_render_request["web"], heatmap_data, _render_request["deck_selector"])
+
+    def on_failure(error):
+        if finish():
+            print(f"Onigiri: Error computing heatmap: {error}")
+
+    QueryOp(
+        parent=mw,
+        op=lambda col: get_heatmap_data(deck_id),
+        success=on_success,
+    ).failure(on_failure).run_in_background()
+
+def _push_heatmap(web, heatmap_data, deck_selector):
+    if web is None or not mw.col:
+        return
+    try:
+        script = (
+            "window.onigiriHeatmapData = %s;"
+            "window.onigiriHeatmapConfig = %s;"
+            "if (window.OnigiriHeatmap && typeof window.OnigiriHeatmap.autoRender === 'function') "
+            "{ window.OnigiriHeatmap.autoRender(); }"
+        ) % (json.dumps(_pack_heatmap_data(heatmap_data)), json.dumps(get_heatmap_config(deck_selector)))
+        web.eval(script)
+    except Exception as e:
+        print(f"Onigiri: Error pushing heatmap data: {e}")
+
+try:
+    from aqt import gui_hooks
+    gui_hooks.state_will_change.append(cancel_heatmap_render)
+    gui_hooks.profile_will_close.append(cancel_heatmap_render)
+    gui_hooks.profile_will_close.append(_forget_sent_heatmap_data)
+except Exception:
+    pass
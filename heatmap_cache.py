@@ -0,0 +1,364 @@
+"""
+Persisted per-day review counts for the heatmap.
+
+Grouping the whole revlog by local day is the expensive part of building the
+heatmap, so the per-day counts of past days are kept in a small SQLite file next
+to the profile's collection, together with a high-water mark on revlog ids. A
+refresh only aggregates revlog rows newer than the watermark. Today's reviews
+are left to the caller (they are cheap to count and change with every answer or
+undo). The table is rebuilt from scratch when the rollover hour or the timezone
+changes, or when rows at or below the watermark were deleted or imported.
+
+The same refresh maintains per-deck counts, (deck id, day) -> reviews, for the
+deck-filtered heatmap. A review counts towards its card's current home deck;
+subtree totals are summed by the caller from the deck tree. The deck each
+reviewed card's reviews are counted under is kept too, so when an operation
+other than answering changes cards, the cards modified since are looked up and
+the past reviews of those that changed decks are moved along with them. The
+reviews of a deleted card stay with the deck it was last in; reviews of cards
+deleted before they were aggregated are only counted collection-wide. The
+operations that change cards are recorded by card_changes; answering never
+moves a card, so answers are not.
+"""
+
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aqt import mw
+from .card_changes import CardChanges, Changes
+
+_CACHE_FILENAME = "onigiri_heatmap_cache.db"
+_SCHEMA_VERSION = 3
+
+# type IN (0,1,2,3) filters out manual operations (type 4 = manual rescheduling/resets)
+_REVIEW_FILTER = "revlog.type IN (0,1,2,3)"
+_DAY_KEY_SQL = "STRFTIME('%Y-%m-%d', revlog.id / 1000 - ?, 'unixepoch', 'localtime', 'start of day')"
+# Cards in filtered decks count towards their home deck
+_DECK_ID_SQL = "CASE WHEN cards.odid != 0 THEN cards.odid ELSE cards.did END"
+
+# In-memory copy of the persisted aggregates for the current profile
+_state = {
+    "path": None,             # cache file the state belongs to
+    "signature": None,        # (schema, rollover hour, timezone) the day keys were built with
+    "watermark": 0,           # highest revlog id (any type) included
+    "revlog_rows": 0,         # revlog rows (any type) up to the watermark
+    "first_review_id": None,  # lowest review id, for the daily average and first year
+    "days": None,             # {day_key: review count}
+    "deck_days": None,        # {deck_id: {day_key: review count}}
+    "card_mod_watermark": 0,  # cards modified at or after this (seconds) may have changed decks
+    "schema_path": None,      # cache file whose tables are known to exist
+}
+
+# A sync, an undo or a reset may have moved cards too; they only trigger the
+# card move check here, the aggregates are validated against the revlog.
+_changes = CardChanges()
+
+# Beyond this many card ids a query is split, to stay under SQLite's variable limit
+_ID_CHUNK = 500
+
+
+def _cache_path() -> Optional[str]:
+    try:
+        return os.path.join(mw.pm.profileFolder(), _CACHE_FILENAME)
+    except Exception:
+        return None
+
+
+def _signature(rollover_hour: int) -> str:
+    tz = f"{'/'.join(time.tzname)}|{time.timezone}|{time.altzone}"
+    return f"{_SCHEMA_VERSION}|{rollover_hour}|{tz}"
+
+
+def _connect(path: str, create: bool = False) -> sqlite3.Connection:
+    """Opens the cache file, creating its tables on first use (or when create is set)."""
+    conn = sqlite3.connect(path)
+    if create or _state["schema_path"] != path:
+        _create_schema(conn)
+        _state["schema_path"] = path
+    return conn
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS days (day_key TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS deck_days (deck_id INTEGER NOT NULL, day_key TEXT NOT NULL, "
+        "count INTEGER NOT NULL, PRIMARY KEY (deck_id, day_key))"
+    )
+    # The deck each reviewed card's aggregated reviews are counted under
+    conn.execute("CREATE TABLE IF NOT EXISTS card_decks (card_id INTEGER PRIMARY KEY, deck_id INTEGER NOT NULL)")
+
+
+def _load_from_disk(path: str) -> None:
+    """Loads the persisted aggregates into _state (leaves it empty if unreadable)."""
+    _state.update(
+        path=path, signature=None, watermark=0, revlog_rows=0, first_review_id=None, days=None, deck_days=None,
+        card_mod_watermark=0, schema_path=None,
+    )
+    if not path or not os.path.exists(path):
+        return
+    try:
+        conn = _connect(path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            days = dict(conn.execute("SELECT day_key, count FROM days"))
+            deck_days = {}
+            for deck_id, day_key, count in conn.execute("SELECT deck_id, day_key, count FROM deck_days"):
+                deck_days.setdefault(deck_id, {})[day_key] = count
+        finally:
+            conn.close()
+        first_review_id = meta.get("first_review_id")
+        _state.update(
+            signature=meta.get("signature"),
+            watermark=int(meta.get("watermark", 0)),
+            revlog_rows=int(meta.get("revlog_rows", 0)),
+            first_review_id=int(first_review_id) if first_review_id else None,
+            days=days,
+            deck_days=deck_days,
+            card_mod_watermark=int(meta.get("card_mod_watermark", 0)),
+        )
+    except Exception as e:
+        print(f"Onigiri: Could not read heatmap cache, rebuilding: {e}")
+
+
+def _save(
+    changed_days: Dict[str, int],
+    changed_deck_days: List[Tuple[int, str, int]],
+    full: bool,
+    card_decks: Iterable[Tuple[int, int]] = (),
+) -> None:
+    path = _state["path"]
+    if not path:
+        return
+    try:
+        # A rebuild also recreates the tables if the file was removed meanwhile
+        conn = _connect(path, create=full)
+        try:
+            with conn:
+                if full:
+                    conn.execute("DELETE FROM days")
+                    conn.execute("DELETE FROM deck_days")
+                    conn.execute("DELETE FROM card_decks")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO days (day_key, count) VALUES (?, ?)",
+                    changed_days.items(),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO deck_days (deck_id, day_key, count) VALUES (?, ?, ?)",
+                    [row for row in changed_deck_days if row[2]],
+                )
+                conn.executemany(
+                    "DELETE FROM deck_days WHERE deck_id = ? AND day_key = ?",
+                    [row[:2] for row in changed_deck_days if not row[2]],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO card_decks (card_id, deck_id) VALUES (?, ?)",
+                    card_decks,
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [
+                        ("signature", _state["signature"]),
+                        ("watermark", str(_state["watermark"])),
+                        ("revlog_rows", str(_state["revlog_rows"])),
+                        ("first_review_id", str(_state["first_review_id"] or "")),
+                        ("card_mod_watermark", str(_state["card_mod_watermark"])),
+                    ],
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Onigiri: Could not persist heatmap cache: {e}")
+
+
+def _query_deck_days(id_filter: str, offset_seconds: int, *args) -> List[Tuple[int, str, int]]:
+    return mw.col.db.all(
+        f"SELECT {_DECK_ID_SQL} AS deck_id, {_DAY_KEY_SQL} AS day_key, COUNT() "
+        f"FROM revlog JOIN cards ON cards.id = revlog.cid "
+        f"WHERE {_REVIEW_FILTER} AND {id_filter} GROUP BY deck_id, day_key",
+        offset_seconds, *args,
+    )
+
+
+def _query_card_decks(id_filter: str, *args) -> List[Tuple[int, int]]:
+    return mw.col.db.all(
+        f"SELECT DISTINCT cards.id, {_DECK_ID_SQL} FROM revlog JOIN cards ON cards.id = revlog.cid "
+        f"WHERE {_REVIEW_FILTER} AND {id_filter}",
+        *args,
+    )
+
+
+def _rebuild(signature: str, offset_seconds: int, max_id: int, revlog_rows: int) -> None:
+    card_mod_watermark = int(time.time()) - 1
+    days = dict(mw.col.db.all(
+        f"SELECT {_DAY_KEY_SQL} AS day_key, COUNT() FROM revlog "
+        f"WHERE {_REVIEW_FILTER} AND id <= ? GROUP BY day_key",
+        offset_seconds, max_id,
+    ))
+    first_review_id = mw.col.db.scalar(
+        f"SELECT min(id) FROM revlog WHERE {_REVIEW_FILTER} AND id <= ?", max_id
+    )
+    deck_rows = _query_deck_days("revlog.id <= ?", offset_seconds, max_id)
+    deck_days = {}
+    for deck_id, day_key, count in deck_rows:
+        deck_days.setdefault(deck_id, {})[day_key] = count
+    _state.update(
+        signature=signature,
+        watermark=max_id,
+        revlog_rows=revlog_rows,
+        first_review_id=first_review_id,
+        days=days,
+        deck_days=deck_days,
+        card_mod_watermark=card_mod_watermark,
+    )
+    _save(days, deck_rows, full=True, card_decks=_query_card_decks("revlog.id <= ?", max_id))
+
+
+def _apply_new_rows(offset_seconds: int, max_id: int, revlog_rows: int) -> None:
+    new_counts = mw.col.db.all(
+        f"SELECT {_DAY_KEY_SQL} AS day_key, COUNT() FROM revlog "
+        f"WHERE {_REVIEW_FILTER} AND id > ? AND id <= ? GROUP BY day_key",
+        offset_seconds, _state["watermark"], max_id,
+    )
+    days = _state["days"]
+    changed = {}
+    for day_key, count in new_counts:
+        days[day_key] = days.get(day_key, 0) + count
+        changed[day_key] = days[day_key]
+    if _state["first_review_id"] is None and new_counts:
+        _state["first_review_id"] = mw.col.db.scalar(
+            f"SELECT min(id) FROM revlog WHERE {_REVIEW_FILTER} AND id > ? AND id <= ?",
+            _state["watermark"], max_id,
+        )
+    deck_days = _state["deck_days"]
+    changed_deck_days = []
+    for deck_id, day_key, count in _query_deck_days(
+        "revlog.id > ? AND revlog.id <= ?", offset_seconds, _state["watermark"], max_id
+    ):
+        counts = deck_days.setdefault(deck_id, {})
+        counts[day_key] = counts.get(day_key, 0) + count
+        changed_deck_days.append((deck_id, day_key, counts[day_key]))
+    card_decks = _query_card_decks("revlog.id > ? AND revlog.id <= ?", _state["watermark"], max_id)
+    _state.update(watermark=max_id, revlog_rows=revlog_rows)
+    _save(changed, changed_deck_days, full=False, card_decks=card_decks)
+
+
+def _counted_decks(card_ids: List[int]) -> Dict[int, int]:
+    """{card id: deck its aggregated reviews are counted under} for the given cards that have any."""
+    conn = _connect(_state["path"])
+    try:
+        counted = {}
+        for start in range(0, len(card_ids), _ID_CHUNK):
+            chunk = card_ids[start:start + _ID_CHUNK]
+            counted.update(conn.execute(
+                f"SELECT card_id, deck_id FROM card_decks WHERE card_id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return counted
+    finally:
+        conn.close()
+
+
+def _apply_card_moves(offset_seconds: int) -> None:
+    """Moves the aggregated reviews of cards that changed decks to their current deck."""
+    card_mod_watermark = int(time.time()) - 1
+    current = dict(mw.col.db.all(
+        f"SELECT id, {_DECK_ID_SQL} FROM cards WHERE mod >= ?", _state["card_mod_watermark"]
+    ))
+    counted = _counted_decks(list(current)) if current and _state["path"] else {}
+    moved = {card_id: deck_id for card_id, deck_id in counted.items() if current[card_id] != deck_id}
+
+    deck_days = _state["deck_days"]
+    changed = {}
+    card_ids = list(moved)
+    for start in range(0, len(card_ids), _ID_CHUNK):
+        ids = ",".join(str(int(card_id)) for card_id in card_ids[start:start + _ID_CHUNK])
+        for card_id, day_key, count in mw.col.db.all(
+            f"SELECT revlog.cid, {_DAY_KEY_SQL} AS day_key, COUNT() FROM revlog "
+            f"WHERE {_REVIEW_FILTER} AND revlog.cid IN ({ids}) AND revlog.id <= ? GROUP BY revlog.cid, day_key",
+            offset_seconds, _state["watermark"],
+        ):
+            for deck_id, delta in ((moved[card_id], -count), (current[card_id], count)):
+                counts = deck_days.setdefault(deck_id, {})
+                counts[day_key] = counts.get(day_key, 0) + delta
+                if not counts[day_key]:
+                    del counts[day_key]
+                changed[(deck_id, day_key)] = counts.get(day_key, 0)
+    _state["card_mod_watermark"] = card_mod_watermark
+    if not moved:
+        # The persisted watermark only saves rechecking a few cards after a restart
+        return
+    _save(
+        {},
+        [(deck_id, day_key, count) for (deck_id, day_key), count in changed.items()],
+        full=False,
+        card_decks=[(card_id, current[card_id]) for card_id in moved],
+    )
+
+
+def _refresh(rollover_hour: int, today_start_ms: int, changes: Changes) -> None:
+    """Brings _state up to date with the revlog rows before today."""
+    offset_seconds = rollover_hour * 3600
+    signature = _signature(rollover_hour)
+    cards_changed = changes.stale or changes.cards
+
+    path = _cache_path()
+    if path != _state["path"]:
+        _load_from_disk(path)
+        # Cards may have changed decks since the file was last updated
+        cards_changed = True
+
+    # All cheap: max() walks the id index, count() without a WHERE clause
+    # counts b-tree pages and only today's rows are scanned.
+    max_id = mw.col.db.scalar("SELECT max(id) FROM revlog WHERE id < ?", today_start_ms) or 0
+    total_rows = mw.col.db.scalar("SELECT count() FROM revlog") or 0
+    rows_today = mw.col.db.scalar("SELECT count() FROM revlog WHERE id >= ?", today_start_ms) or 0
+    revlog_rows = total_rows - rows_today
+
+    if _state["days"] is None or _state["signature"] != signature or max_id < _state["watermark"]:
+        _rebuild(signature, offset_seconds, max_id, revlog_rows)
+        return
+    # Before new rows are added under the cards' current decks
+    if cards_changed:
+        _apply_card_moves(offset_seconds)
+    if max_id != _state["watermark"] or revlog_rows != _state["revlog_rows"]:
+        new_rows = mw.col.db.scalar(
+            "SELECT count() FROM revlog WHERE id > ? AND id <= ?", _state["watermark"], max_id
+        ) or 0
+        if _state["revlog_rows"] + new_rows != revlog_rows:
+            # Rows at or below the watermark were deleted or imported
+            _rebuild(signature, offset_seconds, max_id, revlog_rows)
+        else:
+            _apply_new_rows(offset_seconds, max_id, revlog_rows)
+
+
+def get_past_review_days(rollover_hour: int, today_start_ms: int) -> Tuple[Dict[str, int], Optional[int]]:
+    """
+    Returns ({local day key: review count}, first review id) for revlog rows
+    before today, with day keys shifted by the rollover hour. Treat the dict
+    as read-only.
+    """
+    _changes.catch_up(lambda changes: _refresh(rollover_hour, today_start_ms, changes))
+    return _state["days"], _state["first_review_id"]
+
+
+def get_past_deck_review_days(rollover_hour: int, today_start_ms: int) -> Dict[int, Dict[str, int]]:
+    """
+    Returns {deck id: {local day key: review count}} for revlog rows before
+    today, counting each deck on its own (no subdecks). Treat as read-only.
+    """
+    _changes.catch_up(lambda changes: _refresh(rollover_hour, today_start_ms, changes))
+    return _state["deck_days"]
+
+
+def reset(*args) -> None:
+    """Forgets the in-memory aggregates (the file is re-validated on next use)."""
+    _state.update(
+        path=None, signature=None, watermark=0, revlog_rows=0, first_review_id=None, days=None, deck_days=None,
+        card_mod_watermark=0, schema_path=None,
+    )
+    _changes.clear()
+
+
+_changes.register_hooks(reset)
@@ -5,6 +5,7 @@ import sys
 from aqt import mw
 from aqt.qt import *
 from aqt.webview import AnkiWebView
+from . import deck_meta
 from .translations import tr
 
 
@@ -22,8 +23,7 @@ class IconChooserDialog(QDialog):
         os.makedirs(self.icons_dir, exist_ok=True)
         
         # Current Config
-        self.custom_icons = mw.col.conf.get("onigiri_custom_deck_icons", {})
-        self.current_setting = self.custom_icons.get(self.deck_id, {})
+        self.current_setting = deck_meta.get_deck_meta().icon(self.deck_id)
         self.current_color = self.current_setting.get("color", "#888888")
         self.current_icon = self.current_setting.get("icon", "")
 
@@ -83,10 +83,7 @@ class IconChooserDialog(QDialog):
             self.web.eval(f"updateData({json.dumps(payload)})")
             
         elif cmd == "reset":
-            if self.deck_id in self.custom_icons:
-                del self.custom_icons[self.deck_id]
-                mw.col.conf["onigiri_custom_deck_icons"] = self.custom_icons
-                mw.col.setMod()
+            deck_meta.clear_deck_icon(self.deck_id)
             self.accept()
             
         elif cmd == "cancel":
@@ -106,14 +103,7 @@ class IconChooserDialog(QDialog):
                 
         elif cmd.startswith("save:"):
             data = json.loads(cmd.split(":", 1)[1])
-            self.custom_icons[self.deck_id] = {
-                "icon": data["icon"],
-                "color": data["color"]
-            }
-            mw.col.conf["onigiri_custom_deck_icons"] = self.custom_icons
-            mw.col.setMod()
-            mw.col.conf["onigiri_custom_deck_icons"] = self.custom_icons
-            mw.col.setMod()
+            deck_meta.set_deck_icon(self.deck_id, data["icon"], data["color"])
             self.accept()
             
         elif cmd.startswith("delete_icon:"):
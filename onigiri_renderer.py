@@ -8,7 +8,7 @@ from aqt import mw
 from . import patcher
 from aqt.deckbrowser import DeckBrowser, RenderDeckNodeContext
 from anki.decks import DeckId
-from . import config, heatmap, deck_tree_updater, sidebar_api
+from . import config, heatmap, deck_meta, deck_tree_updater, sidebar_api
 from .gamification import onigimon, restaurant_level
 from .templates import custom_body_template
 from .translations import tr
@@ -268,7 +268,7 @@ def _get_onigiri_favorites_html() -> str:
     Automatically cleans up deleted decks from the favorites list.
     """
     try:
-        favorite_dids = mw.col.conf.get("onigiri_favorite_decks", [])
+        favorite_dids = list(deck_meta.get_deck_meta().favorite_list)
         if not favorite_dids:
             fav_placeholder = """
             <div class="onigiri-favorites-widget">
@@ -331,8 +331,7 @@ def _get_onigiri_favorites_html() -> str:
         
         # Clean up deleted decks from favorites if any were found
         if len(valid_dids) != len(favorite_dids):
-            mw.col.conf["onigiri_favorite_decks"] = valid_dids
-            mw.col.setMod()
+            deck_meta.set_favorites(valid_dids)
             removed_count = len(favorite_dids) - len(valid_dids)
             print(f"Onigiri: Cleaned up {removed_count} deleted/ghost deck(s) from favorites")
         
@@ -1586,9 +1585,9 @@ def render_onigiri_deck_browser(self: DeckBrowser, reuse: bool = False) -> None:
     # --- Part 4: Manually Build the Deck Tree HTML ---
     # CRITICAL: Store tree data for Anki's context menu operations (e.g., deck deletion)
     # Anki's native _delete method expects self._render_data.tree to exist
-    tree_data = self.mw.col.sched.deck_due_tree()
+    tree_data = deck_tree_updater.deck_tree_for_render(self)
     self._render_data = RenderData(tree=tree_data)
-    tree_html = deck_tree_updater._render_deck_tree_html_only(self)
+    tree_html, virtual_rows = deck_tree_updater.render_deck_list_for_page(self)
     
     # Add OnigiriEngine JavaScript
     onigiri_engine_js = """
@@ -1865,6 +1864,8 @@ def render_onigiri_deck_browser(self: DeckBrowser, reuse: bool = False) -> None:
         "addonPackage": mw.addonManager.addonFromModule(__name__),
         "collapsedIcons": collapsed_icons,
         "deckSortMode": mw.col.conf.get("onigiri_sort_mode", "default"),
+        "deckTreeVersion": deck_tree_updater.get_sent_tree_version(),
+        "deckSearchGeneration": deck_tree_updater.get_deck_search_generation(),
         "markerColors": conf.get("markerColors", config.DEFAULTS.get("markerColors", {})),
         "filters": {
             "favorites": bool(mw.col.conf.get("onigiri_show_favourites", False) or mw.col.conf.get("onigiri_show_favorites", False)),
@@ -1882,6 +1883,14 @@ def render_onigiri_deck_browser(self: DeckBrowser, reuse: bool = False) -> None:
         window.ONIGIRI_SYNC_STATUS = "{sync_status}";
     </script>
     """
+    if virtual_rows is not None:
+        # ("</" is escaped so row HTML cannot end the script element)
+        rows_json = json.dumps(virtual_rows).replace("</", "<\\/")
+        js_injection += f"""
+    <script>
+        window.ONIGIRI_DECK_ROWS = {rows_json};
+    </script>
+    """
     
     final_body = custom_body_template \
         .replace("{tree}", tree_html) \
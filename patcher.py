@@ -19,7 +19,6 @@ from aqt import mw, gui_hooks
 from aqt.utils import showInfo, tooltip
 from aqt.webview import AnkiWebView
 from aqt.deckbrowser import DeckBrowser
-from aqt.main import MainWebView
 from aqt.utils import tr as anki_tr
 from aqt.overview import Overview
 from aqt.reviewer import Reviewer
@@ -32,12 +31,15 @@ import base64
 import random
 import math
 import webbrowser
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from urllib.parse import urlparse, parse_qs, urlencode, unquote, quote_plus
 from typing import Optional, Dict, List, Tuple, Any, Callable, Union
 from . import config
 from . import onigiri_renderer
 from . import deck_tree_updater
+from . import deck_stats
+from . import deck_meta
 from .gamification import restaurant_level
 from . import settings, heatmap, fonts, gamification_settings
 from .translations import tr as tr_at
@@ -155,7 +157,6 @@ def patch_qmenu():
 # --- Toolbar Patching ---
 _managed_hooks = []
 _toolbar_patched = False
-_original_MainWebView_eventFilter = None
 
 
 def get_sync_status():
@@ -1062,7 +1063,7 @@ def on_webview_js_message(handled, message, context):
         if cmd.startswith("saveSidebarWidth:"):
             try:
                 width = int(cmd.split(":")[1])
-                mw.col.conf["modern_menu_sidebar_width"] = width
+                config.set_collection_conf("modern_menu_sidebar_width", width)
                 mw.col.setMod()
             except:
                 pass
@@ -1070,7 +1071,7 @@ def on_webview_js_message(handled, message, context):
         if cmd.startswith("saveSidebarState:"):
             try:
                 is_collapsed = cmd.split(":")[1] == 'true'
-                mw.col.conf["onigiri_sidebar_collapsed"] = is_collapsed
+                config.set_collection_conf("onigiri_sidebar_collapsed", is_collapsed)
                 mw.col.setMod()
             except Exception as e:
                 print(f"Onigiri: Error saving sidebar state: {e}")
@@ -1079,7 +1080,7 @@ def on_webview_js_message(handled, message, context):
         if cmd.startswith("saveDeckFocusState:"):
             try:
                 is_focused = cmd.split(":")[1] == 'true'
-                mw.col.conf["onigiri_deck_focus_mode"] = is_focused
+                config.set_collection_conf("onigiri_deck_focus_mode", is_focused)
                 mw.col.setMod()
             except Exception as e:
                 print(f"Onigiri: Error saving deck focus state: {e}")
@@ -1293,6 +1294,12 @@ def patch_overview():
 					'</div>'
 				)
 
+		# Filled with the current deck's activity by heatmap.request_heatmap_render
+		heatmap_html = ""
+		if config.get_config_view().get("heatmapShowOnOverview", False):
+			from .onigiri_renderer import _get_onigiri_heatmap_html
+			heatmap_html = f'<div class="overview-heatmap">{_get_onigiri_heatmap_html()}</div>'
+
 		return (
 			'<div class="overview-container">'
 				'<div class="stats-container">'
@@ -1302,6 +1309,7 @@ def patch_overview():
 					f'{study_now_text}'
 				'</button>'
 				f'{bottom_actions_html}'
+				f'{heatmap_html}'
 				f'<button id="onigiri-reveal-btn">{tr_at("click_to_reveal")}</button>'
 			'</div>'
 		)
@@ -2825,7 +2833,7 @@ def generate_icon_css(addon_package, conf):
             css_rules.append(f"{selector} {{ mask-image: {url}; -webkit-mask-image: {url}; }}")
 
     # --- Custom Deck Icons ---
-    custom_deck_icons = mw.col.conf.get("onigiri_custom_deck_icons", {})
+    custom_deck_icons = deck_meta.get_deck_meta().icons
     for did, data in custom_deck_icons.items():
         icon_file = data.get("icon")
         color = data.get("color")
@@ -3447,34 +3455,9 @@ def _get_external_hooks():
     return _managed_hooks
 
 
-def _new_MainWebView_eventFilter(self: MainWebView, obj: QObject, evt: QEvent) -> bool:
-	"""Prevents Anki's default hover-to-show-toolbar behavior."""
-	conf = config.get_config()
-	should_hide_setting = conf.get("hideNativeHeaderAndBottomBar", False)
-
-	screens_to_interfere = ["deckBrowser", "overview", "review"]
-	
-	should_interfere = should_hide_setting and mw.state in screens_to_interfere
-
-	if should_interfere:
-		# On deck browser/overview, prevent Anki's native hover logic from showing toolbars
-		if super(MainWebView, self).eventFilter(obj, evt):
-			return True
-		if evt.type() == QEvent.Type.Leave and self.mw.fullscreen:
-			self.mw.show_menubar()
-			return True
-		# Block other events from reaching the original handler, which would show the toolbars.
-		return False
-	else:
-		# On all other screens (like reviewer), or if the setting is off, use Anki's original logic.
-		if _original_MainWebView_eventFilter:
-			return _original_MainWebView_eventFilter(self, obj, evt)
-		return super(MainWebView, self).eventFilter(obj, evt)
-
-
 def _update_toolbar_visibility(new_state: str, _old_state: str) -> None:
     """This function is called by a hook every time the screen changes."""
-    conf = config.get_config()
+    conf = config.get_config_view()
     should_hide_setting = conf.get("hideNativeHeaderAndBottomBar", False)
     pro_hide = conf.get("proHide", False)
     max_hide = conf.get("maxHide", False)
@@ -3586,11 +3569,169 @@ def on_reviewer_did_answer_card(reviewer, card, ease):
 
 
 
+# --- Deck Row Cache ---
+# A deck row's HTML depends only on its node, its favorite/mark flags, its
+# enhanced stats and a handful of settings, so rows that did not change are
+# reused verbatim instead of being rebuilt on every render. The settings are
+# folded into a generation number and everything per-deck is part of the key,
+# so a stale row is never served; the invalidation below only drops rows that
+# can no longer be hit.
+_ROW_CACHE_SIZE = 10_000
+_ROW_SETTINGS = (
+    "markerColors", "hideAllDeckCounts", "enhancedDeckStats", "enhancedDeckStatsList",
+    "enhancedDeckProportionBar", "deck_indentation_mode", "deck_indentation_custom_px",
+)
+_row_cache = {
+    "rows": OrderedDict(),  # key -> row HTML, least recently used first
+    "keys_by_deck": {},     # deck id -> keys of its cached rows
+    "generation": 0,        # bumped when one of _ROW_SETTINGS changes
+    "hits": 0,
+    "misses": 0,
+}
+# Positions in a row key that invalidation looks at
+_KEY_DID, _KEY_NAME, _KEY_FAVORITE, _KEY_MARK = range(4)
+
+def _row_inputs(self, ctx):
+    """The lookups every row of one render shares: favorites, marks and enhanced stats."""
+    conf = getattr(ctx, "onigiri_conf", None)
+    if conf is None:
+        conf = config.get_config_view()
+        setattr(ctx, "onigiri_conf", conf)
+    meta = deck_meta.get_deck_meta()
+    favorites = meta.favorites
+    deck_marks = meta.marks
+    enhanced_stats = None
+    if conf.get("enhancedDeckStats", False) and not conf.get("hideAllDeckCounts", False):
+        try:
+            enhanced_stats = deck_stats.get_deck_stats()
+        except Exception as e:
+            print(f"Onigiri: Error reading enhanced deck stats: {e}")
+    return favorites, deck_marks, enhanced_stats
+
+def _forget_row_keys(keys) -> None:
+    rows = _row_cache["rows"]
+    keys_by_deck = _row_cache["keys_by_deck"]
+    for key in keys:
+        rows.pop(key, None)
+        deck_keys = keys_by_deck.get(key[_KEY_DID])
+        if deck_keys is not None:
+            deck_keys.discard(key)
+            if not deck_keys:
+                del keys_by_deck[key[_KEY_DID]]
+
+def forget_deck_rows(deck_ids) -> None:
+    """Drops the cached rows of the given decks."""
+    keys = []
+    for deck_id in deck_ids:
+        keys.extend(_row_cache["keys_by_deck"].get(deck_id, ()))
+    _forget_row_keys(keys)
+
+def reset_deck_row_cache(*args) -> None:
+    """Empties the row cache and its counters (profile switch)."""
+    _row_cache["rows"].clear()
+    _row_cache["keys_by_deck"].clear()
+    _row_cache["hits"] = 0
+    _row_cache["misses"] = 0
+
+def deck_row_cache_stats() -> dict:
+    """Hits, misses and size of the deck row cache."""
+    return {
+        "hits": _row_cache["hits"],
+        "misses": _row_cache["misses"],
+        "rows": len(_row_cache["rows"]),
+        "capacity": _ROW_CACHE_SIZE,
+    }
+
+def _on_row_settings_changed(changed_paths) -> None:
+    _row_cache["generation"] += 1
+    _row_cache["rows"].clear()
+    _row_cache["keys_by_deck"].clear()
+
+def _on_deck_flags_changed(changed_paths) -> None:
+    """Drops the rows of decks whose favorite or mark is not the one in their key."""
+    if not mw.col:
+        return
+    meta = deck_meta.get_deck_meta()
+    favorites = meta.favorites
+    deck_marks = meta.marks
+    _forget_row_keys([
+        key
+        for keys in _row_cache["keys_by_deck"].values() for key in keys
+        if key[_KEY_FAVORITE] != (str(key[_KEY_DID]) in favorites)
+        or key[_KEY_MARK] != deck_marks.get(str(key[_KEY_DID]))
+    ])
+
+def _on_decks_changed(changes, handler) -> None:
+    """Drops the rows of decks that were deleted or renamed."""
+    if not getattr(changes, "deck", False) or not mw.col or not _row_cache["keys_by_deck"]:
+        return
+    try:
+        names = {int(d.id): d.name.split("::")[-1] for d in mw.col.decks.all_names_and_ids()}
+    except Exception as e:
+        print(f"Onigiri: Error reading deck names for the row cache: {e}")
+        return
+    _forget_row_keys([
+        key
+        for deck_id, keys in _row_cache["keys_by_deck"].items() for key in keys
+        if names.get(int(deck_id)) != key[_KEY_NAME].split("::")[-1]
+    ])
+
+config.subscribe(_on_row_settings_changed, *_ROW_SETTINGS)
+config.subscribe(
+    _on_deck_flags_changed,
+    config.COLLECTION_KEY_PREFIX + deck_meta.FAVORITES_KEY,
+    config.COLLECTION_KEY_PREFIX + deck_meta.MARKS_KEY,
+)
+
 def _onigiri_render_deck_node(self, node, ctx) -> str:
     """
     A patched version of DeckBrowser._render_deck_node that creates the
     HTML structure Onigiri's CSS and JS expect (e.g., td.collapse-cell).
     """
+    html_parts = [_onigiri_render_deck_row(self, node, ctx)]
+    if not node.collapsed:
+        for child in node.children:
+            html_parts.append(self._render_deck_node(child, ctx))
+    return "".join(html_parts)
+
+
+def _onigiri_render_deck_row(self, node, ctx) -> str:
+    """The <tr> of a single deck, without its children (see _onigiri_render_deck_node)."""
+    inputs = getattr(ctx, "onigiri_row_inputs", None)
+    if inputs is None:
+        inputs = _row_inputs(self, ctx)
+        setattr(ctx, "onigiri_row_inputs", inputs)
+    favorites, deck_marks, enhanced_stats = inputs
+    did_str = str(node.deck_id)
+    stats = enhanced_stats.get(node.deck_id) if enhanced_stats else None
+    key = (
+        node.deck_id, node.name, did_str in favorites, deck_marks.get(did_str),
+        node.level, node.collapsed, bool(node.children), bool(getattr(node, "filtered", False)),
+        node.new_count, node.learn_count, node.review_count,
+        node.deck_id == ctx.current_deck_id,
+        tuple(stats.items()) if stats else None,
+        _row_cache["generation"],
+    )
+
+    rows = _row_cache["rows"]
+    row_html = rows.get(key)
+    if row_html is not None:
+        rows.move_to_end(key)
+        _row_cache["hits"] += 1
+        return row_html
+
+    _row_cache["misses"] += 1
+    row_html = _build_deck_row(self, node, ctx)
+    rows[key] = row_html
+    _row_cache["keys_by_deck"].setdefault(node.deck_id, set()).add(key)
+    if len(rows) > _ROW_CACHE_SIZE:
+        oldest_key = next(iter(rows))
+        _forget_row_keys([oldest_key])
+    return row_html
+
+
+def _build_deck_row(self, node, ctx) -> str:
+    """Builds a deck row's HTML; the inputs were looked up by _onigiri_render_deck_row."""
     buf = []  # Use a list for efficient string building
 
     if node.collapsed:
@@ -3600,19 +3741,15 @@ def _onigiri_render_deck_node(self, node, ctx) -> str:
         prefix = "-"
         state_class = "state-open"
 
-    conf = getattr(ctx, "onigiri_conf", None)
-    if conf is None:
-        conf = config.get_config()
-        setattr(ctx, "onigiri_conf", conf)
+    conf = ctx.onigiri_conf
+    favorites, deck_marks, enhanced_stats = ctx.onigiri_row_inputs
 
     # --- ADD THIS BLOCK ---
     # --- Onigiri Favorites ---
-    favorites = mw.col.conf.get("onigiri_favorite_decks", [])
     did_str = str(node.deck_id)
     is_favorite = did_str in favorites
     fav_attr = ' data-is-fav="1"' if is_favorite else ""
 
-    deck_marks = mw.col.conf.get("onigiri_deck_marks", {})
     mark_colors = conf.get("markerColors", {}) or {}
     default_mark_colors = {
         "red": "#FF4B4B",
@@ -3641,15 +3778,7 @@ def _onigiri_render_deck_node(self, node, ctx) -> str:
     # --- Counts HTML ---
     counts_html = ""
     
-    # Enhanced Deck Stats Logic
-    # Enhanced Deck Stats Logic
-    # 1. Try checking the instance directly (set by our new _render_deck_tree patch or deck_tree_updater)
-    enhanced_stats = getattr(self, "_onigiri_enhanced_stats", None)
-    
-    # 2. Fallback to _render_data if not found (legacy/redundancy)
-    if enhanced_stats is None and hasattr(self, "_render_data"):
-         enhanced_stats = getattr(self._render_data, "enhanced_stats", None)
-
+    # Enhanced Deck Stats Logic (enhanced_stats comes from _row_inputs)
     show_enhanced = conf.get("enhancedDeckStats", False)
     
     # Debug Logging
@@ -3774,7 +3903,7 @@ def _onigiri_render_deck_node(self, node, ctx) -> str:
     else:
         deck_type_class = "is-deck"
 
-    buf.append(f"<tr class='{klass} {deck_type_class}' id='{node.deck_id}' data-did='{node.deck_id}'{fav_attr}{mark_attr}>")
+    buf.append(f"<tr class='{klass} {deck_type_class}' id='{node.deck_id}' data-did='{node.deck_id}' data-depth='{node.level}'{fav_attr}{mark_attr}>")
 
     if node.children:
         collapse_link = f"<a class='collapse {state_class}' href=# onclick='return pycmd(\"onigiri_collapse:{node.deck_id}\")'>{prefix}</a>"
@@ -3812,10 +3941,6 @@ def _onigiri_render_deck_node(self, node, ctx) -> str:
     </td>
     </tr>""")
 
-    if not node.collapsed:
-        for child in node.children:
-            buf.append(self._render_deck_node(child, ctx))
-
     return "".join(buf) # Join the list into a single string at the end
     
 def _on_sync_did_finish():
@@ -3865,6 +3990,10 @@ def apply_patches():
     
     # Add hook for toolbar visibility changes
     gui_hooks.state_did_change.append(_update_toolbar_visibility)
+
+    # Deck row cache housekeeping
+    gui_hooks.operation_did_execute.append(_on_decks_changed)
+    gui_hooks.profile_will_close.append(reset_deck_row_cache)
     
     # Mark the hook as registered and update toolbar state
     mw._onigiri_restaurant_hook_registered = True
@@ -4175,54 +4304,3 @@ def generate_reviewer_buttons_css(conf):
         """)
         
     return "<style>" + "\\n".join(css) + "</style>"
-def _onigiri_render_deck_tree(self, *args, **kwargs):
-    """
-    Patched version of DeckBrowser._render_deck_tree to pre-fetch enhanced stats.
-    """
-    try:
-        from . import config
-        conf = config.get_config()
-        if conf.get("enhancedDeckStats", False):
-            # Pre-fetch stats
-            try:
-                # Same query as in deck_tree_updater.py
-                rows = self.mw.col.db.all("select did, queue, count() from cards group by did, queue")
-                enhanced_stats = {}
-                for did, queue, count in rows:
-                    if did not in enhanced_stats:
-                        enhanced_stats[did] = {"total": 0, "buried": 0, "suspended": 0, "new": 0, "learn": 0, "review": 0}
-                    
-                    stats = enhanced_stats[did]
-                    stats["total"] += count
-                    
-                    if queue < 0:
-                        if queue == -1: stats["suspended"] += count
-                        elif queue == -2 or queue == -3: stats["buried"] += count
-                    elif queue == 0: stats["new"] += count
-                    elif queue == 1 or queue == 3: stats["learn"] += count
-                    elif queue == 2: stats["review"] += count
-                
-                # Attach to instance
-                self._onigiri_enhanced_stats = enhanced_stats
-                # print(f"Onigiri: Pre-fetched enhanced stats for {len(enhanced_stats)} decks")
-            except Exception as e:
-                print(f"Onigiri: Error pre-fetching enhanced stats: {e}")
-                self._onigiri_enhanced_stats = None
-        else:
-             self._onigiri_enhanced_stats = None
-
-    except Exception as e:
-        print(f"Onigiri: Error in _onigiri_render_deck_tree wrapper: {e}")
-
-    # Call original
-    return _old_render_deck_tree(self, *args, **kwargs)
-
-# Store original method
-from aqt.deckbrowser import DeckBrowser
-if not hasattr(DeckBrowser, '_onigiri_patched_render_tree'):
-    if hasattr(DeckBrowser, '_render_deck_tree'):
-        _old_render_deck_tree = DeckBrowser._render_deck_tree
-        DeckBrowser._render_deck_tree = _onigiri_render_deck_tree
-        DeckBrowser._onigiri_patched_render_tree = True
-    else:
-        print("Onigiri: Warning - DeckBrowser._render_deck_tree not found, enhanced stats patch optional skipped.")
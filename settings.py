@@ -7093,6 +7093,12 @@ class SettingsDialog(QDialog):
         self.heatmap_show_week_header_check = AnimatedToggleButton(accent_color=self.accent_color)
         self.heatmap_show_week_header_check.setChecked(self.current_config.get("heatmapShowWeekHeader", True))
         visibility_layout.addWidget(self._create_toggle_row(self.heatmap_show_week_header_check, tr("show_day_labels")))
+        self.heatmap_show_on_overview_check = AnimatedToggleButton(accent_color=self.accent_color)
+        self.heatmap_show_on_overview_check.setChecked(self.current_config.get("heatmapShowOnOverview", False))
+        visibility_layout.addWidget(self._create_toggle_row(self.heatmap_show_on_overview_check, tr("show_heatmap_on_overview")))
+        self.heatmap_canvas_renderer_check = AnimatedToggleButton(accent_color=self.accent_color)
+        self.heatmap_canvas_renderer_check.setChecked(self.current_config.get("heatmapRenderer", "dom") == "canvas")
+        visibility_layout.addWidget(self._create_toggle_row(self.heatmap_canvas_renderer_check, tr("heatmap_canvas_renderer")))
         heatmap_section.add_widget(visibility_section)
 
         heatmap_color_modes_layout = QHBoxLayout()
@@ -8368,6 +8374,25 @@ class SettingsDialog(QDialog):
         
         indent_main_layout.addWidget(self.indentation_custom_row_widget)
 
+        # Virtual deck list threshold
+        virtual_row_widget = QWidget()
+        virtual_layout = QHBoxLayout(virtual_row_widget)
+        virtual_layout.setContentsMargins(5, 0, 0, 0)
+        virtual_layout.setSpacing(10)
+
+        virtual_label = QLabel(tr("virtual_deck_list_above"))
+        self.virtual_deck_list_spin = QSpinBox()
+        self.virtual_deck_list_spin.setRange(0, 1000000)
+        self.virtual_deck_list_spin.setSingleStep(500)
+        self.virtual_deck_list_spin.setValue(self.current_config.get("deckListVirtualizeAbove", 3000))
+        self.virtual_deck_list_spin.setFixedWidth(120)
+
+        virtual_layout.addWidget(virtual_label)
+        virtual_layout.addWidget(self.virtual_deck_list_spin)
+        virtual_layout.addStretch()
+
+        indent_main_layout.addWidget(virtual_row_widget)
+
         # Initial visibility check
         self._on_indentation_mode_btn_clicked(self.indentation_mode_group.checkedButton())
 
@@ -12553,6 +12578,9 @@ class SettingsDialog(QDialog):
              
         if hasattr(self, "indentation_custom_spin"):
              self.current_config["deck_indentation_custom_px"] = self.indentation_custom_spin.value()
+
+        if hasattr(self, "virtual_deck_list_spin"):
+             self.current_config["deckListVirtualizeAbove"] = self.virtual_deck_list_spin.value()
         
         # Save Hide Icon Toggles
         if hasattr(self, "hide_folder_cb"):
@@ -12650,6 +12678,8 @@ class SettingsDialog(QDialog):
         self.current_config["heatmapShowMonths"] = self.heatmap_show_months_check.isChecked()
         self.current_config["heatmapShowWeekdays"] = self.heatmap_show_weekdays_check.isChecked()
         self.current_config["heatmapShowWeekHeader"] = self.heatmap_show_week_header_check.isChecked()
+        self.current_config["heatmapShowOnOverview"] = self.heatmap_show_on_overview_check.isChecked()
+        self.current_config["heatmapRenderer"] = "canvas" if self.heatmap_canvas_renderer_check.isChecked() else "dom"
         
         if hasattr(self, "hide_retention_stars_check"):
             self.current_config["hideRetentionStars"] = self.hide_retention_stars_check.isChecked()
@@ -13008,6 +13038,9 @@ class SettingsDialog(QDialog):
             mw.col.setMod()
         if hasattr(mw.col, "mark_changed"):
             mw.col.mark_changed()
+
+        # The dialog writes many collection keys directly; announce them as a whole
+        config.publish_config_change({config.COLLECTION_KEY_PREFIX.rstrip(".")})
             
         self.accept()
         mw.reset()
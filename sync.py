@@ -67,6 +67,9 @@ class SyncManager:
         if not self._ensure_init():
             return False
 
+        # Make sure write-behind settings are on disk before zipping them
+        config.flush_config_writes()
+
         sync_path = self.get_sync_file_path()
         temp_zip = sync_path + ".tmp"
 
@@ -107,6 +110,9 @@ class SyncManager:
         if not os.path.exists(sync_path):
             return False
 
+        # Land pending local settings before the folder is swapped out
+        config.flush_config_writes()
+
         try:
             # Create a backup of current user_files just in case
             backup_dir = self._user_files_dir + "_backup"
@@ -128,6 +134,9 @@ class SyncManager:
             
             # Clean up backup
             shutil.rmtree(backup_dir)
+
+            # The settings file was replaced underneath the config cache
+            config.invalidate_config_cache()
             
             # Update state to reflect that we are in sync with this zip
             stat = os.stat(sync_path)
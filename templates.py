@@ -75,6 +75,9 @@ custom_body_template = """
     tr.deck.deck-row-appear {
         animation: deckRowAppear 0.06s linear both;
     }
+    tr.deck.deck-row-hidden {
+        display: none;
+    }
     /* --- Active State for Sidebar Toggle --- */
     .sidebar-toggle-btn.active {
         background-color: var(--highlight-bg) !important;
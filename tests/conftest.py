@@ -0,0 +1,145 @@
+"""
+The tests import Onigiri's modules outside Anki. aqt is replaced by a bare
+stand-in: an mw with a profile and no collection, and gui_hooks whose hooks
+are plain lists. The add-on folder is imported as a bare package, so its
+__init__ (the Anki wiring) does not run.
+"""
+
+import importlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import types
+
+import pytest
+
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The add-on is imported under this name, as Anki would import its folder
+ADDON_MODULE = "onigiri"
+
+
+class _Hooks:
+    """gui_hooks: every hook is a list of callbacks."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        hook = []
+        setattr(self, name, hook)
+        return hook
+
+
+class _ProfileManager:
+    def __init__(self, folder):
+        self.name = "test"
+        self._folder = folder
+
+    def profileFolder(self):
+        return self._folder
+
+
+class _AddonManager:
+    def addonFromModule(self, module):
+        return module.split(".")[0]
+
+    def getConfig(self, addon):
+        return None
+
+
+class Collection:
+    """
+    The parts of mw.col the tested modules use, over an in-memory SQLite
+    database with the cards and revlog columns they query.
+    """
+
+    def __init__(self, today=100, day_cutoff=0, rollover=4):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE cards (
+                id INTEGER PRIMARY KEY, nid INTEGER NOT NULL DEFAULT 0, did INTEGER NOT NULL DEFAULT 1,
+                odid INTEGER NOT NULL DEFAULT 0, type INTEGER NOT NULL DEFAULT 0, queue INTEGER NOT NULL DEFAULT 0,
+                due INTEGER NOT NULL DEFAULT 0, ivl INTEGER NOT NULL DEFAULT 0, mod INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE revlog (
+                id INTEGER PRIMARY KEY, cid INTEGER NOT NULL, ease INTEGER NOT NULL DEFAULT 3,
+                ivl INTEGER NOT NULL DEFAULT 1, time INTEGER NOT NULL DEFAULT 5000, type INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX ix_revlog_cid ON revlog (cid);
+            """
+        )
+        self.db = self
+        self.conf = {"rollover": rollover}
+        self.sched = types.SimpleNamespace(today=today, day_cutoff=day_cutoff)
+
+    # mw.col.db
+    def execute(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+    def all(self, sql, *args):
+        return self._conn.execute(sql, args).fetchall()
+
+    def list(self, sql, *args):
+        return [row[0] for row in self._conn.execute(sql, args)]
+
+    def first(self, sql, *args):
+        return self._conn.execute(sql, args).fetchone()
+
+    def scalar(self, sql, *args):
+        row = self._conn.execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def setMod(self):
+        pass
+
+
+def _install_aqt(profile_folder):
+    mw = types.SimpleNamespace(
+        col=None,
+        pm=_ProfileManager(profile_folder),
+        addonManager=_AddonManager(),
+        state="deckBrowser",
+        reviewer=None,
+    )
+    aqt = types.ModuleType("aqt")
+    aqt.__path__ = []
+    aqt.mw = mw
+    aqt.gui_hooks = _Hooks()
+    sys.modules["aqt"] = aqt
+    sys.modules["aqt.gui_hooks"] = aqt.gui_hooks
+    return mw
+
+
+class _Modules(dict):
+    """Add-on modules by name, imported on first use."""
+
+    def __missing__(self, name):
+        module = self[name] = importlib.import_module(f"{ADDON_MODULE}.{name}")
+        return module
+
+
+@pytest.fixture(scope="session")
+def addon():
+    work_dir = tempfile.mkdtemp(prefix="onigiri-tests-")
+    profile_folder = os.path.join(work_dir, "profile")
+    user_files = os.path.join(work_dir, "user_files")
+    os.makedirs(profile_folder)
+    os.makedirs(user_files)
+    mw = _install_aqt(profile_folder)
+
+    package = types.ModuleType(ADDON_MODULE)
+    package.__path__ = [ADDON_ROOT]
+    sys.modules[ADDON_MODULE] = package
+    modules = _Modules()
+    # Keep settings files out of the add-on folder
+    modules["config"]._user_files_dir = user_files
+    yield mw, modules
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def new_collection():
+    """The Collection class, for tests that build their own."""
+    return Collection
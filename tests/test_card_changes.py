@@ -0,0 +1,55 @@
+"""Change tracking for the incremental card caches."""
+
+import types
+
+import pytest
+
+
+@pytest.fixture
+def card_changes(addon):
+    _, modules = addon
+    return modules["card_changes"]
+
+
+def _answer(changes, card_id):
+    changes._on_card_answered(None, types.SimpleNamespace(id=card_id), 3)
+
+
+def test_changes_recorded_during_a_refresh_are_kept(card_changes):
+    changes = card_changes.CardChanges(answered_key=lambda card: card.id)
+    changes.take()
+    _answer(changes, 1)
+    seen = []
+
+    def apply(taken):
+        seen.append(taken.answered)
+        # The main thread answers another card while the refresh runs
+        _answer(changes, 2)
+
+    changes.catch_up(apply)
+    assert seen == [{1}]
+    assert changes.take().answered == {2}
+
+
+def test_failed_refresh_rebuilds_next_time(card_changes):
+    changes = card_changes.CardChanges()
+    changes.take()
+
+    def apply(taken):
+        raise RuntimeError("database is locked")
+
+    with pytest.raises(RuntimeError):
+        changes.catch_up(apply)
+    assert changes.take().stale
+
+
+def test_reviewer_ops_are_left_to_the_answer_hook(card_changes, monkeypatch):
+    reviewer = object()
+    monkeypatch.setattr(card_changes.mw, "reviewer", reviewer)
+    changes = card_changes.CardChanges(answered_key=lambda card: card.id)
+    changes.take()
+    changes._on_operation_did_execute(types.SimpleNamespace(card=True), reviewer)
+    assert not changes.take().cards
+    changes._on_operation_did_execute(types.SimpleNamespace(card=True, deck=True), None)
+    taken = changes.take()
+    assert taken.cards and taken.decks
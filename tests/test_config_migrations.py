@@ -0,0 +1,67 @@
+"""Replays old settings files (tests/fixtures/settings) through the migration chain."""
+
+import glob
+import json
+import os
+import types
+
+import pytest
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "settings", "*.json")))
+
+
+def _load_fixture(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_settings(config, mw, collection_conf, settings):
+    """Writes settings as the profile's file, loads the config and returns the file's contents."""
+    mw.col = types.SimpleNamespace(conf=dict(collection_conf)) if collection_conf is not None else None
+    path = config._get_settings_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f)
+    config.invalidate_config_cache()
+    config.get_config_view()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def config(addon):
+    mw, modules = addon
+    col = mw.col
+    yield modules["config"]
+    modules["config"].invalidate_config_cache()
+    mw.col = col
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_fixture_migrates_to_expected(addon, config, path):
+    mw, _ = addon
+    fixture = _load_fixture(path)
+    persisted = _load_settings(config, mw, fixture["collection_conf"], fixture["settings"])
+    assert persisted == fixture["expected"]
+    assert persisted["schema_version"] == config.CONFIG_SCHEMA_VERSION
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_migrated_settings_are_not_migrated_again(addon, config, path):
+    mw, _ = addon
+    fixture = _load_fixture(path)
+    persisted = _load_settings(config, mw, fixture["collection_conf"], fixture["settings"])
+    assert config.migrate_user_config(json.loads(json.dumps(persisted))) is False
+
+
+def test_collection_step_waits_for_the_collection(addon, config):
+    mw, _ = addon
+    fixture = _load_fixture(os.path.join(os.path.dirname(__file__), "fixtures", "settings", "v0_profile_stats.json"))
+
+    # Loaded before the collection is open: every step but the last one runs
+    persisted = _load_settings(config, mw, None, fixture["settings"])
+    assert persisted["schema_version"] == config.CONFIG_SCHEMA_VERSION - 1
+    assert "showHeatmapOnProfile" not in persisted
+
+    # The next load with the collection open finishes the chain
+    persisted = _load_settings(config, mw, fixture["collection_conf"], persisted)
+    assert persisted == fixture["expected"]
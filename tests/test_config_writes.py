@@ -0,0 +1,64 @@
+"""The settings writer: file permissions and failed flushes."""
+
+import json
+import os
+import stat
+
+import pytest
+
+
+@pytest.fixture
+def config(addon):
+    mw, modules = addon
+    config = modules["config"]
+    path = config._get_settings_path()
+    if os.path.exists(path):
+        os.remove(path)
+    config.invalidate_config_cache()
+    yield config
+    config.invalidate_config_cache()
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_rewrite_keeps_the_file_mode(config):
+    path = config._get_settings_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"userName": "Sam"}, f)
+    os.chmod(path, 0o640)
+    settings = config.get_config()
+    settings["userName"] = "Kim"
+    config.write_config(settings)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert _read(path)["userName"] == "Kim"
+
+
+def test_new_file_is_not_private(config):
+    settings = config.get_config()
+    settings["userName"] = "Kim"
+    config.write_config(settings)
+    assert stat.S_IMODE(os.stat(config._get_settings_path()).st_mode) == 0o644
+
+
+def test_failed_flush_stays_pending(config, monkeypatch):
+    path = config._get_settings_path()
+    real_replace = os.replace
+
+    def failing_replace(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    settings = config.get_config()
+    settings["userName"] = "Kim"
+    config.write_config(settings)
+    assert not os.path.exists(path)
+    # Reads still see the unsaved change, even after the cache is dropped
+    config.invalidate_config_cache()
+    assert config.get_config_view()["userName"] == "Kim"
+
+    monkeypatch.setattr(os, "replace", real_replace)
+    config.flush_config_writes()
+    assert _read(path)["userName"] == "Kim"
@@ -0,0 +1,176 @@
+"""
+Checks heatmap._review_day_stats against the streak code it replaced, and the
+streaks get_heatmap_data computes around the scheduler's day cutoff.
+"""
+
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+
+def _previous_review_day_stats(reviews_by_day, today_start_seconds):
+    """The streak, longest streak and total of get_heatmap_data before the one-pass rewrite."""
+    today_date_key = datetime.fromtimestamp(today_start_seconds).strftime('%Y-%m-%d')
+    review_days_set = {day_key for day_key, count in reviews_by_day.items() if count}
+
+    streak = 0
+    yesterday_key = datetime.fromtimestamp(today_start_seconds - 86400).strftime('%Y-%m-%d')
+
+    if today_date_key in review_days_set or yesterday_key in review_days_set:
+        current_day_check_ts = today_start_seconds
+        if today_date_key not in review_days_set:
+            current_day_check_ts -= 86400
+
+        while True:
+            check_key = datetime.fromtimestamp(current_day_check_ts).strftime('%Y-%m-%d')
+            if check_key in review_days_set:
+                streak += 1
+                current_day_check_ts -= 86400
+            else:
+                break
+
+    longest_streak = 0
+    if review_days_set:
+        longest_streak = 1
+        current_run = 1
+        sorted_days = sorted(
+            datetime.strptime(day_key, "%Y-%m-%d").date()
+            for day_key in review_days_set
+        )
+        for previous_day, current_day in zip(sorted_days, sorted_days[1:]):
+            if (current_day - previous_day).days == 1:
+                current_run += 1
+            else:
+                current_run = 1
+            longest_streak = max(longest_streak, current_run)
+    longest_streak = max(longest_streak, streak)
+
+    return streak, longest_streak, sum(reviews_by_day.values())
+
+
+def _random_review_days(rng, today):
+    """Runs of review days separated by gaps, sometimes reaching today or yesterday, with a few zero counts."""
+    reviews_by_day = {}
+    day = today - timedelta(days=rng.randint(0, 3))
+    for _ in range(rng.randint(0, 12)):
+        for _ in range(rng.randint(1, 15)):
+            reviews_by_day[day.isoformat()] = rng.randint(1, 80)
+            day -= timedelta(days=1)
+        day -= timedelta(days=rng.choice([1, 1, 2, 5, 40]))
+    for _ in range(rng.randint(0, 3)):
+        reviews_by_day[(today - timedelta(days=rng.randint(0, 400))).isoformat()] = 0
+    # get_heatmap_data always sets today's count, reviews or not
+    reviews_by_day.setdefault(today.isoformat(), 0)
+    return reviews_by_day
+
+
+@pytest.fixture(params=["UTC", "Europe/Berlin", "America/Santiago", "Australia/Lord_Howe"])
+def timezone(request):
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = request.param
+    time.tzset()
+    yield request.param
+    if previous is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_matches_previous_implementation(addon, timezone):
+    heatmap = addon[1]["heatmap"]
+    rng = random.Random(timezone)
+    for _ in range(500):
+        today = date(2000, 1, 1) + timedelta(days=rng.randint(0, 365 * 30))
+        rollover_hour = rng.randint(0, 23)
+        today_start_seconds = int(datetime(today.year, today.month, today.day, rollover_hour).timestamp())
+        today_ordinal = datetime.fromtimestamp(today_start_seconds).toordinal()
+        reviews_by_day = _random_review_days(rng, date.fromordinal(today_ordinal))
+
+        assert heatmap._review_day_stats(reviews_by_day, today_ordinal) == _previous_review_day_stats(
+            reviews_by_day, today_start_seconds
+        ), (today, rollover_hour, sorted(reviews_by_day.items()))
+
+
+@pytest.mark.parametrize(
+    "reviews_by_day, expected",
+    [
+        ({}, (0, 0, 0)),
+        ({"2024-03-10": 0}, (0, 0, 0)),
+        # No reviews yet today: the streak counts back from yesterday
+        ({"2024-03-08": 3, "2024-03-09": 4, "2024-03-10": 0}, (2, 2, 7)),
+        ({"2024-03-08": 3, "2024-03-09": 4, "2024-03-10": 1}, (3, 3, 8)),
+        # Last reviewed the day before yesterday
+        ({"2024-03-07": 3, "2024-03-08": 4, "2024-03-10": 0}, (0, 2, 7)),
+        # A gap splits the runs; the longest run is in the past
+        ({"2024-02-01": 1, "2024-02-02": 1, "2024-02-03": 1, "2024-03-09": 2, "2024-03-10": 2}, (2, 3, 7)),
+        # A zero-count day inside a run breaks it
+        ({"2024-03-07": 1, "2024-03-08": 0, "2024-03-09": 1, "2024-03-10": 1}, (2, 2, 3)),
+    ],
+)
+def test_streak_cases(addon, reviews_by_day, expected):
+    heatmap = addon[1]["heatmap"]
+    assert heatmap._review_day_stats(reviews_by_day, date(2024, 3, 10).toordinal()) == expected
+
+
+@pytest.fixture
+def tiny_collection(addon, new_collection):
+    """An empty collection whose scheduler day starts at 04:00 on 2024-03-10."""
+    mw, modules = addon
+    col = new_collection(today=100, day_cutoff=int(datetime(2024, 3, 11, 4).timestamp()), rollover=4)
+    heatmap_cache = modules["heatmap_cache"]
+    cache_path = os.path.join(mw.pm.profileFolder(), heatmap_cache._CACHE_FILENAME)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    heatmap_cache.reset()
+    mw.col = col
+    yield col
+    mw.col = None
+    heatmap_cache.reset()
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+
+def _review_at(col, *local_time):
+    review_id = int(datetime(*local_time).timestamp() * 1000)
+    col.db.execute("INSERT INTO revlog (id, cid) VALUES (?, 1)", review_id)
+
+
+def test_reviews_roll_over_at_the_cutoff(addon, tiny_collection):
+    heatmap = addon[1]["heatmap"]
+    col = tiny_collection
+    # 03:59 still belongs to the previous scheduler day, 04:00 starts a new one
+    _review_at(col, 2024, 3, 9, 3, 59)   # day of 2024-03-08
+    _review_at(col, 2024, 3, 9, 4, 0)    # 2024-03-09
+    _review_at(col, 2024, 3, 10, 3, 59)  # 2024-03-09
+
+    data = heatmap.get_heatmap_data()
+    assert data["today_date_key"] == "2024-03-10"
+    assert {day: count for day, count in data["calendar"].items() if count} == {"2024-03-08": 1, "2024-03-09": 2}
+    # No reviews yet today: yesterday's run still counts
+    assert (data["streak"], data["longest_streak"]) == (2, 2)
+
+    _review_at(col, 2024, 3, 10, 4, 0)   # first review of today
+    data = heatmap.get_heatmap_data()
+    assert data["calendar"]["2024-03-10"] == 1
+    assert (data["streak"], data["longest_streak"]) == (3, 3)
+
+
+def test_streak_breaks_on_a_missed_day(addon, tiny_collection):
+    heatmap = addon[1]["heatmap"]
+    col = tiny_collection
+    _review_at(col, 2024, 3, 5, 12, 0)
+    _review_at(col, 2024, 3, 6, 12, 0)
+    _review_at(col, 2024, 3, 7, 12, 0)
+    # 2024-03-08 missed; the last review was the day before yesterday
+    data = heatmap.get_heatmap_data()
+    assert (data["streak"], data["longest_streak"]) == (0, 3)
+
+    # 03:00 on the 10th is still the 9th (yesterday)
+    _review_at(col, 2024, 3, 10, 3, 0)
+    data = heatmap.get_heatmap_data()
+    assert data["calendar"]["2024-03-09"] == 1
+    assert (data["streak"], data["longest_streak"]) == (1, 3)
@@ -433,6 +433,8 @@ TRANSLATIONS = {
         'show_month_labels': 'Show Month Labels',
         'show_weekday_labels': 'Show Weekday Labels',
         'show_day_labels': 'Show Day Labels',
+        'show_heatmap_on_overview': 'Show on Deck Overview',
+        'heatmap_canvas_renderer': 'Fast Canvas Rendering',
         'star_icon': 'Star Icon',
         'star_icon_description': 'Customize the star icon displayed in the retention widget.',
         'hide_stars_retention': 'Hide retention stars',
@@ -569,6 +571,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': 'Custom',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': 'Virtual scrolling above (decks, 0 = off)',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -721,6 +724,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': 'Deck Options Gear Icon (px):',
         'heatmap_activity_label': 'Activity',
         'heatmap_day_streak': 'day streak',
+        'heatmap_all_decks': 'All decks',
         'focus_dango_name': 'Focus Dango',
         'focus_dango_desc': 'A traditional Dango shop to help you stay focused.',
         'motivated_mochi_name': 'Motivated Mochi',
@@ -1207,6 +1211,8 @@ TRANSLATIONS = {
         'show_month_labels': 'Mostrar Rótulos de Meses',
         'show_weekday_labels': 'Mostrar Rótulos de Dias da Semana',
         'show_day_labels': 'Mostrar Rótulos de Dias',
+        'show_heatmap_on_overview': 'Mostrar na Visão Geral do Baralho',
+        'heatmap_canvas_renderer': 'Renderização Rápida em Canvas',
         'star_icon': 'Ícone de Estrela',
         'star_icon_description': 'Personalize o ícone de estrela exibido no widget de retenção.',
         'hide_stars_retention': 'Ocultar estrelas de retenção',
@@ -1343,6 +1349,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': 'Personalizado',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': 'Rolagem virtual acima de (baralhos, 0 = desligada)',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -1488,6 +1495,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': 'Ícone de Engrenagem das Opções do Baralho (px):',
         'heatmap_activity_label': 'Atividade',
         'heatmap_day_streak': 'dias seguidos',
+        'heatmap_all_decks': 'Todos os baralhos',
         'focus_dango_name': 'Dango de Foco',
         'focus_dango_desc': 'Uma loja tradicional de Dango para ajudá-lo a manter o foco.',
         'motivated_mochi_name': 'Mochi Motivado',
@@ -1902,6 +1910,8 @@ TRANSLATIONS = {
         'show_month_labels': 'Afficher les étiquettes des mois',
         'show_weekday_labels': 'Afficher les étiquettes des jours de la semaine',
         'show_day_labels': 'Afficher les étiquettes des jours',
+        'show_heatmap_on_overview': "Afficher dans l'aperçu du paquet",
+        'heatmap_canvas_renderer': 'Rendu rapide sur canvas',
         'star_icon': "Icône d'étoile",
         'star_icon_description': "Personnalisez l'icône d'étoile affichée dans le widget de rétention.",
         'hide_stars_retention': 'Masquer les étoiles de rétention',
@@ -2038,6 +2048,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': 'Personnalisé',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': 'Défilement virtuel au-delà de (paquets, 0 = désactivé)',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -2185,6 +2196,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': "Icône d'engrenage des options de paquet (px) :",
         'heatmap_activity_label': 'Activité',
         'heatmap_day_streak': 'jours consécutifs',
+        'heatmap_all_decks': 'Tous les paquets',
         'focus_dango_name': 'Dango de Concentration',
         'focus_dango_desc': 'Une boutique traditionnelle de Dango pour vous aider à rester concentré.',
         'motivated_mochi_name': 'Mochi Motivé',
@@ -2622,6 +2634,8 @@ TRANSLATIONS = {
         'show_month_labels': '월 레이블 표시',
         'show_weekday_labels': '요일 레이블 표시',
         'show_day_labels': '일 레이블 표시',
+        'show_heatmap_on_overview': '덱 개요에 표시',
+        'heatmap_canvas_renderer': '빠른 캔버스 렌더링',
         'star_icon': '별 아이콘',
         'star_icon_description': '유지 위젯에 표시되는 별 아이콘을 설정합니다.',
         'hide_stars_retention': '유지 별 숨기기',
@@ -2758,6 +2772,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': '사용자 지정',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': '가상 스크롤 사용 기준 (덱 수, 0 = 끔)',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -2898,6 +2913,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': '덱 옵션 기어 아이콘 (px):',
         'heatmap_activity_label': '활동',
         'heatmap_day_streak': '일 연속',
+        'heatmap_all_decks': '모든 덱',
         'focus_dango_name': '집중 당고',
         'focus_dango_desc': '집중력을 유지하는 데 도움이 되는 전통 당고 가게.',
         'motivated_mochi_name': '열정 모찌',
@@ -3384,6 +3400,8 @@ TRANSLATIONS = {
         'show_month_labels': 'Mostrar etiquetas de meses',
         'show_weekday_labels': 'Mostrar etiquetas de días de la semana',
         'show_day_labels': 'Mostrar etiquetas de días',
+        'show_heatmap_on_overview': 'Mostrar en la vista general del mazo',
+        'heatmap_canvas_renderer': 'Renderizado rápido en canvas',
         'star_icon': 'Icono de estrella',
         'star_icon_description': 'Personaliza el icono de estrella que se muestra en el widget de retención.',
         'hide_stars_retention': 'Ocultar estrellas de retención',
@@ -3520,6 +3538,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': 'Personalizado',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': 'Desplazamiento virtual a partir de (mazos, 0 = desactivado)',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -3665,6 +3684,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': 'Icono de Engranaje de Opciones del Mazo (px):',
         'heatmap_activity_label': 'Actividad',
         'heatmap_day_streak': 'días seguidos',
+        'heatmap_all_decks': 'Todos los mazos',
         'focus_dango_name': 'Dango de Enfoque',
         'focus_dango_desc': 'Una tienda tradicional de Dango para ayudarte a mantenerte concentrado.',
         'motivated_mochi_name': 'Mochi Motivado',
@@ -4137,6 +4157,8 @@ TRANSLATIONS = {
         'show_month_labels': '显示月份标签',
         'show_weekday_labels': '显示星期标签',
         'show_day_labels': '显示天数标签',
+        'show_heatmap_on_overview': '在牌组概览中显示',
+        'heatmap_canvas_renderer': '快速画布渲染',
         'star_icon': '星星图标',
         'star_icon_description': '自定义在留存插件中显示的星星图标。',
         'hide_stars_retention': '隐藏留存星星',
@@ -4273,6 +4295,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': '自定义',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': '虚拟滚动阈值（牌组数，0 = 关闭）',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -4416,6 +4439,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': '牌组选项齿轮图标 (px)：',
         'heatmap_activity_label': '活动',
         'heatmap_day_streak': '天连续',
+        'heatmap_all_decks': '所有牌组',
         'focus_dango_name': '专注团子',
         'focus_dango_desc': '一家传统的团子店，帮助你保持专注。',
         'motivated_mochi_name': '动力麻糬',
@@ -4905,6 +4929,8 @@ TRANSLATIONS = {
         'show_month_labels': '月ラベルを表示',
         'show_weekday_labels': '曜日ラベルを表示',
         'show_day_labels': '日ラベルを表示',
+        'show_heatmap_on_overview': 'デッキ概要に表示',
+        'heatmap_canvas_renderer': '高速キャンバス描画',
         'star_icon': '星アイコン',
         'star_icon_description': '保持ウィジェットに表示される星アイコンをカスタマイズします。',
         'hide_stars_retention': '保持の星を隠す',
@@ -5039,6 +5065,7 @@ TRANSLATIONS = {
         'corners': 'Corners',
         'custom': 'カスタム',
         'custom_indentation_px': 'Custom Indentation Px',
+        'virtual_deck_list_above': '仮想スクロールを使うデッキ数（0 = オフ）',
         'dark_mode_color': 'Dark Mode Color',
         'dark_mode_from': 'Dark Mode From',
         'dark_mode_to': 'Dark Mode To',
@@ -5179,6 +5206,7 @@ TRANSLATIONS = {
         'deck_options_gear_label': 'デッキオプションギアアイコン (px)：',
         'heatmap_activity_label': 'アクティビティ',
         'heatmap_day_streak': '日連続',
+        'heatmap_all_decks': 'すべてのデッキ',
         'focus_dango_name': '集中団子',
         'focus_dango_desc': '集中力を維持するのに役立つ伝統的な団子屋。',
         'motivated_mochi_name': 'やる気餅',
@@ -17,19 +17,47 @@ window.OnigiriEngine = {
 
         // Initial processing of already loaded nodes
         this.processNewNodes(document.querySelectorAll('tr.deck, a.collapse'));
+        if (window.ONIGIRI_DECK_ROWS) {
+            this.initVirtualDeckList(window.ONIGIRI_DECK_ROWS);
+        }
+        this.applyDeckVisibility();
         this.restoreScrollPosition();
     },
 
+    /**
+     * Version of the deck list on the page, as numbered by deck_tree_updater.
+     * Patches are made against a version and are refused by any other one.
+     */
+    deckTreeVersion: function () {
+        if (this._deckTreeVersion === undefined) {
+            this._deckTreeVersion = (window.ONIGIRI_CONFIG && window.ONIGIRI_CONFIG.deckTreeVersion) || 0;
+        }
+        return this._deckTreeVersion;
+    },
+
+    /** Moves to a new version when an update left every row as it was. */
+    setDeckTreeVersion: function (baseVersion, version) {
+        if (baseVersion === this.deckTreeVersion()) {
+            this._deckTreeVersion = version;
+        } else {
+            pycmd('onigiri_deck_tree_resync');
+        }
+    },
+
     /**
      * Replaces the deck tree's HTML content without a full page reload,
      * preserving scroll position.
      * @param {string} newHtml The new HTML for the deck tree's <tbody>.
+     * @param {number} [version] The deck list version newHtml corresponds to.
      */
-    updateDeckTree: function (newHtml) {
+    updateDeckTree: function (newHtml, version) {
         if (!this.deckListContainer) return;
 
         const tableBody = this.deckListContainer.querySelector('table.deck-table tbody');
         if (!tableBody) return;
+        if (version !== undefined) {
+            this._deckTreeVersion = version;
+        }
 
         this.deckListContainer.classList.add('scroll-restoring');
 
@@ -47,6 +75,7 @@ window.OnigiriEngine = {
 
         this.restoreScrollPosition();
         this.processNewNodes(tableBody.children); // Process new nodes (for collapse icons etc.)
+        this.applyDeckVisibility();
 
         if (typeof window.updateDeckLayouts === 'function') {
             window.updateDeckLayouts();
@@ -57,6 +86,325 @@ window.OnigiriEngine = {
         }, 50);
     },
 
+    /**
+     * Applies a keyed row patch from deck_tree_updater._diff_rows: removes,
+     * replaces and inserts only the rows that changed, so unchanged rows
+     * keep their DOM nodes (and hover, drag handles, scroll position).
+     * If the page is not showing the version the patch was made against,
+     * the whole deck list is requested again instead.
+     * @param {{base: number, version: number, remove: string[], update: Object<string, string>,
+     *          insert: Array, order: ?string[]}} patch
+     */
+    patchDeckTree: function (patch) {
+        if (!this.deckListContainer) return;
+        if (this._virtual) {
+            this._patchVirtualRows(patch);
+            return;
+        }
+
+        const tableBody = this.deckListContainer.querySelector('table.deck-table tbody');
+        if (!tableBody) return;
+
+        const rowsById = new Map();
+        for (const row of tableBody.children) {
+            if (row.dataset.did) rowsById.set(row.dataset.did, row);
+        }
+        const known = did => did === null || rowsById.has(did);
+        if (patch.base !== this.deckTreeVersion()
+            || !patch.remove.every(known)
+            || !Object.keys(patch.update).every(known)
+            || !patch.insert.every(([afterDid]) => known(afterDid))) {
+            pycmd('onigiri_deck_tree_resync');
+            return;
+        }
+
+        const template = document.createElement('template');
+        const makeRow = (html) => {
+            template.innerHTML = html.trim();
+            return template.content.firstElementChild;
+        };
+        const added = [];
+
+        patch.remove.forEach((did) => {
+            rowsById.get(did).remove();
+            rowsById.delete(did);
+        });
+
+        Object.entries(patch.update).forEach(([did, html]) => {
+            const row = makeRow(html);
+            rowsById.get(did).replaceWith(row);
+            rowsById.set(did, row);
+            added.push(row);
+        });
+
+        patch.insert.forEach(([afterDid, rows]) => {
+            const anchor = afterDid === null ? null : rowsById.get(afterDid);
+            let reference = anchor ? anchor.nextSibling : tableBody.firstChild;
+            rows.forEach(([did, html]) => {
+                const row = makeRow(html);
+                tableBody.insertBefore(row, reference);
+                reference = row.nextSibling;
+                rowsById.set(did, row);
+                added.push(row);
+                row.classList.add('deck-row-appear');
+                row.addEventListener('animationend', () => row.classList.remove('deck-row-appear'), { once: true });
+            });
+        });
+
+        if (patch.order) {
+            // Kept rows moved (e.g. a new sort order): walk the new order and
+            // move only rows that are out of place
+            let cursor = tableBody.firstElementChild;
+            patch.order.forEach((did) => {
+                const row = rowsById.get(did);
+                if (!row) return;
+                if (row === cursor) {
+                    cursor = cursor.nextElementSibling;
+                } else {
+                    tableBody.insertBefore(row, cursor);
+                }
+            });
+        }
+
+        this._deckTreeVersion = patch.version;
+        this.processNewNodes(added);
+        this.applyDeckVisibility();
+
+        if (typeof window.updateDeckLayouts === 'function') {
+            window.updateDeckLayouts();
+        }
+    },
+
+    // --- Virtual deck list ---
+    // Above the deckListVirtualizeAbove setting, the page gets the deck rows
+    // as data (window.ONIGIRI_DECK_ROWS, then patches and setDeckRows) and
+    // only the rows in and near the viewport are in the table, between two
+    // spacer rows that stand in for the rest. Rows are assumed to share the
+    // height of the first one rendered.
+
+    /** Rows rendered above and below the viewport. */
+    VIRTUAL_OVERSCAN: 20,
+
+    /** @param {Array<[string, string]>} rows [deck id, row html] pairs in tree order. */
+    initVirtualDeckList: function (rows) {
+        this._virtual = {
+            rows: [],          // {did, html, depth, closed}, in tree order
+            byId: new Map(),   // deck id -> row
+            visible: [],       // the rows not under a collapsed deck
+            nodes: new Map(),  // deck id -> <tr> of the rows on the page
+            rowHeight: 0,
+            first: 0,
+            last: 0,
+            frame: null,
+        };
+        this._setVirtualRows(rows);
+        this.deckListContainer.addEventListener('scroll', () => this._scheduleVirtualRender(), { passive: true });
+        window.addEventListener('resize', () => this._scheduleVirtualRender());
+    },
+
+    _virtualRow: function (did, html) {
+        const depth = /data-depth='(\d+)'/.exec(html);
+        return {
+            did,
+            html,
+            depth: depth ? Number(depth[1]) : 1,
+            closed: html.includes("class='collapse state-closed'"),
+        };
+    },
+
+    _setVirtualRows: function (rows) {
+        const v = this._virtual;
+        v.rows = rows.map(([did, html]) => this._virtualRow(did, html));
+        v.byId = new Map(v.rows.map(row => [row.did, row]));
+        v.nodes = new Map();
+        v.rowHeight = 0;
+    },
+
+    /**
+     * Replaces every row of the virtual deck list (the counterpart of
+     * updateDeckTree, which takes HTML).
+     * @param {Array<[string, string]>} rows
+     * @param {number} version
+     */
+    setDeckRows: function (rows, version) {
+        if (!this._virtual) return;
+        this._setVirtualRows(rows);
+        this._deckTreeVersion = version;
+        this.applyDeckVisibility();
+    },
+
+    /** patchDeckTree on the row data; the page is then re-rendered around the viewport. */
+    _patchVirtualRows: function (patch) {
+        const v = this._virtual;
+        const known = did => did === null || v.byId.has(did);
+        if (patch.base !== this.deckTreeVersion()
+            || !patch.remove.every(known)
+            || !Object.keys(patch.update).every(known)
+            || !patch.insert.every(([afterDid]) => known(afterDid))) {
+            pycmd('onigiri_deck_tree_resync');
+            return;
+        }
+
+        const removed = new Set(patch.remove);
+        removed.forEach(did => v.byId.delete(did));
+        Object.entries(patch.update).forEach(([did, html]) => {
+            v.byId.set(did, this._virtualRow(did, html));
+            v.nodes.delete(did);
+        });
+        const insertedAfter = new Map();
+        patch.insert.forEach(([afterDid, rows]) => {
+            const group = rows.map(([did, html]) => this._virtualRow(did, html));
+            group.forEach(row => v.byId.set(row.did, row));
+            insertedAfter.set(afterDid, group);
+        });
+
+        if (patch.order) {
+            v.rows = patch.order.map(did => v.byId.get(did));
+        } else {
+            const rows = [...(insertedAfter.get(null) || [])];
+            v.rows.forEach((row) => {
+                if (removed.has(row.did)) return;
+                rows.push(v.byId.get(row.did));
+                const group = insertedAfter.get(row.did);
+                if (group) rows.push(...group);
+            });
+            v.rows = rows;
+        }
+        removed.forEach(did => v.nodes.delete(did));
+
+        this._deckTreeVersion = patch.version;
+        this.applyDeckVisibility();
+    },
+
+    _scheduleVirtualRender: function () {
+        const v = this._virtual;
+        if (!v || v.frame) return;
+        v.frame = requestAnimationFrame(() => {
+            v.frame = null;
+            this.renderVirtualRows(false);
+        });
+    },
+
+    _makeSpacer: function (height) {
+        const spacer = document.createElement('tr');
+        spacer.className = 'deck-virtual-spacer';
+        const cell = document.createElement('td');
+        cell.colSpan = 8;
+        cell.style.cssText = `height:${height}px;padding:0;border:0;`;
+        spacer.appendChild(cell);
+        return spacer;
+    },
+
+    /** Puts the visible rows in and near the viewport on the page. */
+    renderVirtualRows: function (force) {
+        const v = this._virtual;
+        const tableBody = this.deckListContainer.querySelector('table.deck-table tbody');
+        if (!v || !tableBody) return;
+        // (the deck list is hidden under search results; rendered again when they close)
+        if (tableBody.parentElement.classList.contains('is-searching')) return;
+
+        const container = this.deckListContainer;
+        const bodyTop = tableBody.getBoundingClientRect().top - container.getBoundingClientRect().top + container.scrollTop;
+        const rowHeight = v.rowHeight || 32;
+        const total = v.visible.length;
+        const first = Math.min(total, Math.max(0, Math.floor((container.scrollTop - bodyTop) / rowHeight) - this.VIRTUAL_OVERSCAN));
+        const last = Math.min(total, first + Math.ceil(container.clientHeight / rowHeight) + 2 * this.VIRTUAL_OVERSCAN);
+        if (!force && first === v.first && last === v.last) return;
+        v.first = first;
+        v.last = last;
+
+        const nodes = new Map();
+        const children = [this._makeSpacer(first * rowHeight)];
+        for (let i = first; i < last; i++) {
+            const row = v.visible[i];
+            let node = v.nodes.get(row.did);
+            if (!node) {
+                const template = document.createElement('template');
+                template.innerHTML = row.html.trim();
+                node = template.content.firstElementChild;
+                this.processNewNodes([node]);
+            }
+            // The page may have collapsed the deck before Python sent its new row
+            const collapseLink = node.querySelector('a.collapse');
+            if (collapseLink) {
+                collapseLink.classList.toggle('state-open', !row.closed);
+                collapseLink.classList.toggle('state-closed', row.closed);
+            }
+            nodes.set(row.did, node);
+            children.push(node);
+        }
+        children.push(this._makeSpacer((total - last) * rowHeight));
+        v.nodes = nodes;
+        tableBody.replaceChildren(...children);
+
+        if (!v.rowHeight && last > first) {
+            const measured = children[1].getBoundingClientRect().height;
+            if (measured > 0) {
+                v.rowHeight = measured;
+                this.renderVirtualRows(true);
+            }
+        }
+    },
+
+    /** Deck ids of every row in the deck list, on the page or not. */
+    deckRowIds: function () {
+        if (this._virtual) return this._virtual.rows.map(row => row.did);
+        return Array.from(this.deckListContainer.querySelectorAll('tr.deck[data-did]'))
+            .map(row => row.dataset.did);
+    },
+
+    /**
+     * Collapses or expands a deck on the page right away. Its subdecks stay
+     * in the table and are only hidden, so expanding again is instant;
+     * deck_tree_updater.on_deck_collapse saves the state and sends the rows
+     * of subdecks the page has not been given yet.
+     * @param {HTMLElement} collapseLink The row's a.collapse.
+     */
+    toggleDeckCollapse: function (collapseLink) {
+        const collapsing = !collapseLink.classList.contains('state-closed');
+        collapseLink.classList.toggle('state-open', !collapsing);
+        collapseLink.classList.toggle('state-closed', collapsing);
+        const deckRow = collapseLink.closest('tr.deck');
+        if (this._virtual && deckRow && this._virtual.byId.has(deckRow.dataset.did)) {
+            this._virtual.byId.get(deckRow.dataset.did).closed = collapsing;
+        }
+        this.applyDeckVisibility();
+    },
+
+    /**
+     * Hides the rows below collapsed decks. Rows are in tree order, so a
+     * deck's subtree is the run of deeper rows after it.
+     */
+    applyDeckVisibility: function () {
+        if (!this.deckListContainer) return;
+        if (this._virtual) {
+            // Hidden rows are simply not rendered
+            let hiddenBelow = Infinity;
+            this._virtual.visible = this._virtual.rows.filter((row) => {
+                if (row.depth > hiddenBelow) return false;
+                hiddenBelow = row.closed ? row.depth : Infinity;
+                return true;
+            });
+            this.renderVirtualRows(true);
+            return;
+        }
+        const tableBody = this.deckListContainer.querySelector('table.deck-table tbody');
+        if (!tableBody) return;
+
+        let hiddenBelow = Infinity;  // depth of the collapsed deck whose subtree is being walked
+        for (const row of tableBody.children) {
+            const depth = Number(row.dataset.depth);
+            if (!depth) continue;
+            if (depth > hiddenBelow) {
+                row.classList.add('deck-row-hidden');
+                continue;
+            }
+            row.classList.remove('deck-row-hidden');
+            const collapseLink = row.querySelector('a.collapse');
+            hiddenBelow = collapseLink && collapseLink.classList.contains('state-closed') ? depth : Infinity;
+        }
+    },
+
     /** Saves the current scroll position to session storage. */
     saveScrollPosition: function () {
         if (this.deckListContainer) {
@@ -96,6 +444,7 @@ window.OnigiriEngine = {
         bar.classList.remove('is-closing');
         bar.classList.add('is-visible');
         input.value = '';
+        this._ensureDeckSearchIndex();
         requestAnimationFrame(() => {
             try {
                 input.focus({ preventScroll: true });
@@ -124,9 +473,242 @@ window.OnigiriEngine = {
     _filterDecks: function (query) {
         const nextQuery = (query || '').trim();
         window.clearTimeout(this._searchDebounceTimer);
+        // One search per frame at most while typing
         this._searchDebounceTimer = window.setTimeout(() => {
-            pycmd('onigiri_deck_search:' + nextQuery);
-        }, 150);
+            this._deckSearchQuery = nextQuery;
+            this._showDeckSearchResults();
+        }, 16);
+    },
+
+    // --- Deck search ---
+    // The search runs here, over an index of every deck that
+    // deck_tree_updater.send_deck_search_index sends on request. Python
+    // numbers each deck tree it builds (the generation) and tells the page
+    // when it changes, so the index is only fetched again after that.
+    // Results are shown in their own tbody; the deck list stays as it is
+    // underneath, so patches keep applying to it.
+
+    /** Results shown at most. */
+    DECK_SEARCH_LIMIT: 200,
+
+    deckSearchGeneration: function () {
+        if (this._deckSearchGeneration === undefined) {
+            this._deckSearchGeneration = (window.ONIGIRI_CONFIG && window.ONIGIRI_CONFIG.deckSearchGeneration) || 0;
+        }
+        return this._deckSearchGeneration;
+    },
+
+    /** Called by Python when it has built a new deck tree. */
+    setDeckSearchGeneration: function (generation) {
+        this._deckSearchGeneration = generation;
+        const bar = document.getElementById('onigiri-deck-search-bar');
+        if (bar && bar.classList.contains('is-visible')) {
+            this._ensureDeckSearchIndex();
+        }
+    },
+
+    _ensureDeckSearchIndex: function () {
+        const index = this._deckSearchIndex;
+        if (index && index.generation === this.deckSearchGeneration()) return;
+        if (this._deckSearchIndexRequested === this.deckSearchGeneration()) return;
+        this._deckSearchIndexRequested = this.deckSearchGeneration();
+        pycmd('onigiri_deck_search_index');
+    },
+
+    /**
+     * Receives the deck search index and prepares it for matching.
+     * @param {{generation: number, currentDeck: string, showCounts: boolean, decks: Array}} index
+     *     decks are [deck id, full name, depth, flags, new, learn, review, mark].
+     */
+    setDeckSearchIndex: function (index) {
+        const tokenSplit = /[^\p{L}\p{N}]+/u;
+        this._deckSearchIndex = {
+            generation: index.generation,
+            currentDeck: index.currentDeck,
+            showCounts: index.showCounts,
+            decks: index.decks.map(([did, name, depth, flags, newCount, learnCount, reviewCount, mark]) => {
+                const path = name.toLowerCase();
+                const leafName = name.split('::').pop();
+                return {
+                    did,
+                    name,
+                    leafName,
+                    path,
+                    leaf: leafName.toLowerCase(),
+                    tokens: path.split(tokenSplit).filter(Boolean),
+                    depth,
+                    flags,
+                    counts: [newCount, learnCount, reviewCount],
+                    mark,
+                };
+            }),
+        };
+        if (index.generation > this.deckSearchGeneration()) {
+            this._deckSearchGeneration = index.generation;
+        }
+        this._showDeckSearchResults();
+    },
+
+    /**
+     * How far the letters of query appear in order in text: 1 for adjacent
+     * letters, down towards 0 as the gaps grow; 0 if they do not all appear.
+     */
+    _fuzzyScore: function (query, text) {
+        let position = -1;
+        let gaps = 0;
+        for (const char of query) {
+            const next = text.indexOf(char, position + 1);
+            if (next === -1) return 0;
+            if (position !== -1) gaps += next - position - 1;
+            position = next;
+        }
+        const allowed = query.length * 3;
+        return gaps > allowed ? 0 : 1 - gaps / (allowed + 1);
+    },
+
+    /** Ranks a deck for a lowercased query: 0 is no match, higher is better. */
+    _scoreDeck: function (deck, query, queryTokens) {
+        if (deck.leaf === query) return 1000;
+        if (deck.leaf.startsWith(query)) return 900 - Math.min(deck.leaf.length - query.length, 99);
+        if (deck.tokens.some(token => token.startsWith(query))) return 700;
+        let at = deck.leaf.indexOf(query);
+        if (at !== -1) return 600 - Math.min(at, 99);
+        at = deck.path.indexOf(query);
+        if (at !== -1) return 400 - Math.min(at, 99);
+        if (queryTokens.length > 1
+            && queryTokens.every(part => deck.tokens.some(token => token.startsWith(part)))) {
+            return 350;
+        }
+        const compact = queryTokens.join('');
+        const leafFuzzy = this._fuzzyScore(compact, deck.leaf);
+        if (leafFuzzy) return 200 + Math.round(leafFuzzy * 99);
+        const pathFuzzy = this._fuzzyScore(compact, deck.path);
+        if (pathFuzzy) return 100 + Math.round(pathFuzzy * 99);
+        return 0;
+    },
+
+    /**
+     * Decks matching query, best first: exact and prefix matches of the
+     * deck's own name, word prefixes anywhere in its path, substrings, then
+     * letters in order (fuzzy).
+     */
+    searchDecks: function (query) {
+        const index = this._deckSearchIndex;
+        const normalized = (query || '').trim().toLowerCase();
+        if (!index || !normalized) return [];
+        const queryTokens = normalized.split(/\s+/);
+        const scored = [];
+        index.decks.forEach((deck) => {
+            const score = this._scoreDeck(deck, normalized, queryTokens);
+            if (score) scored.push([score, deck]);
+        });
+        scored.sort((a, b) => (b[0] - a[0]) || (a[1].depth - b[1].depth) || (a[1].path < b[1].path ? -1 : 1));
+        return scored.slice(0, this.DECK_SEARCH_LIMIT).map(([, deck]) => deck);
+    },
+
+    /** A result row, with the classes and data a deck row has. */
+    _buildDeckSearchRow: function (deck) {
+        const index = this._deckSearchIndex;
+        const markerColors = (window.ONIGIRI_CONFIG && window.ONIGIRI_CONFIG.markerColors) || {};
+        const row = document.createElement('tr');
+        let typeClass = 'is-deck';
+        if (deck.flags & 2) typeClass = 'is-filtered';
+        else if (deck.flags & 1) typeClass = 'is-folder';
+        else if (deck.depth > 1) typeClass = 'is-subdeck';
+        row.className = `${deck.did === index.currentDeck ? 'deck current' : 'deck'} ${typeClass}`;
+        row.dataset.did = deck.did;
+        if (deck.flags & 4) row.dataset.isFav = '1';
+        if (deck.mark && markerColors[deck.mark]) row.dataset.mark = deck.mark;
+
+        const cell = document.createElement('td');
+        cell.className = 'decktd';
+        cell.colSpan = 7;
+        const info = document.createElement('div');
+        info.className = 'deck-info';
+        const prefix = document.createElement('span');
+        const noCollapse = document.createElement('span');
+        noCollapse.className = 'collapse';
+        prefix.appendChild(noCollapse);
+        const link = document.createElement('a');
+        link.className = deck.flags & 2 ? 'deck filtered' : 'deck';
+        link.href = '#';
+        link.setAttribute('onclick', `return pycmd('open:${deck.did}')`);
+        const name = document.createElement('span');
+        name.className = 'deck-name';
+        name.textContent = deck.leafName;
+        link.appendChild(name);
+        if (row.dataset.mark) {
+            const dot = document.createElement('span');
+            dot.className = 'deck-mark-dot';
+            dot.style.backgroundColor = markerColors[deck.mark];
+            link.appendChild(dot);
+        }
+        info.append(prefix, link);
+        if (deck.depth > 1) {
+            const path = document.createElement('span');
+            path.className = 'deck-search-path';
+            path.textContent = deck.name.split('::').slice(0, -1).join(' › ');
+            info.appendChild(path);
+        }
+        cell.appendChild(info);
+
+        if (index.showCounts) {
+            const counts = document.createElement('div');
+            counts.className = 'deck-counts';
+            ['new', 'learn', 'review'].forEach((kind, i) => {
+                const bubble = document.createElement('span');
+                bubble.className = `${kind}-count-bubble${deck.counts[i] === 0 ? ' zero' : ''}`;
+                bubble.textContent = deck.counts[i];
+                counts.appendChild(bubble);
+            });
+            cell.appendChild(counts);
+        }
+
+        const opts = document.createElement('td');
+        opts.align = 'center';
+        opts.className = 'opts';
+        const optsLink = document.createElement('a');
+        optsLink.setAttribute('onclick', `return pycmd("opts:${deck.did}");`);
+        const gears = document.createElement('img');
+        gears.src = '/_anki/imgs/gears.svg';
+        gears.className = 'gears';
+        optsLink.appendChild(gears);
+        opts.appendChild(optsLink);
+
+        row.append(cell, opts);
+        return row;
+    },
+
+    /** Shows the results for the current query, or the deck list again if there is none. */
+    _showDeckSearchResults: function () {
+        if (!this.deckListContainer) return;
+        const table = this.deckListContainer.querySelector('table.deck-table');
+        if (!table) return;
+        let results = document.getElementById('onigiri-deck-search-results');
+
+        if (!this._deckSearchQuery) {
+            if (results) results.replaceChildren();
+            if (table.classList.contains('is-searching')) {
+                table.classList.remove('is-searching');
+                this.deckListContainer.scrollTop = this._scrollBeforeSearch || 0;
+                if (this._virtual) this.renderVirtualRows(true);
+            }
+            return;
+        }
+        this._ensureDeckSearchIndex();
+        if (!this._deckSearchIndex) return;  // shown when the index arrives
+
+        if (!results) {
+            results = document.createElement('tbody');
+            results.id = 'onigiri-deck-search-results';
+            table.appendChild(results);
+        }
+        results.replaceChildren(...this.searchDecks(this._deckSearchQuery).map(deck => this._buildDeckSearchRow(deck)));
+        if (!table.classList.contains('is-searching')) {
+            this._scrollBeforeSearch = this.deckListContainer.scrollTop;
+            table.classList.add('is-searching');
+        }
+        this.deckListContainer.scrollTop = 0;
     },
 
     /** Restores the scroll position from session storage. */
@@ -167,13 +749,15 @@ window.OnigiriEngine = {
             const target = event.target;
 
             // Case 1: Click was on a collapse icon.
-            // We save the scroll position and then simply let the event proceed.
+            // We save the scroll position, show the new state right away and
+            // then simply let the event proceed.
             // The `onclick` attribute on the <a> tag will handle the pycmd call.
             // We must NOT call event.preventDefault() or return, as that would
             // block the pycmd from firing.
             const collapseLink = target.closest('a.collapse');
             if (collapseLink) {
                 this.saveScrollPosition();
+                this.toggleDeckCollapse(collapseLink);
                 // Allow the default action (onclick attribute) to happen.
                 return;
             }
@@ -311,7 +895,7 @@ window.OnigiriEngine = {
 
     _dndStart: function (event, handle) {
         const row = handle.closest('tr.deck[data-did]');
-        if (!row || this._dnd) return;
+        if (!row || this._dnd || row.closest('#onigiri-deck-search-results')) return;
         event.preventDefault();
         event.stopPropagation();
         if (handle.setPointerCapture && event.pointerId !== undefined) {
@@ -373,7 +957,7 @@ window.OnigiriEngine = {
         state.ghostEl.style.top = `${event.clientY - state.offsetY}px`;
         state.ghostEl.style.left = `${event.clientX - state.offsetX}px`;
 
-        const rows = Array.from(this.deckListContainer.querySelectorAll('tr.deck[data-did]'))
+        const rows = Array.from(this.deckListContainer.querySelectorAll('tr.deck[data-did]:not(.deck-row-hidden)'))
             .filter(row => row !== state.sourceRow);
         let targetRow = null;
         for (const row of rows) {
@@ -482,8 +1066,7 @@ window.OnigiriEngine = {
             return;
         }
 
-        const allIds = Array.from(this.deckListContainer.querySelectorAll('tr.deck[data-did]'))
-            .map(row => row.dataset.did);
+        const allIds = this.deckRowIds();
         const newOrder = allIds.filter(id => id !== sourceDid);
         const targetIndex = newOrder.indexOf(targetDid);
         if (targetIndex === -1) return;
@@ -538,7 +1121,7 @@ window.OnigiriEngine = {
                         child.draggable = false;
                         child.setAttribute('draggable', 'false');
                     });
-                    if (clickableCell && !el.querySelector('.drag-handle')) {
+                    if (clickableCell && !el.querySelector('.drag-handle') && !el.closest('#onigiri-deck-search-results')) {
                         const handle = document.createElement('span');
                         handle.className = 'drag-handle';
                         handle.title = 'Drag to reorder or move';
@@ -586,8 +1169,12 @@ window.OnigiriEngine = {
     },
 
     findDeckRow: function (did) {
-        return Array.from(document.querySelectorAll('tr.deck[data-did]'))
-            .find(row => row.dataset.did === String(did));
+        // Search results come first: while shown, the deck list is hidden
+        const rows = [
+            ...document.querySelectorAll('#onigiri-deck-search-results tr.deck[data-did]'),
+            ...document.querySelectorAll('tr.deck[data-did]'),
+        ];
+        return rows.find(row => row.dataset.did === String(did));
     },
 
     appendMenuItem: function (menu, item) {
@@ -18,15 +18,160 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
 
 
     // --- DATA PREPARATION ---
-    function prepareData(rawData) {
-        // Python now sends date keys (YYYY-MM-DD) directly.
-        // These keys are already adjusted for local timezone and rollover.
+    const MS_PER_DAY = 86400000;
+
+    // Python sends each series as { base, counts }: the day number (days since
+    // 1970-01-01) of the first entry and base64 of little-endian uint32 counts,
+    // one per consecutive day. Day numbers are already adjusted for local
+    // timezone and rollover.
+    function decodeDaySeries(packed) {
+        if (!packed || !packed.counts) {
+            return { base: 0, counts: new Uint32Array(0) };
+        }
+        const binary = atob(packed.counts);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        // Every webview Anki ships runs on a little-endian platform, so the
+        // bytes can be viewed directly as uint32s.
+        return { base: packed.base, counts: new Uint32Array(bytes.buffer) };
+    }
+
+    // Day number of a local calendar date, matching the numbering used by Python
+    function getDayNumber(date) {
+        return Math.round(Date.UTC(date.getFullYear(), date.getMonth(), date.getDate()) / MS_PER_DAY);
+    }
+
+    // --- YEAR WINDOWS ---
+    // Python sends the current year's counts with the first paint; other
+    // years are requested with pycmd when a view needs them and kept here,
+    // least recently used first. Entries are keyed by deck filter and year.
+    const YEAR_CACHE_LIMIT = 8;
+    const yearCache = new Map();
+    const pendingYears = new Set();
+    let lastUsedKey = null;
+    // containerId -> draw function, redrawn when a requested year arrives
+    const activeDraws = new Map();
+
+    function yearKey(deckId, year) {
+        return `${deckId || ''}:${year}`;
+    }
+
+    function storeYear(payload) {
+        const key = yearKey(payload.deck_id, payload.year);
+        yearCache.delete(key);
+        yearCache.set(key, {
+            reviews: decodeDaySeries(payload.calendar),
+            dues: decodeDaySeries(payload.due_calendar),
+        });
+        while (yearCache.size > YEAR_CACHE_LIMIT) {
+            yearCache.delete(yearCache.keys().next().value);
+        }
+    }
+
+    function requestYear(deckId, year) {
+        const key = yearKey(deckId, year);
+        if (pendingYears.has(key) || typeof pycmd !== 'function') return;
+        pendingYears.add(key);
+        pycmd(`onigiri_heatmap_year:${year}:${deckId || ''}`);
+    }
+
+    function getYear(deckId, year) {
+        const key = yearKey(deckId, year);
+        const entry = yearCache.get(key);
+        if (!entry) {
+            requestYear(deckId, year);
+            return null;
+        }
+        if (key !== lastUsedKey) {
+            yearCache.delete(key);
+            yearCache.set(key, entry);
+            lastUsedKey = key;
+        }
+        return entry;
+    }
+
+    // kind is 'reviews' or 'dues'; days of years still being fetched count as 0
+    function getDayCount(preparedData, kind, date) {
+        const year = date.getFullYear();
+        if (year < preparedData.firstYear) return 0;
+        const entry = getYear(preparedData.deckId, year);
+        if (!entry) return 0;
+        const series = entry[kind];
+        const index = getDayNumber(date) - series.base;
+        return index >= 0 && index < series.counts.length ? series.counts[index] : 0;
+    }
+
+    function redrawActive() {
+        activeDraws.forEach((draw, containerId) => {
+            if (document.getElementById(containerId)) {
+                draw();
+            } else {
+                activeDraws.delete(containerId);
+            }
+        });
+    }
 
-        // Convert object from Python into a Map for easier lookup
-        const reviewsByDay = new Map(Object.entries(rawData.calendar || {}));
+    exports.receiveYear = function (payload) {
+        pendingYears.delete(yearKey(payload.deck_id, payload.year));
+        storeYear(payload);
+        redrawActive();
+    };
+
+    // --- DECK FILTER ---
+    // The deck list is only fetched once the filter is opened.
+    let deckOptions = null;
+
+    function deckOptionsHTML(selectedId, selectedName, allDecksLabel) {
+        const options = [['', allDecksLabel]];
+        if (deckOptions) {
+            options.push(...deckOptions);
+        } else if (selectedId) {
+            options.push([selectedId, selectedName]);
+        }
+        return options.map(([id, name]) => {
+            const selected = String(id) === String(selectedId || '') ? ' selected' : '';
+            return `<option value="${id}"${selected}>${escapeAttr(name)}</option>`;
+        }).join('');
+    }
+
+    // Fills the open selects in place, so an open dropdown is not rebuilt
+    exports.receiveDeckOptions = function (options) {
+        deckOptions = options;
+        document.querySelectorAll('.heatmap-deck-filter').forEach((select) => {
+            select.innerHTML = deckOptionsHTML(select.value, '', select.dataset.allDecks);
+        });
+    };
+
+    function deckFilterHTML(preparedData, i18n) {
+        const allDecks = i18n.all_decks || 'All decks';
+        return `<select class="heatmap-deck-filter" data-all-decks="${escapeAttr(allDecks)}">`
+            + deckOptionsHTML(preparedData.deckId, preparedData.deckName, allDecks)
+            + '</select>';
+    }
 
-        // Convert object from Python into a Map
-        const duesByDay = new Map(Object.entries(rawData.due_calendar || {}));
+    function bindDeckFilter(container) {
+        const select = container.querySelector('.heatmap-deck-filter');
+        if (!select || typeof pycmd !== 'function') return;
+        const loadOptions = () => {
+            if (!deckOptions) pycmd('onigiri_heatmap_decks');
+        };
+        select.addEventListener('focus', loadOptions);
+        select.addEventListener('mousedown', loadOptions);
+        select.addEventListener('change', () => {
+            pycmd(`onigiri_heatmap_deck:${select.value}`);
+        });
+    }
+
+    function prepareData(rawData) {
+        // Fresh data from Python replaces every cached year
+        yearCache.clear();
+        pendingYears.clear();
+        lastUsedKey = null;
+        if (rawData.window) {
+            storeYear(rawData.window);
+        }
 
         // Get today's date key from Python
         const todayKey = rawData.today_date_key;
@@ -34,9 +179,14 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
         // Get daily average for relative scaling
         const dailyAverage = rawData.daily_average || 0;
 
-        // No need to calculate offset or convert timestamps here.
+        // Years before the first review have nothing to fetch
+        const firstYear = rawData.firstYear || new Date().getFullYear();
+
+        // Deck the counts are filtered to (with its subdecks), null for all decks
+        const deckId = rawData.deck_id || null;
+        const deckName = rawData.deck_name || '';
 
-        return { reviewsByDay, duesByDay, todayKey, dailyAverage };
+        return { todayKey, dailyAverage, firstYear, deckId, deckName };
     }
 
     // Classifies past review count into 8 levels (0-8) based on daily average
@@ -116,6 +266,89 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
 
     // --- VIEW RENDERERS ---
 
+    // The selected shape is applied once as a stylesheet mask shared by every
+    // cell, instead of an inline data URI on each cell.
+    let appliedShapeSvg = null;
+
+    function applyShapeStyle(svgContent) {
+        svgContent = svgContent || '';
+        if (svgContent === appliedShapeSvg) return;
+        appliedShapeSvg = svgContent;
+        let style = document.getElementById('onigiri-heatmap-shape-style');
+        if (!style) {
+            style = document.createElement('style');
+            style.id = 'onigiri-heatmap-shape-style';
+            document.head.appendChild(style);
+        }
+        if (!svgContent) {
+            style.textContent = '';
+            return;
+        }
+        const dataUri = `url("data:image/svg+xml,${encodeURIComponent(svgContent)}")`;
+        style.textContent = `
+            .heatmap-day-cell .day-shape {
+                -webkit-mask-image: ${dataUri};
+                mask-image: ${dataUri};
+                -webkit-mask-size: contain;
+                mask-size: contain;
+                -webkit-mask-repeat: no-repeat;
+                mask-repeat: no-repeat;
+                -webkit-mask-position: 50% 50%;
+                mask-position: 50% 50%;
+            }
+        `;
+    }
+
+    // Classification and tooltip of one day, shared by the DOM and canvas renderers
+    function describeDay(date, reviewCount, dueCount, todayKey, dailyAverage) {
+        const dateKey = getLocalDateKey(date); // FIX: Use local date key
+        const dateText = date.toLocaleDateString(undefined, { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' });
+
+        if (dateKey === todayKey) {
+            // --- TODAY ---
+            return {
+                today: true,
+                future: false,
+                count: reviewCount,
+                level: getIntensityLevel(reviewCount, dailyAverage),
+                tooltip: `${reviewCount} review${reviewCount !== 1 ? 's' : ''} done today`,
+            };
+        }
+        if (dateKey < todayKey) {
+            // --- PAST ---
+            return {
+                today: false,
+                future: false,
+                count: reviewCount,
+                level: getIntensityLevel(reviewCount, dailyAverage),
+                tooltip: `${reviewCount} review${reviewCount !== 1 ? 's' : ''} on ${dateText}`,
+            };
+        }
+        // --- FUTURE ---
+        return {
+            today: false,
+            future: true,
+            count: dueCount,
+            level: getDueIntensityLevel(dueCount, dailyAverage),
+            tooltip: `${dueCount} review${dueCount !== 1 ? 's' : ''} due on ${dateText}`,
+        };
+    }
+
+    function describeDate(date, preparedData) {
+        const reviewCount = getDayCount(preparedData, 'reviews', date);
+        const dueCount = getDayCount(preparedData, 'dues', date);
+        return describeDay(date, reviewCount, dueCount, preparedData.todayKey, preparedData.dailyAverage);
+    }
+
+    const EMPTY_CELL_HTML = '<div class="heatmap-day-cell empty"></div>';
+
+    function cellHTML(day) {
+        const levelAttrs = day.future
+            ? `class="heatmap-day-cell future-day" data-due-count="${day.count}" data-due-level="${day.level}"`
+            : `class="heatmap-day-cell${day.today ? ' today' : ''}" data-review-count="${day.count}" data-level="${day.level}"`;
+        return `<div ${levelAttrs} data-tooltip="${escapeAttr(day.tooltip)}"><div class="day-shape"></div></div>`;
+    }
+
     function drawYearView(gridContainer, preparedData, config) {
         gridContainer.className = 'heatmap-grid year-view';
         gridContainer.dataset.monthsHidden = !config.heatmapShowMonths;
@@ -135,33 +368,34 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
         const cellsContainer = gridContainer.querySelector('.heatmap-cells');
         const monthsContainer = gridContainer.querySelector('.heatmap-months');
         let currentMonth = -1;
+        let monthsHTML = '';
 
+        // One entry per grid slot (7 rows, column-major); null outside the year
+        const days = [];
+        const dayOfWeek = getWeekStartOffset(firstDayOfYear, config);
         for (let i = 0; i < 371; i++) {
-            const dayOfWeek = getWeekStartOffset(firstDayOfYear, config);
             const date = new Date(firstDayOfYear);
             date.setDate(firstDayOfYear.getDate() - dayOfWeek + i);
 
             if (date.getFullYear() !== year) {
-                const emptyCell = document.createElement('div');
-                emptyCell.className = 'heatmap-day-cell empty';
-                cellsContainer.appendChild(emptyCell);
+                days.push(null);
                 continue;
             }
 
             if (date.getDate() === 1 && date.getMonth() !== currentMonth) {
                 currentMonth = date.getMonth();
-                const monthLabel = document.createElement('div');
-                monthLabel.className = 'month-label';
-                monthLabel.textContent = date.toLocaleString('default', { month: 'short' });
-                monthLabel.style.gridColumn = Math.floor(i / 7) + 1;
-                monthsContainer.appendChild(monthLabel);
+                const monthName = date.toLocaleString('default', { month: 'short' });
+                monthsHTML += `<div class="month-label" style="grid-column: ${Math.floor(i / 7) + 1}">${monthName}</div>`;
             }
 
-            const dateKey = getLocalDateKey(date); // FIX: Use local date key
-            const reviewCount = preparedData.reviewsByDay.get(dateKey) || 0;
-            const dueCount = preparedData.duesByDay.get(dateKey) || 0;
-            const cell = createCell(date, reviewCount, dueCount, config, preparedData.todayKey, preparedData.dailyAverage);
-            cellsContainer.appendChild(cell);
+            days.push(describeDate(date, preparedData));
+        }
+        monthsContainer.innerHTML = monthsHTML;
+
+        if (config.heatmapRenderer === 'canvas') {
+            drawYearCanvas(cellsContainer, days, config);
+        } else {
+            cellsContainer.innerHTML = days.map(day => (day ? cellHTML(day) : EMPTY_CELL_HTML)).join('');
         }
     }
 
@@ -180,22 +414,12 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
         gridContainer.innerHTML = html;
         const cellsContainer = gridContainer.querySelector('.month-cells-grid');
 
-        const firstDayOfWeek = getWeekStartOffset(firstDayOfMonth, config);
-        for (let i = 0; i < firstDayOfWeek; i++) {
-            const emptyCell = document.createElement('div');
-            emptyCell.className = 'heatmap-day-cell empty';
-            cellsContainer.appendChild(emptyCell);
-        }
-
+        let cellsHTML = EMPTY_CELL_HTML.repeat(getWeekStartOffset(firstDayOfMonth, config));
         const lastDayOfMonth = new Date(year, month + 1, 0).getDate();
         for (let i = 1; i <= lastDayOfMonth; i++) {
-            const date = new Date(year, month, i);
-            const dateKey = getLocalDateKey(date); // FIX: Use local date key
-            const reviewCount = preparedData.reviewsByDay.get(dateKey) || 0;
-            const dueCount = preparedData.duesByDay.get(dateKey) || 0;
-            const cell = createCell(date, reviewCount, dueCount, config, preparedData.todayKey, preparedData.dailyAverage);
-            cellsContainer.appendChild(cell);
+            cellsHTML += cellHTML(describeDate(new Date(year, month, i), preparedData));
         }
+        cellsContainer.innerHTML = cellsHTML;
     }
 
     function drawWeekView(gridContainer, preparedData, config) {
@@ -215,78 +439,193 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
         const headerContainer = gridContainer.querySelector('.week-days-header');
         const cellsContainer = gridContainer.querySelector('.week-cells-grid');
 
+        let headerHTML = '';
+        let cellsHTML = '';
         for (let i = 0; i < 7; i++) {
             const date = new Date(startDate);
             date.setDate(startDate.getDate() + i);
 
-            const header = document.createElement('div');
-            header.innerHTML = `
-                <div class="weekday-label">${date.toLocaleString('default', { weekday: 'short' })}</div>
-                <div class="day-label">${date.getDate()}</div>
+            headerHTML += `
+                <div>
+                    <div class="weekday-label">${date.toLocaleString('default', { weekday: 'short' })}</div>
+                    <div class="day-label">${date.getDate()}</div>
+                </div>
             `;
-            headerContainer.appendChild(header);
-
-            const dateKey = getLocalDateKey(date); // FIX: Use local date key
-            const reviewCount = preparedData.reviewsByDay.get(dateKey) || 0;
-            const dueCount = preparedData.duesByDay.get(dateKey) || 0;
-            const cell = createCell(date, reviewCount, dueCount, config, preparedData.todayKey, preparedData.dailyAverage);
-            cellsContainer.appendChild(cell);
+            cellsHTML += cellHTML(describeDate(date, preparedData));
         }
+        headerContainer.innerHTML = headerHTML;
+        cellsContainer.innerHTML = cellsHTML;
     }
 
-    function createCell(date, reviewCount, dueCount, config, todayKey, dailyAverage) {
-        const cell = document.createElement('div');
-        cell.className = 'heatmap-day-cell';
-
-        const dateKey = getLocalDateKey(date); // FIX: Use local date key
-        let tooltipText;
-        const dateText = date.toLocaleDateString(undefined, { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' });
-
-        if (dateKey === todayKey) {
-            // --- TODAY ---
-            // Mark today's cell with a special class
-            cell.classList.add('today');
-
-            // Set review count and level for proper coloring
-            cell.dataset.reviewCount = reviewCount;
-            cell.dataset.level = getIntensityLevel(reviewCount, dailyAverage);
+    // --- CANVAS RENDERER (year view) ---
+    // Draws the 371 year cells into one <canvas>. Colors are read from the
+    // same CSS rules the DOM cells use, the shape is tinted once per color,
+    // and a single tooltip element follows the hovered cell (hit-tested from
+    // the pointer position).
+    const YEAR_COLUMNS = 53;
+    const YEAR_ROWS = 7;
+    const CELL_MARGIN = 1;
+    const shapeSprites = { svg: null, image: null, ready: false, waiting: [], tinted: new Map() };
+
+    // Returns the loaded shape image, null for plain squares, or undefined
+    // while it is still loading (onLoad is then called once it is ready).
+    function loadShapeImage(svgContent, onLoad) {
+        if (shapeSprites.svg !== svgContent) {
+            shapeSprites.svg = svgContent;
+            shapeSprites.tinted.clear();
+            shapeSprites.image = null;
+            shapeSprites.ready = !svgContent;
+            if (svgContent) {
+                const image = new Image();
+                const settle = (loaded) => {
+                    if (shapeSprites.image !== image) return;
+                    shapeSprites.ready = true;
+                    if (!loaded) shapeSprites.image = null;
+                    shapeSprites.waiting.splice(0).forEach(callback => callback());
+                };
+                image.onload = () => settle(true);
+                image.onerror = () => settle(false);
+                shapeSprites.image = image;
+                image.src = `data:image/svg+xml,${encodeURIComponent(svgContent)}`;
+            }
+        }
+        if (!shapeSprites.ready) {
+            shapeSprites.waiting.push(onLoad);
+            return undefined;
+        }
+        return shapeSprites.image;
+    }
 
-            // Build tooltip with reviews done today
-            tooltipText = `${reviewCount} review${reviewCount !== 1 ? 's' : ''} done today`;
-        } else if (dateKey < todayKey) {
-            // --- PAST ---
-            cell.dataset.reviewCount = reviewCount;
-            cell.dataset.level = getIntensityLevel(reviewCount, dailyAverage);
-            tooltipText = `${reviewCount} review${reviewCount !== 1 ? 's' : ''} on ${dateText}`;
-        } else {
-            // --- FUTURE ---
-            cell.classList.add('future-day');
-            cell.dataset.dueCount = dueCount;
-            cell.dataset.dueLevel = getDueIntensityLevel(dueCount, dailyAverage);
+    function tintedShape(image, color, size) {
+        const key = `${color}|${size}`;
+        let sprite = shapeSprites.tinted.get(key);
+        if (sprite) return sprite;
+        sprite = document.createElement('canvas');
+        sprite.width = size;
+        sprite.height = size;
+        const ctx = sprite.getContext('2d');
+        // Fit like mask-size: contain
+        const naturalWidth = image.naturalWidth || size;
+        const naturalHeight = image.naturalHeight || size;
+        const scale = Math.min(size / naturalWidth, size / naturalHeight);
+        const width = naturalWidth * scale;
+        const height = naturalHeight * scale;
+        ctx.drawImage(image, (size - width) / 2, (size - height) / 2, width, height);
+        ctx.globalCompositeOperation = 'source-in';
+        ctx.fillStyle = color;
+        ctx.fillRect(0, 0, size, size);
+        shapeSprites.tinted.set(key, sprite);
+        return sprite;
+    }
 
-            const dueText = `${dueCount} review${dueCount !== 1 ? 's' : ''} due`;
-            tooltipText = `${dueText} on ${dateText}`;
+    // Computed fill colors for every past and due level, read from hidden probe cells
+    function resolveCellColors(container) {
+        const probe = document.createElement('div');
+        probe.style.cssText = 'position:absolute;width:10px;height:10px;visibility:hidden;pointer-events:none;';
+        let probeHTML = '';
+        for (let level = 0; level <= 8; level++) {
+            probeHTML += `<div class="heatmap-day-cell" data-level="${level}"><div class="day-shape"></div></div>`;
+            probeHTML += `<div class="heatmap-day-cell future-day" data-due-level="${level}"><div class="day-shape"></div></div>`;
         }
+        probe.innerHTML = probeHTML;
+        container.appendChild(probe);
+        const colors = { past: [], future: [] };
+        probe.querySelectorAll('.day-shape').forEach((shape, index) => {
+            const color = getComputedStyle(shape).backgroundColor;
+            (index % 2 ? colors.future : colors.past).push(color);
+        });
+        probe.remove();
+        return colors;
+    }
 
-        const shapeDiv = document.createElement('div');
-        shapeDiv.className = 'day-shape';
-
-        if (config.heatmapSvgContent) {
-            const encodedSvg = encodeURIComponent(config.heatmapSvgContent);
-            const dataUri = `url("data:image/svg+xml,${encodedSvg}")`;
-            shapeDiv.style.webkitMaskImage = dataUri;
-            shapeDiv.style.maskImage = dataUri;
-            shapeDiv.style.webkitMaskSize = 'contain';
-            shapeDiv.style.maskSize = 'contain';
-            shapeDiv.style.webkitMaskRepeat = 'no-repeat';
-            shapeDiv.style.maskRepeat = 'no-repeat';
-            shapeDiv.style.webkitMaskPosition = '50% 50%';
-            shapeDiv.style.maskPosition = '50% 50%';
+    // One observer repaints every year canvas on resize. Canvases replaced by
+    // a later render are dropped from it whenever a new one is drawn.
+    const canvasPainters = new Map();
+    let canvasObserver = null;
+
+    function observeCanvasResize(canvas, paint) {
+        if (typeof ResizeObserver !== 'function') return;
+        if (!canvasObserver) {
+            canvasObserver = new ResizeObserver((entries) => {
+                entries.forEach((entry) => {
+                    const paintCanvas = canvasPainters.get(entry.target);
+                    if (paintCanvas) paintCanvas();
+                });
+            });
         }
-        cell.appendChild(shapeDiv);
+        canvasPainters.forEach((_, observed) => {
+            if (!observed.isConnected) {
+                canvasObserver.unobserve(observed);
+                canvasPainters.delete(observed);
+            }
+        });
+        canvasPainters.set(canvas, paint);
+        canvasObserver.observe(canvas);
+    }
 
-        cell.setAttribute('data-tooltip', tooltipText);
-        return cell;
+    function drawYearCanvas(cellsContainer, days, config) {
+        cellsContainer.classList.add('canvas-cells');
+        const colors = resolveCellColors(cellsContainer);
+        const canvas = document.createElement('canvas');
+        canvas.className = 'heatmap-canvas';
+        const tooltip = document.createElement('div');
+        tooltip.className = 'heatmap-canvas-tooltip';
+        cellsContainer.append(canvas, tooltip);
+
+        let pitch = 0;
+        const paint = () => {
+            if (!canvas.isConnected) return;
+            const width = canvas.clientWidth;
+            if (!width) return;
+            pitch = width / YEAR_COLUMNS;
+            const ratio = window.devicePixelRatio || 1;
+            canvas.width = Math.round(width * ratio);
+            canvas.height = Math.round(pitch * YEAR_ROWS * ratio);
+            const ctx = canvas.getContext('2d');
+            ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+            ctx.clearRect(0, 0, width, pitch * YEAR_ROWS);
+
+            const size = Math.max(pitch - 2 * CELL_MARGIN, 1);
+            const spriteSize = Math.ceil(size * ratio);
+            const image = loadShapeImage(config.heatmapSvgContent, paint);
+            if (image === undefined) return; // repainted once the shape loads
+
+            for (let i = 0; i < days.length; i++) {
+                const day = days[i];
+                if (!day) continue;
+                const color = (day.future ? colors.future : colors.past)[day.level];
+                const x = Math.floor(i / YEAR_ROWS) * pitch + CELL_MARGIN;
+                const y = (i % YEAR_ROWS) * pitch + CELL_MARGIN;
+                if (image) {
+                    ctx.drawImage(tintedShape(image, color, spriteSize), x, y, size, size);
+                } else {
+                    ctx.fillStyle = color;
+                    ctx.fillRect(x, y, size, size);
+                }
+            }
+        };
+
+        canvas.addEventListener('mousemove', (e) => {
+            if (!pitch) return;
+            const rect = canvas.getBoundingClientRect();
+            const column = Math.floor((e.clientX - rect.left) / pitch);
+            const row = Math.floor((e.clientY - rect.top) / pitch);
+            const day = row >= 0 && row < YEAR_ROWS ? days[column * YEAR_ROWS + row] : null;
+            if (!day) {
+                tooltip.classList.remove('visible');
+                return;
+            }
+            tooltip.textContent = day.tooltip;
+            // Keep the tooltip inside the grid near the edges, like the DOM cells
+            tooltip.dataset.align = column < 8 ? 'left' : (column >= YEAR_COLUMNS - 8 ? 'right' : 'center');
+            tooltip.style.left = `${(column + (column < 8 ? 0 : column >= YEAR_COLUMNS - 8 ? 1 : 0.5)) * pitch}px`;
+            tooltip.style.top = `${row * pitch}px`;
+            tooltip.classList.add('visible');
+        });
+        canvas.addEventListener('mouseleave', () => tooltip.classList.remove('visible'));
+
+        observeCanvasResize(canvas, paint);
+        paint();
     }
 
     // --- MAIN RENDER FUNCTION ---
@@ -295,6 +634,7 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
         if (!container) return;
 
         const preparedData = prepareData(data);
+        applyShapeStyle(config.heatmapSvgContent);
 
         // Initialize view from config if available (defaulting to 'year' is handled by config.py/heatmap.py logic, but fallback here too)
         if (config.heatmapDefaultView) {
@@ -348,6 +688,7 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
                         <div class="heatmap-nav">${navHTML}</div>
                     </div>
                     <div class="header-right">
+                        ${config.heatmapDeckSelector ? deckFilterHTML(preparedData, i18n) : ''}
                         ${streakHTML}
                         <div class="heatmap-filters">
                             <button class="filter-btn ${state.view === 'year' ? 'active' : ''}" data-view="year">${i18n.year || 'Year'}</button>
@@ -368,6 +709,8 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
                 drawWeekView(gridContainer, preparedData, config);
             }
 
+            bindDeckFilter(container);
+
             container.querySelector('.heatmap-filters').addEventListener('click', (e) => {
                 if (e.target.classList.contains('filter-btn')) {
                     state.view = e.target.dataset.view;
@@ -392,6 +735,7 @@ window.OnigiriHeatmap = window.OnigiriHeatmap || {};
             });
         }
 
+        activeDraws.set(containerId, draw);
         draw();
     };
 
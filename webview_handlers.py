@@ -4,6 +4,10 @@ import shutil
 from urllib.parse import unquote
 from typing import Tuple, Any
 from aqt.deckbrowser import DeckBrowser
+from aqt.overview import Overview
+from . import config
+from . import deck_meta
+from . import heatmap
 from . import deck_tree_updater
 from . import create_deck_dialog
 from aqt import mw
@@ -107,8 +111,7 @@ def _icon_payload(deck_id: str) -> dict:
                     "system": False,
                 })
 
-    custom_icons = mw.col.conf.get("onigiri_custom_deck_icons", {})
-    current = custom_icons.get(str(deck_id), {})
+    current = deck_meta.get_deck_meta().icon(deck_id)
     return {
         "deckId": str(deck_id),
         "current": {
@@ -291,8 +294,8 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
                 or mw.col.conf.get("onigiri_show_favorites", False)
             )
             next_value = not current
-            mw.col.conf["onigiri_show_favourites"] = next_value
-            mw.col.conf["onigiri_show_favorites"] = next_value
+            config.set_collection_conf("onigiri_show_favourites", next_value)
+            config.set_collection_conf("onigiri_show_favorites", next_value)
             mw.col.setMod()
             if isinstance(context, DeckBrowser):
                 context._render_data = None
@@ -305,7 +308,7 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
     if cmd == "onigiri_filter_marked":
         try:
             current = bool(mw.col.conf.get("onigiri_show_marked", False))
-            mw.col.conf["onigiri_show_marked"] = not current
+            config.set_collection_conf("onigiri_show_marked", not current)
             mw.col.setMod()
             if isinstance(context, DeckBrowser):
                 context._render_data = None
@@ -315,19 +318,64 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
             tooltip(f"Filter failed: {e}")
         return (True, None)
 
-    if cmd.startswith("onigiri_deck_search:"):
+    if cmd == "onigiri_deck_search_index":
         try:
-            query = cmd.split(":", 1)[1]
             if isinstance(context, DeckBrowser):
-                new_html = deck_tree_updater._render_deck_search_html(context, query)
-                context.web.eval(
-                    "OnigiriEngine.updateDeckTree({});".format(json.dumps(new_html))
-                )
+                deck_tree_updater.send_deck_search_index(context)
             return (True, None)
         except Exception as e:
-            print(f"Onigiri: Error searching decks: {e}")
+            print(f"Onigiri: Error building the deck search index: {e}")
             return (True, None)
 
+    if cmd == "onigiri_deck_tree_resync":
+        # The page's deck list is not the one the last patch was made against
+        if isinstance(context, DeckBrowser):
+            deck_tree_updater.forget_sent_rows()
+            deck_tree_updater.refresh_deck_tree_state(context)
+        return (True, None)
+
+    if cmd.startswith("onigiri_heatmap_year:"):
+        try:
+            parts = cmd.split(":")
+            year = int(parts[1])
+            deck_id = int(parts[2]) if len(parts) > 2 and parts[2] else None
+            web = getattr(context, "web", None)
+            if web is not None:
+                payload = heatmap.get_heatmap_year(year, deck_id)
+                if payload is not None:
+                    web.eval(
+                        "if (window.OnigiriHeatmap) {{ OnigiriHeatmap.receiveYear({}); }}".format(json.dumps(payload))
+                    )
+                elif isinstance(context, (DeckBrowser, Overview)):
+                    # Nothing sent for this deck (yet): compute it in the background
+                    heatmap.request_heatmap_render(web, deck_id, deck_selector=isinstance(context, DeckBrowser))
+        except Exception as e:
+            print(f"Onigiri: Error loading heatmap year: {e}")
+        return (True, None)
+
+    if cmd == "onigiri_heatmap_decks":
+        try:
+            web = getattr(context, "web", None)
+            if web is not None:
+                web.eval(
+                    "if (window.OnigiriHeatmap) {{ OnigiriHeatmap.receiveDeckOptions({}); }}".format(
+                        json.dumps(heatmap.get_deck_options())
+                    )
+                )
+        except Exception as e:
+            print(f"Onigiri: Error listing heatmap decks: {e}")
+        return (True, None)
+
+    if cmd.startswith("onigiri_heatmap_deck:"):
+        try:
+            deck_id = cmd.split(":", 1)[1]
+            heatmap.set_widget_deck_filter(int(deck_id) if deck_id else None)
+            if isinstance(context, DeckBrowser):
+                heatmap.request_heatmap_render(context.web, heatmap.get_widget_deck_filter(), deck_selector=True)
+        except Exception as e:
+            print(f"Onigiri: Error filtering heatmap by deck: {e}")
+        return (True, None)
+
     if cmd.startswith("onigiri_collapse:"):
         try:
             deck_id = cmd.split(":", 1)[1]
@@ -351,19 +399,10 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
                 tooltip("Cannot favorite: Deck no longer exists.")
                 return (True, None)
             
-            favorites = mw.col.conf.get("onigiri_favorite_decks", [])
-            
-            if deck_id in favorites:
-                favorites.remove(deck_id)
-            else:
-                if len(favorites) >= 10:
-                    tooltip("You can only have up to 10 favorite decks.")
-                    return (True, None) # Stop execution, don't refresh
-                favorites.append(deck_id)
-            
-            # Save the change to Anki's configuration
-            mw.col.conf["onigiri_favorite_decks"] = favorites
-            mw.col.setMod() # This line is CRITICAL
+            # Saved to Anki's configuration by deck_meta
+            if deck_meta.toggle_favorite(deck_id) is None:
+                tooltip(f"You can only have up to {deck_meta.MAX_FAVORITES} favorite decks.")
+                return (True, None) # Stop execution, don't refresh
             
             # Force a full refresh of the deck browser
             if isinstance(context, DeckBrowser):
@@ -385,10 +424,11 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
             }
             if sort_mode not in valid_modes:
                 sort_mode = "default"
-            mw.col.conf["onigiri_sort_mode"] = sort_mode
-            mw.col.conf["onigiri_deck_sort"] = sort_mode
+            config.set_collection_conf("onigiri_sort_mode", sort_mode)
+            config.set_collection_conf("onigiri_deck_sort", sort_mode)
             mw.col.setMod()
-            _refresh_deck_browser(context)
+            if isinstance(context, DeckBrowser):
+                deck_tree_updater.refresh_deck_list_view(context)
             labels = {
                 "default": "Default order",
                 "alphabetical_az": "A to Z",
@@ -511,14 +551,7 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
     if cmd.startswith("onigiri_ctx_mark:"):
         try:
             _, deck_id, mark_key = cmd.split(":", 2)
-            valid_marks = {"red", "blue", "green", "yellow"}
-            marks = mw.col.conf.get("onigiri_deck_marks", {})
-            if mark_key in valid_marks:
-                marks[str(deck_id)] = mark_key
-            else:
-                marks.pop(str(deck_id), None)
-            mw.col.conf["onigiri_deck_marks"] = marks
-            mw.col.setMod()
+            deck_meta.set_mark(deck_id, mark_key)
             _refresh_deck_browser(context)
             return (True, None)
         except Exception as e:
@@ -552,9 +585,9 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
 
                 new_order = [str(did) for did in payload.get("new_order", [])]
                 if new_order:
-                    mw.col.conf["onigiri_sort_mode"] = "custom"
-                    mw.col.conf["onigiri_deck_sort"] = "custom"
-                    mw.col.conf["onigiri_custom_deck_order"] = new_order
+                    config.set_collection_conf("onigiri_sort_mode", "custom")
+                    config.set_collection_conf("onigiri_deck_sort", "custom")
+                    deck_meta.set_custom_order(new_order)
             mw.col.setMod()
             _refresh_deck_browser(context)
             return (True, None)
@@ -580,16 +613,10 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
             _, deck_id, payload = cmd.split(":", 2)
             data = json.loads(payload)
             icon_name = data.get("icon", "")
-            custom_icons = mw.col.conf.get("onigiri_custom_deck_icons", {})
             if icon_name:
-                custom_icons[str(deck_id)] = {
-                    "icon": icon_name,
-                    "color": data.get("color", "#888888"),
-                }
+                deck_meta.set_deck_icon(deck_id, icon_name, data.get("color", "#888888"))
             else:
-                custom_icons.pop(str(deck_id), None)
-            mw.col.conf["onigiri_custom_deck_icons"] = custom_icons
-            mw.col.setMod()
+                deck_meta.clear_deck_icon(deck_id)
             _refresh_deck_browser(context)
             return (True, None)
         except Exception as e:
@@ -600,10 +627,7 @@ def handle_webview_cmd(handled: Tuple[bool, Any], cmd: str, context) -> Tuple[bo
     if cmd.startswith("onigiri_icon_chooser_reset:"):
         try:
             deck_id = cmd.split(":", 1)[1]
-            custom_icons = mw.col.conf.get("onigiri_custom_deck_icons", {})
-            custom_icons.pop(str(deck_id), None)
-            mw.col.conf["onigiri_custom_deck_icons"] = custom_icons
-            mw.col.setMod()
+            deck_meta.clear_deck_icon(deck_id)
             _refresh_deck_browser(context)
             return (True, None)
         except Exception as e: